@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+from data_layer import RAW_MIX_MATERIALS
+from inverted_index import tokenize
+from workbook_cache import file_digest
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".answer_cache.sqlite")
+MAX_ENTRIES = 1000
+TTL_SECONDS = 30 * 24 * 3600
+
+# Filler words dropped before keying, so rephrasings of the same question share an entry
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "analyze", "at", "by", "can", "do", "does", "for", "how", "in", "is",
+    "me", "of", "on", "our", "please", "show", "tell", "the", "to", "us", "vs", "versus", "what",
+    "which", "with", "s",
+}
+
+# The executive questions behind the tab 4 buttons, answered from the workbook and pre-warmed per workbook
+LIMESTONE_QUESTION = "What is the sensitivity of Limestone cost?"
+POWER_QUESTION = "Analyze Power Generation efficiency (Gas vs HFO)."
+STORES_QUESTION = "Show me Stores & Spares utilization trends."
+PRESET_QUESTIONS = (LIMESTONE_QUESTION, POWER_QUESTION, STORES_QUESTION)
+
+
+def normalize_query(query):
+    """Lowercased content words, de-duplicated and sorted: word order and punctuation don't matter."""
+    return " ".join(sorted({t for t in tokenize(query) if t not in STOPWORDS})) or query.strip().lower()
+
+
+def sources_digest(paths):
+    """One digest over the content of every file answers are drawn from (workbook, board deck, file_index.md).
+
+    Only content hashes count, so re-saving a file unchanged keeps its answers.
+    """
+    parts = [f"{os.path.abspath(p)}={file_digest(p).split('-')[0]}" for p in sorted(paths)]
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    """Size-bounded LRU + TTL answer store in SQLite, shared by every session and process.
+
+    Entries are keyed by normalized query and a digest of the source files (see sources_digest), so a
+    new month's workbook or a new board deck never serves the old answers.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY, digest TEXT, query TEXT, answer TEXT, created REAL, accessed REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_accessed ON answers (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call keeps the cache safe across Streamlit's script threads. The
+        # connection's own `with` only commits, so closing() releases the file (and its WAL lock) too.
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:
+            yield conn
+
+    @staticmethod
+    def key(query, digest):
+        return hashlib.sha1(f"{digest}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, query, digest):
+        """Cached answer, or None when missing or older than the TTL."""
+        key, now = self.key(query, digest), time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE answers SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, query, digest, answer):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                         (self.key(query, digest), str(digest), normalize_query(query), answer, now, now))
+            # Least recently used entries beyond the size bound are evicted
+            conn.execute("""DELETE FROM answers WHERE key IN (
+                SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    def get_or_compute(self, query, digest, compute):
+        answer = self.get(query, digest)
+        if answer is None:
+            answer = compute()
+            self.put(query, digest, answer)
+        return answer
+
+    def invalidate(self, keep_digest=None):
+        """Drops every entry not built from `keep_digest` (all of them when None)."""
+        with self._connect() as conn:
+            if keep_digest is None:
+                conn.execute("DELETE FROM answers")
+            else:
+                conn.execute("DELETE FROM answers WHERE digest != ?", (str(keep_digest),))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+# --- Computed answers ---
+
+def limestone_sensitivity(snapshot, price_change_pct=10.0):
+    """Gross margin impact (bps) of a price change in each raw material.
+
+    A material's share of raw-mix spend (COP sheet) scales the P&L raw material line, which
+    keeps the result in the P&L currency whatever unit the COP rates are quoted in.
+    """
+    spend = pd.Series({n: snapshot.material(n).amount for n in RAW_MIX_MATERIALS})
+    share = spend / spend.sum() if spend.sum() else spend * 0
+    impact = share * snapshot.raw_material * price_change_pct / 100
+    return pd.DataFrame({"spend_share_pct": share * 100,
+                         "impact_bps": impact / snapshot.net_revenue * 10000 if snapshot.net_revenue else impact * 0})
+
+
+def limestone_answer(snapshot, price_change_pct=10.0):
+    table = limestone_sensitivity(snapshot, price_change_pct)
+    low, high = table.loc["Limestones (Low Sulpher)"], table.loc["Limestones (High Sulpher)"]
+    return (f"🤖 **AI Analysis:** A {price_change_pct:.0f}% increase in Low Sulphur Limestone price impacts Gross Margin "
+            f"by **{low['impact_bps']:.0f} bps**, whereas High Sulphur Limestone only impacts it by "
+            f"**{high['impact_bps']:.0f} bps** ({high['spend_share_pct']:.1f}% vs {low['spend_share_pct']:.1f}% of "
+            f"raw-mix spend). (Source: 'COP' Sheet, {snapshot.period}.)")
+
+
+def power_answer(snapshot, periods, costs, shift_pct=20.0):
+    """Saving from moving `shift_pct` of the latest period's generation from HFO to gas, in the fuel price currency."""
+    demand = periods["demand"].iloc[-1]
+    saving = demand * shift_pct / 100 * (costs["hfo_cost"][-1] - costs["gas_cost"][-1])
+    currency = costs.get("currency", snapshot.currency)
+    verb = "save" if saving >= 0 else "cost an extra"
+    return (f"🤖 **AI Analysis:** Currently, PG HFO consumption is {snapshot.hfo_pg_liters/1e6:.1f}M Liters vs Gas "
+            f"{snapshot.gas_pg_nm3/1e6:.2f}M NM3. At {costs['gas_cost'][-1]:.4f} vs {costs['hfo_cost'][-1]:.4f} per "
+            f"{costs['unit']} (gas vs HFO), shifting {shift_pct:.0f}% load to Gas would {verb} approx "
+            f"**{currency} {abs(saving)/1e3:,.0f}k/month** ({periods['period'].iloc[-1]}).")
+
+
+def stores_answer(retriever):
+    from retrieval import format_answer
+
+    return "🤖 **AI Analysis:** " + format_answer("Stores & Spares", retriever.search("stores spares", k=3))
+
+
+def prewarm(cache, digest, snapshot, periods, costs, retriever):
+    """Drops answers built from other source files and computes the preset questions for these."""
+    cache.invalidate(keep_digest=digest)
+    answers = {
+        LIMESTONE_QUESTION: lambda: limestone_answer(snapshot),
+        POWER_QUESTION: lambda: power_answer(snapshot, periods, costs),
+        STORES_QUESTION: lambda: stores_answer(retriever),
+    }
+    return {q: cache.get_or_compute(q, digest, compute) for q, compute in answers.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the executive answer cache.")
+    parser.add_argument("--clear", action="store_true")
+    parser.add_argument("--path", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = AnswerCache(args.path)
+    if args.clear:
+        cache.invalidate()
+    print(f"{len(cache)} cached answers in {args.path}")
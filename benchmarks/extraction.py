@@ -0,0 +1,69 @@
+import contextlib
+import os
+
+from benchmarks.synthetic import cached, frames, write_markdown, write_presentation, write_workbook
+
+# Each time_* takes (scale, data_dir), does its untimed setup and returns the callable to time.
+
+
+def time_extract_xlsx_content(scale, data_dir):
+    from index_files import extract_xlsx_content
+
+    path = cached(data_dir, "workbook.xlsx", scale, write_workbook)
+
+    def run():
+        text = extract_xlsx_content(path)
+        if text.startswith("Error reading"):
+            raise RuntimeError(text)
+    return run
+
+
+# The file benchmarks parse every generated cell or slide (~2 s at 1x, ~20 s at 10x for the workbook), so they
+# stop at 100x rather than run for hours at 1000x
+time_extract_xlsx_content.scales = (1, 10, 100)
+
+
+def time_extract_pptx_content(scale, data_dir):
+    from index_files import extract_pptx_content
+
+    path = cached(data_dir, "deck.pptx", scale, write_presentation)
+
+    def run():
+        text = extract_pptx_content(path)
+        if text.startswith("Error reading"):
+            raise RuntimeError(text)
+    return run
+
+
+time_extract_pptx_content.scales = (1, 10, 100)
+
+
+def time_keyword_scan_cop(scale, data_dir):
+    # find_cop_items.py: every keyword hit in the COP sheet
+    from find_cop_items import KEYWORDS
+    from keyword_search import iter_hits
+
+    cop = {"COP": frames(scale)["COP"]}
+    return lambda: list(iter_hits(KEYWORDS, frames=cop))
+
+
+def time_keyword_scan_all_sheets(scale, data_dir):
+    # find_cop_items_all.py, without its --limit so the whole workbook is scanned at every scale
+    from find_cop_items_all import KEYWORDS
+    from keyword_search import iter_hits
+
+    sheets = frames(scale)
+    return lambda: list(iter_hits(KEYWORDS, frames=sheets))
+
+
+def time_convert_md_to_pdf(scale, data_dir):
+    from md_to_pdf import convert_md_to_pdf
+
+    md_path = cached(data_dir, "proposal.md", scale, write_markdown)
+    pdf_path = os.path.join(data_dir, f"proposal_x{scale}.pdf")
+
+    def run():
+        with contextlib.redirect_stdout(None):
+            if not convert_md_to_pdf(md_path, pdf_path):
+                raise RuntimeError("PDF conversion failed")
+    return run
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Tab 2 (Scenario Simulator) and tab 3 (COP Deep Dive) calculations on the default snapshot.
+# "scale" multiplies what the dashboard evaluates today: slider grid resolution, Monte Carlo
+# draws, frontier points or PG periods.
+
+
+def _snapshot():
+    from data_layer import DEFAULT_SNAPSHOT
+
+    return DEFAULT_SNAPSHOT
+
+
+def time_scenario_grid(scale, data_dir):
+    from scenario_engine import PRICE_RANGE, VOLUME_RANGE, scenario_grid
+
+    snap = _snapshot()
+    fuel = np.linspace(-20, 20, 41 * scale)
+    return lambda: scenario_grid(snap.net_revenue, snap.power_fuel, snap.net_profit, fuel, VOLUME_RANGE, PRICE_RANGE)
+
+
+def time_margin_at_risk(scale, data_dir):
+    from monte_carlo import RiskConfig, simulate
+
+    snap = _snapshot()
+    config = RiskConfig(snap.net_revenue, snap.power_fuel, snap.net_profit, snap.gross_profit, draws=100_000 * scale)
+    # simulate() memoizes per config; time the simulation itself
+    return lambda: simulate.__wrapped__(config)
+
+
+def time_raw_mix_frontier(scale, data_dir):
+    from raw_mix_optimizer import RawMixOptimizer
+
+    optimizer = RawMixOptimizer.from_snapshot(_snapshot())
+    points = np.linspace(0.0, 15.0, 61 * scale)
+    # A fresh optimizer per call: the frontier is not served from its bound-set memo
+    return lambda: RawMixOptimizer(optimizer.names, optimizer.costs).frontier("Clay", points, side="lower")
+
+
+def time_power_dispatch(scale, data_dir):
+    from power_dispatch import DEMO_COSTS, dispatch
+
+    rng = np.random.default_rng(3)
+    demand = rng.uniform(2e7, 4e7, 12 * scale)
+    hfo = np.full(demand.size, DEMO_COSTS["hfo_cost"])
+    gas = np.full(demand.size, DEMO_COSTS["gas_cost"])
+    return lambda: dispatch(demand, demand * 0.4, hfo, gas)
+
+
+def time_clinker_factor(scale, data_dir):
+    from cop_levers import clinker_factor
+
+    targets = np.linspace(72.0, 85.0, 131 * scale)
+    cement_t = _snapshot().cement_t
+    return lambda: clinker_factor(targets, cement_t)
+
+
+def time_packing(scale, data_dir):
+    from cop_levers import packing
+
+    snap = _snapshot()
+    gsm = np.resize(np.array([70, 75, 80, 85]), 4 * scale)
+    return lambda: packing(gsm, snap.paper_bags, snap.paper_bag_cost)
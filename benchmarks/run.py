@@ -0,0 +1,148 @@
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import BASE_ROWS
+
+SUITES = ("benchmarks.extraction", "benchmarks.formulas")
+DATA_DIR = os.path.join(ROOT, "benchmarks", ".data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Default scales; a benchmark can set its own with a `scales` attribute (e.g. the file extraction ones)
+SCALES = (10, 100, 1000)
+MIN_RUN_SECONDS = 0.2
+# Wall-clock seconds each benchmark may spend over all its scales; once spent, its larger scales are skipped
+TIME_BUDGET_SECONDS = 120
+REGRESSION_RATIO = 1.25
+
+
+def discover(suites=SUITES, pattern=None):
+    """(name, function) for every time_* benchmark, optionally filtered by a substring of the name."""
+    found = []
+    for suite in suites:
+        module = importlib.import_module(suite)
+        for attr in sorted(dir(module)):
+            name = f"{suite.split('.')[-1]}.{attr}"
+            if attr.startswith("time_") and (pattern is None or pattern in name):
+                found.append((name, getattr(module, attr)))
+    return found
+
+
+def measure(func, repeat=3, budget=None):
+    """Best/median seconds per call; fast calls are looped (like timeit) so each sample lasts MIN_RUN_SECONDS.
+
+    Slow calls are repeated fewer times when `budget` seconds wouldn't cover them (at least once).
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    if budget is not None and first > 0:
+        repeat = max(1, min(repeat, int((budget - first) / first)))
+    number = max(1, int(MIN_RUN_SECONDS / first)) if first > 0 else 1000
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min_s": min(samples), "median_s": statistics.median(samples), "number": number, "repeat": repeat}
+
+
+def run(scales=None, pattern=None, repeat=3, data_dir=DATA_DIR, log=print, budget=TIME_BUDGET_SECONDS):
+    """Times every benchmark at `scales` (default: its own `scales`, else SCALES) within `budget` seconds each."""
+    results = []
+    for name, bench in discover(pattern=pattern):
+        started = time.perf_counter()
+        for scale in scales or getattr(bench, "scales", SCALES):
+            entry = {"benchmark": name, "scale": scale}
+            left = budget - (time.perf_counter() - started)
+            if left <= 0:
+                entry["skipped"] = f"time budget of {budget:g}s spent"
+                log(f"{name:<45} x{scale:<5} skipped ({entry['skipped']})")
+                results.append(entry)
+                continue
+            try:
+                start = time.perf_counter()
+                func = bench(scale, data_dir)
+                entry["setup_s"] = time.perf_counter() - start
+                entry.update(measure(func, repeat, left - entry["setup_s"]))
+                log(f"{name:<45} x{scale:<5} {entry['median_s'] * 1000:>12,.2f} ms")
+            except ImportError as e:
+                # Optional dependencies (e.g. xhtml2pdf for md_to_pdf) are reported, not required
+                entry["skipped"] = f"missing dependency: {e.name or e}"
+                log(f"{name:<45} x{scale:<5} skipped ({entry['skipped']})")
+                results.append(entry)
+                break
+            results.append(entry)
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results):
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        # Rows per synthetic sheet at scale 1; extraction benchmarks run on base_rows x scale
+        "base_rows": BASE_ROWS,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_RATIO):
+    """Rows (benchmark, scale, before, after, ratio, flag) for benchmarks present in both reports."""
+    before = {(r["benchmark"], r["scale"]): r["median_s"] for r in baseline["results"] if "median_s" in r}
+    rows = []
+    for r in current["results"]:
+        key = (r["benchmark"], r["scale"])
+        if key in before and "median_s" in r:
+            ratio = r["median_s"] / before[key]
+            rows.append((*key, before[key], r["median_s"], ratio, "REGRESSION" if ratio > threshold else ""))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite on synthetic data and write a JSON report.")
+    parser.add_argument("--scales", type=int, nargs="+", help=f"Default: each benchmark's own, else {SCALES}")
+    parser.add_argument("-k", dest="pattern", help="Only benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET_SECONDS,
+                        help="Seconds each benchmark may take over all its scales")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", metavar="REPORT", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    current = report(run(args.scales, args.pattern, args.repeat, budget=args.budget))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{current['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=1)
+    print(f"\nReport: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            rows = compare(current, json.load(f))
+        print(f"\n{'Benchmark':<45} {'Scale':>6} {'Before (ms)':>12} {'After (ms)':>12} {'Ratio':>7}")
+        for name, scale, before, after, ratio, flag in rows:
+            print(f"{name:<45} {scale:>6} {before * 1000:>12,.2f} {after * 1000:>12,.2f} {ratio:>7.2f} {flag}")
+        if any(flag for *_, flag in rows):
+            sys.exit(1)
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic stand-ins for the NAS workbook, board deck and proposal. Base row counts are the
+# Jan-26 workbook's (file_index.md) for the sheets the dashboard and scripts read, so scale=10
+# means ten times today's rows. Everything is seeded and generated offline.
+BASE_ROWS = {
+    "COP": 67,
+    "P&L H V1": 171,
+    "DPR": 141,
+    "PG Analysis": 122,
+    "Sales Data": 127,
+    # The two largest sheets, which dominate the all-sheet keyword scans
+    "Annual Incentive": 2815,
+    "Rental": 2019,
+}
+# Part of every generated file's name: bump it when what the writers produce changes, so stale files aren't reused
+DATA_VERSION = 3
+# Rows an .xlsx sheet can hold: scaled sheets are capped here (header included) so every file opens in Excel
+XLSX_MAX_ROWS = 1048576
+COLUMNS = 12
+BASE_SLIDES = 20
+BASE_MD_SECTIONS = 12
+
+# Row labels: a mix of cost lines the keyword scans look for and ones they don't
+LABELS = [
+    "Stores & Spares", "Spare parts consumed", "CWIP - Kiln upgrade", "Depreciation", "Fixed cost allocation",
+    "Power generation", "Electricity purchased", "Inventory - clinker", "Limestones (Low Sulpher)",
+    "Limestones (High Sulpher)", "Clay", "Iron Ore", "Bauxite", "Silica Sand", "HFO consumption",
+    "Gas NM3", "Paper bags", "Packing material", "Salaries & wages", "Royalty", "Insurance",
+    "Transport outward", "Dealer incentive", "Cement dispatched", "Clinker produced",
+]
+
+
+def frame(rows, seed=0):
+    """One raw (header=None) sheet grid: a header row, then a label column and numeric columns."""
+    rng = np.random.default_rng(seed)
+    labels = np.array(LABELS, dtype=object)[rng.integers(0, len(LABELS), rows)]
+    numbers = np.round(rng.gamma(2.0, 5000.0, (rows, COLUMNS - 1)), 2)
+    # Sparse blanks, as in the real sheets
+    numbers[rng.random(numbers.shape) < 0.1] = np.nan
+    body = pd.DataFrame(numbers.astype(object))
+    body.insert(0, "label", labels)
+    header = pd.DataFrame([["Particulars"] + [f"Col {i}" for i in range(1, COLUMNS)]])
+    grid = pd.concat([header, pd.DataFrame(body.to_numpy())], ignore_index=True)
+    return grid.where(grid.notna(), None)
+
+
+def frames(scale):
+    """{sheet: raw grid} at `scale` x today's rows (at most XLSX_MAX_ROWS), as read_workbook returns them."""
+    return {name: frame(min(rows * scale, XLSX_MAX_ROWS - 1), seed=i)
+            for i, (name, rows) in enumerate(BASE_ROWS.items())}
+
+
+def write_workbook(path, scale):
+    """Streams the scaled sheets into an .xlsx with openpyxl's write-only mode."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for name, df in frames(scale).items():
+        ws = wb.create_sheet(name)
+        for row in df.itertuples(index=False):
+            ws.append(list(row))
+    wb.save(path)
+    return path
+
+
+def write_presentation(path, scale):
+    from pptx import Presentation
+
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    rng = np.random.default_rng(1)
+    for i in range(BASE_SLIDES * scale):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}: {LABELS[i % len(LABELS)]}"
+        slide.placeholders[1].text = "\n".join(
+            f"{LABELS[j]}: {v:,.0f}" for j, v in zip(rng.integers(0, len(LABELS), 4), rng.gamma(2.0, 5000.0, 4)))
+    prs.save(path)
+    return path
+
+
+def write_markdown(path, scale):
+    """A proposal-style document: headings, prose, a table per section and page breaks."""
+    rng = np.random.default_rng(2)
+    parts = ["# Nyrix AI Proposal (synthetic)\n"]
+    for i in range(BASE_MD_SECTIONS * scale):
+        parts.append(f"## {i + 1}. {LABELS[i % len(LABELS)]}\n")
+        parts.append("Margin defense analysis of the cost line, with the monthly figures below. " * 4 + "\n")
+        parts.append("| Item | Budget | Actual |\n|---|---|---|")
+        parts += [f"| {LABELS[j]} | {a:,.0f} | {b:,.0f} |"
+                  for j, a, b in zip(rng.integers(0, len(LABELS), 5), rng.gamma(2, 5000, 5), rng.gamma(2, 5000, 5))]
+        parts.append("\n> Note: figures are synthetic.\n")
+        if i % 4 == 3:
+            parts.append("<!-- pagebreak -->\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return path
+
+
+def cached(data_dir, name, scale, writer):
+    """Path of a generated file, written once per scale and reused by later runs."""
+    os.makedirs(data_dir, exist_ok=True)
+    stem, ext = os.path.splitext(name)
+    path = os.path.join(data_dir, f"{stem}_v{DATA_VERSION}_x{scale}{ext}")
+    if not os.path.exists(path):
+        tmp = os.path.join(data_dir, f"{stem}_v{DATA_VERSION}_x{scale}.tmp{ext}")
+        writer(tmp, scale)
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,281 @@
+import argparse
+import math
+import re
+from collections import namedtuple
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from data_layer import load_snapshot, source_digest
+from scenario_engine import FUEL_RANGE
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+BREAKEVEN_SHEET = "breakeven 2023"
+LANDED_SHEET = "Landed Costs"
+
+# Raw material price axis (percent); widened when landed prices have moved further than this in a year
+RAW_RANGE = np.arange(-20, 21)
+MAX_RAW_RANGE = 50
+
+# "Description" label -> cost structure line in the break-even sheet, first match wins; subtotals
+# and ratios are skipped so nothing is counted twice
+BREAKEVEN_LABELS = (
+    ("skip", r"total|contribution|break.?even|margin|profit|per ton|/ ?ton|%"),
+    ("volume_t", r"(sales|despatch|dispatch).*(ton|qty|quantity|volume)|^volume"),
+    ("revenue", r"net (sales|revenue)|^sales$|revenue"),
+    ("fuel", r"fuel|power|hfo|gas|electric"),
+    ("raw_material", r"raw material|limestone|clay|gypsum|iron ore"),
+    ("other_variable", r"packing|bag|freight|distribution|variable"),
+    ("fixed", r"fixed|salar|wage|depreciation|overhead|insurance|admin|repair|maintenance"),
+)
+MONTH_LABEL = re.compile(r"^[A-Za-z]+-\d{2}$")
+MATERIAL_LABEL = re.compile(r"\(RM-\d+\)")
+
+BreakevenSurface = namedtuple("BreakevenSurface", ["fuel", "raw", "volume_t", "price_per_t", "safety_pct"])
+CostCurve = namedtuple("CostCurve", ["volume_t", "marginal_per_t", "average_per_t", "price_per_t", "breakeven_t"])
+
+
+@dataclass(frozen=True)
+class CostStructure:
+    """Volume, price and per-ton variable costs of one period; money in currency units."""
+    volume_t: float
+    price_per_t: float
+    fuel_per_t: float
+    raw_material_per_t: float
+    other_variable_per_t: float
+    fixed_costs: float
+    source: str = "snapshot"
+
+    @property
+    def variable_per_t(self):
+        return self.fuel_per_t + self.raw_material_per_t + self.other_variable_per_t
+
+    @property
+    def contribution_per_t(self):
+        return self.price_per_t - self.variable_per_t
+
+    @property
+    def breakeven_volume_t(self):
+        return self.fixed_costs / self.contribution_per_t if self.contribution_per_t > 0 else math.inf
+
+    @property
+    def breakeven_price_per_t(self):
+        return self.variable_per_t + self.fixed_costs / self.volume_t
+
+    @property
+    def safety_pct(self):
+        """Margin of safety: how far sales can fall (%) before the period makes a loss."""
+        return (self.volume_t - self.breakeven_volume_t) / self.volume_t * 100
+
+
+def from_snapshot(snapshot):
+    """P&L lines of the snapshot (millions) over the month's cement tons; distribution is treated as variable."""
+    scale = 1e6 / snapshot.cement_t
+    return CostStructure(
+        volume_t=snapshot.cement_t,
+        price_per_t=snapshot.net_revenue * scale,
+        fuel_per_t=snapshot.power_fuel * scale,
+        raw_material_per_t=snapshot.raw_material * scale,
+        other_variable_per_t=snapshot.distribution * scale,
+        fixed_costs=snapshot.fixed_costs * 1e6,
+    )
+
+
+def _label(value):
+    return re.sub(r"\s+", " ", str(value)).strip().lower() if pd.notna(value) else ""
+
+
+def parse_breakeven_sheet(df):
+    """Cost structure from the latest 'Actual' column of the break-even sheet (its 'Estimated' one if none)."""
+    header = next((r for r in range(min(len(df), 15)) if "description" in [_label(v) for v in df.iloc[r]]), None)
+    if header is None:
+        raise ValueError("no 'Description' header")
+    labels = [_label(v) for v in df.iloc[header]]
+    desc = labels.index("description")
+    value_col = next((c for c, v in enumerate(labels) if v == "actual"),
+                     next((c for c, v in enumerate(labels) if v == "estimated"), None))
+    if value_col is None:
+        raise ValueError("no 'Actual' or 'Estimated' column")
+
+    totals = dict.fromkeys(("volume_t", "revenue", "fuel", "raw_material", "other_variable", "fixed"), 0.0)
+    found = set()
+    for r in range(header + 1, len(df)):
+        label = _label(df.iat[r, desc])
+        value = pd.to_numeric(df.iat[r, value_col], errors="coerce")
+        if not label or pd.isna(value):
+            continue
+        line = next((name for name, pattern in BREAKEVEN_LABELS if re.search(pattern, label)), None)
+        if line is None or line == "skip":
+            continue
+        totals[line] += abs(float(value))
+        found.add(line)
+
+    missing = {"volume_t", "revenue", "fixed"} - found
+    if missing or not found & {"fuel", "raw_material", "other_variable"}:
+        raise ValueError(f"lines not found: {', '.join(sorted(missing)) or 'variable costs'}")
+    volume = totals["volume_t"]
+    return CostStructure(
+        volume_t=volume,
+        price_per_t=totals["revenue"] / volume,
+        fuel_per_t=totals["fuel"] / volume,
+        raw_material_per_t=totals["raw_material"] / volume,
+        other_variable_per_t=totals["other_variable"] / volume,
+        fixed_costs=totals["fixed"],
+        source=BREAKEVEN_SHEET,
+    )
+
+
+def parse_landed_rates(df):
+    """Landed purchase rate per material and month (material x month, latest month first)."""
+    header = next((r for r in range(min(len(df), 15)) if "description" in [_label(v) for v in df.iloc[r]]), None)
+    if header is None:
+        raise ValueError("no 'Description' header")
+    months = [(c, str(v).strip()) for c, v in enumerate(df.iloc[header]) if MONTH_LABEL.match(str(v).strip())]
+    if not months:
+        raise ValueError("no month columns")
+
+    numbers = df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    starts = [r for r in range(header + 1, len(df)) if MATERIAL_LABEL.search(str(df.iat[r, 1]))]
+    rates = {}
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(df)
+        sub = [_label(v) for v in df.iloc[start]]
+        # Each month's rate sits under the first "Rate" subheading at or after the month label
+        cols = [next((k for k in range(c, len(sub)) if sub[k] == "rate"), c) for c, _ in months]
+        block = numbers[start + 1:end, cols]
+        block[block <= 0] = np.nan
+        name = MATERIAL_LABEL.sub("", str(df.iat[start, 1])).strip()
+        if np.isfinite(block).any():
+            with np.errstate(all="ignore"):
+                rates[name] = np.nanmean(block, axis=0)
+    if not rates:
+        raise ValueError("no material rates")
+    return pd.DataFrame(rates, index=[m for _, m in months]).T
+
+
+def landed_moves(rates, months=12):
+    """Latest landed rate per material and its change (%) against the prior month and `months` back."""
+    latest = rates.iloc[:, 0]
+
+    def change(k):
+        if rates.shape[1] <= k:
+            return pd.Series(np.nan, index=rates.index)
+        return (latest / rates.iloc[:, k] - 1) * 100
+    return pd.DataFrame({"Latest Rate": latest, "vs Prior Month (%)": change(1), f"vs {months} Months (%)": change(months)})
+
+
+def raw_range(rates=None, months=12):
+    """Raw material price axis: +/-20%, widened to the largest move in landed rates over `months`."""
+    if rates is None or rates.empty:
+        return RAW_RANGE
+    moves = landed_moves(rates, months).iloc[:, 2].abs()
+    limit = int(min(MAX_RAW_RANGE, max(RAW_RANGE[-1], math.ceil(moves.max()) if moves.notna().any() else 0)))
+    return np.arange(-limit, limit + 1)
+
+
+class BreakevenModel:
+    """Break-even volume/price over every fuel x raw material price combination.
+
+    The fuel and raw material axes are kept as per-ton cost vectors; moving one input
+    recomputes only the vector it feeds, and the surface is one broadcast over the two.
+    """
+
+    def __init__(self, structure, fuel=FUEL_RANGE, raw=RAW_RANGE):
+        self.structure = structure
+        self.fuel = np.asarray(fuel, dtype=float)
+        self.raw = np.asarray(raw, dtype=float)
+        self._refresh({"fuel_per_t", "raw_material_per_t"})
+
+    def _refresh(self, fields):
+        if "fuel_per_t" in fields:
+            self._fuel_cost = self.structure.fuel_per_t * (1 + self.fuel / 100)
+        if "raw_material_per_t" in fields:
+            self._raw_cost = self.structure.raw_material_per_t * (1 + self.raw / 100)
+
+    def update(self, **changes):
+        """Moves one or more CostStructure inputs and returns the new surface."""
+        self.structure = replace(self.structure, **changes)
+        self._refresh(changes)
+        return self.surface()
+
+    def variable_per_t(self, fuel_pct=None, raw_pct=None):
+        """Variable cost per ton on the whole grid, or at one fuel/raw price point (percent)."""
+        s = self.structure
+        if fuel_pct is None:
+            return s.other_variable_per_t + self._fuel_cost[:, None] + self._raw_cost[None, :]
+        return (s.other_variable_per_t + s.fuel_per_t * (1 + fuel_pct / 100)
+                + s.raw_material_per_t * (1 + raw_pct / 100))
+
+    def surface(self):
+        """Surfaces indexed [fuel, raw]; volume is inf where price no longer covers variable cost."""
+        s = self.structure
+        variable = self.variable_per_t()
+        contribution = s.price_per_t - variable
+        with np.errstate(divide="ignore"):
+            volume = np.where(contribution > 0, s.fixed_costs / np.where(contribution > 0, contribution, 1), np.inf)
+        price = variable + s.fixed_costs / s.volume_t
+        safety = (s.volume_t - volume) / s.volume_t * 100
+        return BreakevenSurface(self.fuel, self.raw, volume, price, safety)
+
+    def cost_curve(self, fuel_pct=0.0, raw_pct=0.0, volumes=None):
+        """Marginal and average cost per ton against sales volume at one fuel/raw price point.
+
+        The sheet's cost structure is linear, so the marginal cost per ton is flat and the
+        average cost falls towards it as fixed costs spread; break-even is where it meets price.
+        """
+        s = self.structure
+        volumes = np.linspace(0.2, 1.5, 66) * s.volume_t if volumes is None else np.asarray(volumes, dtype=float)
+        marginal = self.variable_per_t(fuel_pct, raw_pct)
+        contribution = s.price_per_t - marginal
+        breakeven = s.fixed_costs / contribution if contribution > 0 else math.inf
+        return CostCurve(volumes, np.full(volumes.shape, marginal), marginal + s.fixed_costs / volumes,
+                         s.price_per_t, breakeven)
+
+
+def load_cost_structure(path=WORKBOOK_PATH):
+    """From the break-even sheet, else from the snapshot's P&L lines."""
+    if source_digest(path) is not None:
+        try:
+            return parse_breakeven_sheet(read_sheet(BREAKEVEN_SHEET, path))
+        except (KeyError, ValueError, IndexError, ZeroDivisionError) as e:
+            print(f"'{BREAKEVEN_SHEET}' sheet not usable, using the P&L snapshot: {e}")
+    return from_snapshot(load_snapshot(path))
+
+
+def load_landed_rates(path=WORKBOOK_PATH):
+    """Landed rate history, or an empty frame when the sheet isn't available."""
+    if source_digest(path) is not None:
+        try:
+            return parse_landed_rates(read_sheet(LANDED_SHEET, path))
+        except (KeyError, ValueError, IndexError) as e:
+            print(f"'{LANDED_SHEET}' sheet not usable: {e}")
+    return pd.DataFrame()
+
+
+def load_model(path=WORKBOOK_PATH):
+    return BreakevenModel(load_cost_structure(path), raw=raw_range(load_landed_rates(path)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Break-even volume and price under fuel and raw material price moves.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--fuel", type=float, default=0.0, help="Fuel price change (%%)")
+    parser.add_argument("--raw", type=float, default=0.0, help="Raw material price change (%%)")
+    args = parser.parse_args()
+
+    try:
+        model = load_model(args.path)
+        s = model.structure
+        print(f"Cost structure ({s.source}): {s.volume_t:,.0f} t at {s.price_per_t:,.2f}/t, "
+              f"variable {s.variable_per_t:,.2f}/t, fixed {s.fixed_costs:,.0f}")
+        curve = model.cost_curve(args.fuel, args.raw)
+        print(f"Fuel {args.fuel:+.0f}%, raw material {args.raw:+.0f}%: break-even {curve.breakeven_t:,.0f} t "
+              f"({(1 - curve.breakeven_t / s.volume_t) * 100:.1f}% margin of safety), "
+              f"break-even price {curve.marginal_per_t[0] + s.fixed_costs / s.volume_t:,.2f}/t")
+        surface = model.surface()
+        feasible = np.isfinite(surface.volume_t)
+        print(f"Surface {surface.volume_t.shape[0]} x {surface.volume_t.shape[1]}: "
+              f"{(~feasible).sum()} combinations where price no longer covers variable cost")
+    except Exception as e:
+        print(f"Error: {e}")
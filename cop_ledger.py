@@ -0,0 +1,215 @@
+import argparse
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_layer import COP_SHEET, cop_blocks, cop_header_row, cop_rows, load_snapshot, source_digest
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+RECEIPT, ISSUE = 1, -1
+
+# COP sheet blocks that move stock, in the order they post within the month: (name, direction, header pattern).
+# "Total", "Closing Stock" and the factor blocks are derived from these, not movements of their own.
+MOVEMENTS = (
+    ("Opening Stock", RECEIPT, r"opening stock"),
+    ("Internal Transfer", RECEIPT, r"internal transfer"),
+    ("Purchase", RECEIPT, r"stock inward"),
+    ("Stock outward", ISSUE, r"stock outward$"),
+    ("Capitalisation", ISSUE, r"stock \(for capitali"),
+    ("Pre-heating", ISSUE, r"hfo issued for pre-heating"),
+    ("Sale", ISSUE, r"stock outward \(for sale\)"),
+    ("Moisture Loss", ISSUE, r"moisture loss"),
+)
+CLOSING_PATTERN = r"closing stock"
+# Quantities below this are rounding residue in the sheet (e.g. 1e-11 t), not stock to average over
+MIN_QTY = 1e-6
+
+Position = namedtuple("Position", ["qty", "amount", "wac", "issue_rate"])
+
+
+def _safe_rate(amount, qty):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(qty > MIN_QTY, amount / np.where(qty > MIN_QTY, qty, 1), 0.0)
+
+
+class Ledger:
+    """Material x movement quantities and amounts with moving weighted-average costing.
+
+    Receipts add their signed quantity and amount to the running balance; issues leave at the running
+    average, so the closing stock is valued at the weighted-average cost. Balances are computed
+    for all materials at once, one movement column at a time; editing a movement recomputes only
+    that material from that movement on.
+    """
+
+    def __init__(self, materials, movements, kinds, qty, amount, sheet_closing=None):
+        self.materials = list(materials)
+        self.movements = list(movements)
+        self.kinds = np.asarray(kinds, dtype=np.int8)
+        # Receipt blocks keep their sign (a negative internal transfer is stock sent out); issue blocks are
+        # booked positive or negative depending on the sheet, so only they are normalised
+        self.qty = np.asarray(qty, dtype=float).copy()
+        self.amount = np.asarray(amount, dtype=float).copy()
+        issues = self.kinds == ISSUE
+        self.qty[:, issues] = np.abs(self.qty[:, issues])
+        self.amount[:, issues] = np.abs(self.amount[:, issues])
+        self.sheet_closing = sheet_closing
+        self._rows = {name: i for i, name in enumerate(self.materials)}
+        self._cols = {name: j for j, name in enumerate(self.movements)}
+
+        shape = self.qty.shape
+        self.balance_qty = np.zeros(shape)
+        self.balance_amount = np.zeros(shape)
+        self.wac = np.zeros(shape)
+        self.issue_cost = np.zeros(shape)
+        self._roll(slice(None), 0)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Parses the raw (header=None) COP sheet."""
+        blocks = cop_blocks(df)
+        labels = list(blocks)
+
+        def block(pattern):
+            return next((blocks[label] for label in labels if re.match(pattern, label, re.IGNORECASE)), None)
+
+        found = [(name, kind, block(pattern)) for name, kind, pattern in MOVEMENTS]
+        found = [(name, kind, cols) for name, kind, cols in found if cols is not None]
+        if not found or found[0][0] != "Opening Stock":
+            raise ValueError("COP sheet: no 'Opening Stock' block")
+
+        first = cop_header_row(df) + 2
+        rows = {label: r for label, r in cop_rows(df).items() if r >= first and not label.lower().startswith("total")}
+        numbers = df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        index = list(rows.values())
+        qty = np.nan_to_num(numbers[np.ix_(index, [cols[0] for _, _, cols in found])])
+        amount = np.nan_to_num(numbers[np.ix_(index, [cols[1] for _, _, cols in found])])
+
+        # Only rows that actually hold stock: section titles and notes carry no numbers
+        keep = (qty != 0).any(axis=1) | (amount != 0).any(axis=1)
+        closing = block(CLOSING_PATTERN)
+        sheet_closing = None
+        if closing is not None:
+            sheet_closing = np.nan_to_num(numbers[np.ix_(index, closing[:2])])[keep]
+        return cls(np.array(list(rows), dtype=object)[keep], [name for name, _, _ in found],
+                   [kind for _, kind, _ in found], qty[keep], amount[keep], sheet_closing)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Opening stock of the raw-mix materials only, for when the sheet itself isn't available."""
+        materials = snapshot.raw_materials
+        return cls([m.name for m in materials], ["Opening Stock"], [RECEIPT],
+                   [[m.qty] for m in materials], [[m.amount] for m in materials])
+
+    def _roll(self, rows, start):
+        """Recomputes balances for `rows` from movement column `start` to the end."""
+        if start == 0:
+            qty = np.zeros(self.qty[rows, 0].shape)
+            amount = np.zeros_like(qty)
+        else:
+            qty = self.balance_qty[rows, start - 1].copy()
+            amount = self.balance_amount[rows, start - 1].copy()
+        for j in range(start, len(self.movements)):
+            if self.kinds[j] == RECEIPT:
+                qty = qty + self.qty[rows, j]
+                amount = amount + self.amount[rows, j]
+                self.issue_cost[rows, j] = 0.0
+            else:
+                cost = self.qty[rows, j] * _safe_rate(amount, qty)
+                self.issue_cost[rows, j] = cost
+                qty = qty - self.qty[rows, j]
+                amount = amount - cost
+            self.balance_qty[rows, j] = qty
+            self.balance_amount[rows, j] = amount
+            self.wac[rows, j] = _safe_rate(amount, qty)
+
+    def edit(self, material, movement, qty=None, amount=None):
+        """Changes one movement and rebalances that material from there on; returns its new Position."""
+        i, j = self._rows[material], self._cols[movement]
+        sign = abs if self.kinds[j] == ISSUE else float
+        if qty is not None:
+            self.qty[i, j] = sign(qty)
+        if amount is not None:
+            self.amount[i, j] = sign(amount)
+        self._roll([i], j)
+        return self.position(material)
+
+    def position(self, material):
+        i = self._rows[material]
+        return Position(float(self.balance_qty[i, -1]), float(self.balance_amount[i, -1]), float(self.wac[i, -1]),
+                        float(self.issue_rates([material])[0]))
+
+    def issue_rates(self, materials=None):
+        """Weighted-average cost per ton once all receipts are in: the rate the month's issues are charged at."""
+        receipts = np.flatnonzero(self.kinds == RECEIPT)
+        rates = self.wac[:, receipts[-1]]
+        if materials is None:
+            return rates
+        return np.array([rates[self._rows[m]] for m in materials])
+
+    @property
+    def closing_qty(self):
+        return self.balance_qty[:, -1]
+
+    @property
+    def closing_amount(self):
+        return self.balance_amount[:, -1]
+
+    def summary(self):
+        """One row per material: receipts, issues at average cost, closing stock and the sheet's own closing."""
+        receipts, issues = self.kinds == RECEIPT, self.kinds == ISSUE
+        df = pd.DataFrame({
+            "Received (Qty)": self.qty[:, receipts].sum(axis=1),
+            "Received (Amount)": self.amount[:, receipts].sum(axis=1),
+            "Issued (Qty)": self.qty[:, issues].sum(axis=1),
+            "Issued at WAC": self.issue_cost[:, issues].sum(axis=1),
+            "WAC / Ton": self.issue_rates(),
+            "Closing (Qty)": self.closing_qty,
+            "Closing (Amount)": self.closing_amount,
+        }, index=pd.Index(self.materials, name="Material"))
+        if self.sheet_closing is not None:
+            df["Sheet Closing (Qty)"] = self.sheet_closing[:, 0]
+            df["Sheet Closing (Amount)"] = self.sheet_closing[:, 1]
+        return df
+
+    def to_frame(self):
+        """Long format: one row per material and movement with the running balance after it."""
+        m, k = self.qty.shape
+        return pd.DataFrame({
+            "material": np.repeat(self.materials, k),
+            "movement": np.tile(self.movements, m),
+            "qty": self.qty.ravel() * np.tile(self.kinds, m),
+            "amount": np.where(np.tile(self.kinds, m) == RECEIPT, self.amount.ravel(), -self.issue_cost.ravel()),
+            "balance_qty": self.balance_qty.ravel(),
+            "balance_amount": self.balance_amount.ravel(),
+            "wac": self.wac.ravel(),
+        })
+
+
+def load_ledger(path=WORKBOOK_PATH):
+    """Ledger of the COP sheet, or of the snapshot's opening stock when the workbook can't be used."""
+    if source_digest(path) is not None:
+        try:
+            return Ledger.from_frame(read_sheet(COP_SHEET, path))
+        except (KeyError, ValueError, IndexError) as e:
+            print(f"COP sheet not usable for the stock ledger: {e}")
+    return Ledger.from_snapshot(load_snapshot(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weighted-average stock ledger of the COP sheet.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--material", help="Show the movements of one material")
+    args = parser.parse_args()
+
+    try:
+        ledger = load_ledger(args.path)
+        print(f"{len(ledger.materials)} materials x {len(ledger.movements)} movements ({', '.join(ledger.movements)})\n")
+        if args.material:
+            df = ledger.to_frame()
+            print(df[df["material"] == args.material].drop(columns="material").to_markdown(index=False, floatfmt=",.4f"))
+        else:
+            print(ledger.summary().to_markdown(floatfmt=",.2f"))
+    except Exception as e:
+        print(f"Error: {e}")
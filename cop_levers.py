@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Clinker factor lever (COP Deep Dive, section 3): rule-of-thumb strength model and per-ton costs
+BASE_CLINKER_PCT = 83.1
+BASE_STRENGTH_MPA = 53.0  # Strong OPC
+STRENGTH_LOSS_PER_PCT = 0.6  # MPa lost per point of clinker factor below the base
+MIN_STRENGTH_MPA = 42.5  # Standard: below this the cement is unsellable
+PREMIUM_STRENGTH_MPA = 45.0  # Below this the safety margin for premium markets is thin
+CLINKER_COST_PER_TON = 35.0
+ADDITIVE_COST_PER_TON = 2.5
+
+# Packing lever (section 4): breakage by paper bag GSM, bag cost sensitivity and wasted cement per broken bag
+BREAKAGE_PCT = {70: 4.5, 75: 2.5, 80: 1.2, 85: 0.8}
+BASE_GSM = 80
+GSM_COST_FACTOR = 0.006
+WASTE_PER_BROKEN_BAG = 0.5
+
+# status: 0 = fails the standard, 1 = quality risk, 2 = approved
+ClinkerFactor = namedtuple("ClinkerFactor", ["strength_mpa", "strength_penalty_mpa", "status", "savings"])
+Packing = namedtuple("Packing", ["breakage_pct", "bag_cost", "spend", "base_spend", "saving"])
+
+FAIL, RISK, APPROVED = 0, 1, 2
+
+
+def clinker_factor(target_clinker_pct, cement_t, base_clinker_pct=BASE_CLINKER_PCT):
+    """Projected 28-day strength and monthly savings of a target clinker factor (%).
+
+    Broadcasts like NumPy arrays; a mix that fails the strength standard saves nothing because
+    it can't be sold.
+    """
+    target = np.asarray(target_clinker_pct, dtype=float)
+    penalty = (base_clinker_pct - target) * STRENGTH_LOSS_PER_PCT
+    strength = BASE_STRENGTH_MPA - penalty
+    status = np.where(strength < MIN_STRENGTH_MPA, FAIL, np.where(strength < PREMIUM_STRENGTH_MPA, RISK, APPROVED))
+
+    base_spend = cement_t * (base_clinker_pct / 100 * CLINKER_COST_PER_TON
+                             + (100 - base_clinker_pct) / 100 * ADDITIVE_COST_PER_TON)
+    new_spend = cement_t * (target / 100 * CLINKER_COST_PER_TON + (100 - target) / 100 * ADDITIVE_COST_PER_TON)
+    savings = np.where(status == FAIL, 0.0, base_spend - new_spend)
+    return ClinkerFactor(strength, penalty, status, savings)
+
+
+def packing(bag_gsm, total_bags, avg_bag_cost):
+    """Net packing saving of a paper bag GSM against today's 80 GSM bag, breakage included.
+
+    Lighter bags are cheaper but break more often; a broken bag costs the bag plus the cement
+    lost with it. GSM values between the tabulated grades are interpolated.
+    """
+    gsm = np.asarray(bag_gsm, dtype=float)
+    grades = np.array(sorted(BREAKAGE_PCT), dtype=float)
+    breakage = np.interp(gsm, grades, [BREAKAGE_PCT[g] for g in sorted(BREAKAGE_PCT)])
+    bag_cost = avg_bag_cost * (1.0 - (BASE_GSM - gsm) * GSM_COST_FACTOR)
+
+    spend = total_bags * bag_cost + total_bags * breakage / 100 * (bag_cost + WASTE_PER_BROKEN_BAG)
+    base_spend = (total_bags * avg_bag_cost
+                  + total_bags * BREAKAGE_PCT[BASE_GSM] / 100 * (avg_bag_cost + WASTE_PER_BROKEN_BAG))
+    return Packing(breakage, bag_cost, spend, base_spend, base_spend - spend)
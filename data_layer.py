@@ -0,0 +1,252 @@
+import os
+import re
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from workbook_cache import WORKBOOK_PATH, file_digest, read_sheet
+
+PL_SHEET = "P&L H V1"
+COP_SHEET = "COP"
+
+# The six raw-mix materials listed in the COP sheet, in sheet order
+RAW_MIX_MATERIALS = (
+    "Limestones (Low Sulpher)",
+    "Limestones (High Sulpher)",
+    "Clay",
+    "Iron Ore",
+    "Bauxite",
+    "Silica Sand",
+)
+
+# P&L line -> label pattern in the "Particulars" column of "P&L H V1"
+PL_LABELS = {
+    "net_revenue": r"^net (?:sales|revenue)",
+    "raw_material": r"raw material",
+    "power_fuel": r"power\s*(?:&|and)\s*fuel|fuel\s*(?:&|and)\s*power",
+    "distribution": r"distribution|selling",
+    "fixed_costs": r"fixed (?:cost|overhead)",
+    "net_profit": r"net (?:profit|income)|profit after tax",
+}
+PL_COSTS = ("raw_material", "power_fuel", "distribution", "fixed_costs")
+# Currency named in the P&L headings ("Amount in USD", "PKR Million", ...) -> code
+CURRENCIES = {r"\busd\b|us\s*\$|\$": "USD", r"\bpkr\b|\brs\.?\b|rupees": "PKR", r"\biqd\b|dinar": "IQD",
+              r"\beur\b|€": "EUR"}
+
+
+@dataclass(frozen=True)
+class Material:
+    name: str
+    qty: float
+    amount: float
+    cost_per_ton: float
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable figures behind the dashboard for one workbook (P&L lines in millions)."""
+    period: str
+    currency: str
+    net_revenue: float
+    raw_material: float
+    power_fuel: float
+    distribution: float
+    fixed_costs: float
+    net_profit: float
+    prior_gross_margin_pct: float
+    clinker_production_t: float
+    raw_materials: Tuple[Material, ...]
+    total_raw_mix_t: float
+    cement_t: float
+    paper_bags: float
+    paper_bag_cost: float
+    hfo_pg_liters: float
+    gas_pg_nm3: float
+    hfo_price_per_liter: float
+    gas_price_per_nm3: float
+    source: str = "defaults"
+    digest: Optional[str] = None
+    # What was actually read from the workbook ("pl", "cop", "period"); everything else is DEFAULT_SNAPSHOT
+    parts: Tuple[str, ...] = ()
+
+    @property
+    def gross_profit(self):
+        return self.net_revenue - self.raw_material - self.power_fuel
+
+    @property
+    def gross_margin_pct(self):
+        return self.gross_profit / self.net_revenue * 100 if self.net_revenue else 0.0
+
+    @property
+    def net_margin_pct(self):
+        return self.net_profit / self.net_revenue * 100 if self.net_revenue else 0.0
+
+    def material(self, name):
+        for m in self.raw_materials:
+            if m.name == name:
+                return m
+        raise KeyError(name)
+
+    def pl_table(self):
+        """Six-line P&L summary shown under the waterfall."""
+        return pd.DataFrame({
+            "Category": ["Net Revenue", "Raw Material Cost", "Power & Fuel", "Distribution Cost", "Fixed Costs", "Net Profit"],
+            "Amount_Millions": [self.net_revenue, self.raw_material, self.power_fuel, self.distribution, self.fixed_costs, self.net_profit],
+            "Type": ["Revenue", "Cost", "Cost", "Cost", "Cost", "Profit"],
+        })
+
+
+# Figures previously typed into demo_app.py: the P&L lines are the waterfall recalculated to the
+# 23.20% gross margin from the board deck, the rest come from the Jan-26 "COP" sheet.
+DEFAULT_SNAPSHOT = Snapshot(
+    period="Jan 2026",
+    currency="PKR",
+    net_revenue=8500.0,
+    raw_material=2900.0,
+    power_fuel=3628.0,
+    distribution=800.0,
+    fixed_costs=600.0,
+    net_profit=572.0,
+    prior_gross_margin_pct=24.87,
+    clinker_production_t=145000.0,
+    raw_materials=(
+        Material("Limestones (Low Sulpher)", 2651296.196, 4884913.398, 1.8425),
+        Material("Limestones (High Sulpher)", 123969.065, 224011.646, 1.8070),
+        Material("Clay", 243417.153, 575109.360, 2.3626),
+        Material("Iron Ore", 57343.639, 2528202.054, 44.0886),
+        Material("Bauxite", 537.252, 24587.169, 45.7647),
+        Material("Silica Sand", 2321.8, 5507.119, 2.3719),
+    ),
+    total_raw_mix_t=3078885.104,
+    cement_t=135686.0,
+    paper_bags=2100000.0,
+    paper_bag_cost=0.1955,
+    hfo_pg_liters=16317987.0,
+    gas_pg_nm3=479768.0,
+    hfo_price_per_liter=0.11869,
+    gas_price_per_nm3=0.06711,
+)
+
+
+def source_digest(path=WORKBOOK_PATH):
+    """Cache key for the dashboard: the workbook's hash, or None when it isn't available."""
+    return file_digest(path) if os.path.exists(path) else None
+
+
+def _label(value):
+    return re.sub(r"\s+", " ", str(value)).strip() if pd.notna(value) else ""
+
+
+def _num(value):
+    value = pd.to_numeric(value, errors="coerce")
+    return float(value) if pd.notna(value) else 0.0
+
+
+def cop_header_row(df):
+    """Row index of the COP block headers (Opening Stock, Internal Transfer, ...)."""
+    for r in range(min(len(df), 15)):
+        if "Opening Stock" in [_label(v) for v in df.iloc[r]]:
+            return r
+    raise ValueError("COP sheet: 'Opening Stock' header row not found")
+
+
+def cop_blocks(df):
+    """Column positions of the Opening / Transfer / Purchase blocks: {block: (qty, amount, rate)}."""
+    r = cop_header_row(df)
+    labels = [_label(v) for v in df.iloc[r]]
+    units = [_label(v) for v in df.iloc[r + 1]] if r + 1 < len(df) else []
+    starts = [c for c, v in enumerate(labels) if v]
+    blocks = {}
+    for i, start in enumerate(starts[1:], 1):
+        end = starts[i + 1] if i + 1 < len(starts) else len(labels)
+        rate = next((c for c in range(start + 2, end) if units[c].startswith("/")), start + 2)
+        blocks[labels[start]] = (start, start + 1, rate)
+    return blocks
+
+
+def cop_rows(df):
+    """Material label (unit suffix stripped) -> row index in the COP sheet."""
+    rows = {}
+    for r, value in enumerate(df.iloc[:, 0]):
+        label = re.sub(r"\s*-\s*\([^)]*\)\s*$", "", _label(value))
+        if label and label not in rows:
+            rows[label] = r
+    return rows
+
+
+def _from_cop(df, snapshot):
+    blocks = cop_blocks(df)
+    rows = cop_rows(df)
+    oq, oa, orate = blocks["Opening Stock"]
+    inward = next((v for k, v in blocks.items() if k.startswith("Stock inward")), None)
+    if inward is None:
+        raise ValueError("COP sheet: no 'Stock inward' block")
+    pq, pa, prate = inward
+    cell = lambda label, col: _num(df.iat[rows[label], col]) if label in rows else 0.0
+
+    materials = tuple(
+        Material(name, cell(name, oq), cell(name, oa), cell(name, orate)) for name in RAW_MIX_MATERIALS
+    )
+    title = _label(df.iat[1, 0])
+    parts = snapshot.parts + (("cop", "period") if "-" in title else ("cop",))
+    period = title.split("-", 1)[1].strip() if "-" in title else snapshot.period
+    return replace(
+        snapshot,
+        period=period,
+        parts=parts,
+        raw_materials=materials,
+        total_raw_mix_t=cell("Total Issued for Raw Mix", oq),
+        clinker_production_t=cell("Clinker (raw material cost)", pq) or snapshot.clinker_production_t,
+        cement_t=cell("Cement", pq),
+        paper_bags=cell("Paper bags -Total", pq),
+        paper_bag_cost=cell("Paper bags -Total", prate),
+        hfo_pg_liters=cell("HFO for PG", oq),
+        gas_pg_nm3=cell("N.Gas - PG", pq),
+        hfo_price_per_liter=cell("HFO for PG", prate) or snapshot.hfo_price_per_liter,
+        gas_price_per_nm3=cell("N.Gas - PG", prate) or snapshot.gas_price_per_nm3,
+    )
+
+
+def _from_pl(df, snapshot):
+    """Takes the 'Grand Total' column of each P&L line; all lines must be found or none are used."""
+    total_col = None
+    for r in range(min(len(df), 15)):
+        labels = [_label(v).lower() for v in df.iloc[r]]
+        if "grand total" in labels:
+            total_col = labels.index("grand total")
+            break
+    if total_col is None:
+        return snapshot
+
+    text = df.iloc[:, :total_col].apply(lambda col: col.map(_label)).agg(" ".join, axis=1).str.strip().str.lower()
+    found = {}
+    for field, pattern in PL_LABELS.items():
+        hits = text[text.str.contains(pattern, regex=True)]
+        if hits.empty:
+            return snapshot
+        found[field] = _num(df.iat[hits.index[0], total_col]) / 1e6
+    # Sheets that book costs as negatives are flipped as a whole; net profit keeps its sign (a loss stays a loss)
+    if sum(found[field] for field in PL_COSTS) < 0:
+        found.update({field: -found[field] for field in PL_COSTS})
+
+    headings = " ".join(_label(v) for v in df.iloc[:15].to_numpy().ravel()).lower()
+    currency = next((code for pattern, code in CURRENCIES.items() if re.search(pattern, headings)), snapshot.currency)
+    return replace(snapshot, currency=currency, parts=snapshot.parts + ("pl",), **found)
+
+
+def load_snapshot(path=WORKBOOK_PATH):
+    """Extracts the dashboard figures from the workbook; falls back to DEFAULT_SNAPSHOT when it's missing."""
+    digest = source_digest(path)
+    if digest is None:
+        return DEFAULT_SNAPSHOT
+    snapshot = replace(DEFAULT_SNAPSHOT, source="workbook", digest=digest)
+    try:
+        snapshot = _from_cop(read_sheet(COP_SHEET, path), snapshot)
+    except (KeyError, ValueError, IndexError) as e:
+        print(f"COP sheet not usable, keeping defaults: {e}")
+    try:
+        snapshot = _from_pl(read_sheet(PL_SHEET, path), snapshot)
+    except (KeyError, ValueError, IndexError) as e:
+        print(f"P&L sheet not usable, keeping defaults: {e}")
+    return snapshot
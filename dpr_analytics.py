@@ -0,0 +1,255 @@
+import argparse
+import math
+import re
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+DPR_SHEET = "DPR"
+
+# Label patterns, most specific first: a sheet's own per-ton rows win over ratios we derive
+DPR_ROWS = [
+    ("kwh_per_ton", r"kwh\s*/\s*t"),
+    ("fuel_per_ton", r"(?:fuel|hfo|oil)[^/]*/\s*t"),
+    ("clinker_t", r"clinker"),
+    ("cement_t", r"cement"),
+    ("power_kwh", r"kwh|power|energy"),
+    ("fuel_l", r"hfo|fuel|oil"),
+    ("gas_nm3", r"gas|nm3"),
+]
+METRICS = ("kwh_per_ton", "fuel_per_ton")
+
+WINDOW = 7
+# Days of history needed before a day is scored (fewer makes the first week look anomalous)
+MIN_DAYS = 5
+Z_THRESHOLD = 2.5
+# Friday and Saturday: the weekend in Iraq
+WEEKEND_DAYS = (4, 5)
+
+
+def _is_date(value):
+    return hasattr(value, "year") and not isinstance(value, str)
+
+
+def load_dpr(path=WORKBOOK_PATH, sheet=DPR_SHEET):
+    """Daily time series from the DPR sheet, whichever way round its dates run.
+
+    Returns a date-indexed frame with the production/energy rows found plus kwh_per_ton and
+    fuel_per_ton (derived from totals when the sheet doesn't carry them).
+    """
+    df = read_sheet(sheet, path)
+    is_date = df.map(_is_date).to_numpy()
+
+    date_row = next((r for r in range(min(len(df), 40)) if is_date[r].sum() >= 7), None)
+    if date_row is not None:
+        # Dates across one header row; one metric per row below it
+        date_cols = np.flatnonzero(is_date[date_row])
+        dates = pd.to_datetime(df.iloc[date_row, date_cols].to_numpy())
+        body = df.iloc[date_row + 1:]
+        labels = body.iloc[:, :date_cols[0]].astype("string").fillna("").agg(" ".join, axis=1)
+        values = body.iloc[:, date_cols].T
+        values.index = dates
+        values.columns = labels.to_numpy()
+    else:
+        date_col = next((c for c in range(min(df.shape[1], 10)) if is_date[:, c].sum() >= 7), None)
+        if date_col is None:
+            raise ValueError("no date row or column in the DPR sheet")
+        # Dates down one column; headers are the (up to two) rows above the first date
+        date_rows = np.flatnonzero(is_date[:, date_col])
+        top = date_rows[0]
+        header = df.iloc[max(top - 2, 0):top].astype("string").fillna("").agg(" ".join, axis=0)
+        values = df.iloc[date_rows].drop(columns=date_col)
+        values.index = pd.to_datetime(df.iloc[date_rows, date_col].to_numpy())
+        values.columns = header.drop(index=date_col).to_numpy()
+
+    daily = pd.DataFrame(index=values.index.normalize())
+    labels = pd.Series([re.sub(r"\s+", " ", str(c)).strip().lower() for c in values.columns])
+    taken = set()
+    for field, pattern in DPR_ROWS:
+        for i in np.flatnonzero(labels.str.contains(pattern, regex=True).to_numpy()):
+            if i not in taken:
+                taken.add(i)
+                daily[field] = pd.to_numeric(values.iloc[:, i], errors="coerce").to_numpy()
+                break
+
+    running = daily.get("clinker_t", pd.Series(np.nan, index=daily.index))
+    running = running.where(running > 0)
+    if "kwh_per_ton" not in daily and "power_kwh" in daily:
+        daily["kwh_per_ton"] = daily["power_kwh"] / running
+    if "fuel_per_ton" not in daily and "fuel_l" in daily:
+        daily["fuel_per_ton"] = daily["fuel_l"] / running
+    daily = daily[~daily.index.duplicated(keep="last")].sort_index()
+    return daily.dropna(how="all")
+
+
+def rolling_zscores(series, window=WINDOW):
+    """Vectorized rolling mean/std of the previous `window` days and each day's z-score against them."""
+    series = series.dropna()
+    min_days = min(MIN_DAYS, window)
+    mean = series.rolling(window, min_periods=min_days).mean().shift(1)
+    std = series.rolling(window, min_periods=min_days).std().shift(1)
+    z = (series - mean) / std.where(std > 0)
+    return pd.DataFrame({"value": series, "rolling_mean": mean, "rolling_std": std, "z": z})
+
+
+def weekday_weekend(series):
+    """Mean, std and days for weekdays vs weekends."""
+    series = series.dropna()
+    weekend = np.isin(series.index.dayofweek, WEEKEND_DAYS)
+    return series.groupby(np.where(weekend, "Weekend", "Weekday")).agg(["mean", "std", "count"])
+
+
+def monthly_metrics(daily):
+    """Month-level DPR figures for the period store: totals, per-ton means and weekend gaps."""
+    metrics = {"dpr_days": float(len(daily))}
+    for col in ("clinker_t", "cement_t", "power_kwh"):
+        if col in daily:
+            metrics[f"dpr_{col}"] = float(daily[col].sum())
+    for m in METRICS:
+        if m in daily and daily[m].notna().any():
+            split = weekday_weekend(daily[m])["mean"]
+            metrics[f"dpr_{m}"] = float(daily[m].mean())
+            if {"Weekday", "Weekend"} <= set(split.index):
+                metrics[f"dpr_{m}_weekend_gap_pct"] = float((split["Weekend"] / split["Weekday"] - 1) * 100)
+    return metrics
+
+
+class RollingStat:
+    """Running statistics for one metric: O(1) per appended day.
+
+    A window of running sum / sum of squares gives the rolling mean and std, and separate
+    accumulators keep the weekday and weekend means for the whole history.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.groups = {False: [0, 0.0, 0.0], True: [0, 0.0, 0.0]}
+
+    @property
+    def mean(self):
+        return self.total / len(self.window) if self.window else math.nan
+
+    @property
+    def std(self):
+        n = len(self.window)
+        if n < 2:
+            return math.nan
+        return math.sqrt(max(self.total_sq - self.total ** 2 / n, 0.0) / (n - 1))
+
+    def push(self, value, weekend=False):
+        """Adds one day and returns its z-score against the days before it (NaN values are ignored)."""
+        if value is None or math.isnan(value):
+            return math.nan
+        std = self.std
+        scored = len(self.window) >= min(MIN_DAYS, self.window.maxlen)
+        z = (value - self.mean) / std if scored and std > 0 else math.nan
+        if len(self.window) == self.window.maxlen:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+        group = self.groups[bool(weekend)]
+        group[0] += 1
+        group[1] += value
+        group[2] += value * value
+        return z
+
+    def group_mean(self, weekend):
+        n, s, _ = self.groups[bool(weekend)]
+        return s / n if n else math.nan
+
+
+class DPRMonitor:
+    """Per-metric rolling statistics and anomaly flags over the daily DPR series."""
+
+    def __init__(self, metrics=METRICS, window=WINDOW, z_threshold=Z_THRESHOLD):
+        self.metrics = tuple(metrics)
+        self.window_size = window
+        self.z_threshold = z_threshold
+        self.stats = {m: RollingStat(window) for m in self.metrics}
+        self.latest = {}
+        self.anomalies = []
+
+    @classmethod
+    def from_frame(cls, daily, metrics=METRICS, window=WINDOW, z_threshold=Z_THRESHOLD):
+        """Loads a whole history with vectorized windows, leaving the state ready for O(1) appends."""
+        monitor = cls([m for m in metrics if m in daily], window, z_threshold)
+        for m in monitor.metrics:
+            series = daily[m].dropna()
+            if series.empty:
+                continue
+            scored = rolling_zscores(series, window)
+            flagged = scored[scored["z"].abs() >= z_threshold]
+            monitor.anomalies += [(d, m, row.value, row.z) for d, row in flagged.iterrows()]
+
+            stat = monitor.stats[m]
+            for value in series.iloc[-window:]:
+                stat.window.append(float(value))
+            tail = np.asarray(stat.window)
+            stat.total, stat.total_sq = float(tail.sum()), float((tail ** 2).sum())
+            weekend = np.isin(series.index.dayofweek, WEEKEND_DAYS)
+            for flag in (False, True):
+                part = series.to_numpy()[weekend == flag]
+                stat.groups[flag] = [len(part), float(part.sum()), float((part ** 2).sum())]
+            row = scored.iloc[-1]
+            monitor.latest[m] = (series.index[-1], float(row.value), float(row.z))
+        monitor.anomalies.sort(key=lambda a: a[0])
+        return monitor
+
+    def append(self, date, **values):
+        """Adds one day's figures; returns {metric: z-score} and records anomalies."""
+        date = pd.Timestamp(date)
+        weekend = date.dayofweek in WEEKEND_DAYS
+        scores = {}
+        for m in self.metrics:
+            value = values.get(m)
+            if value is None:
+                continue
+            z = self.stats[m].push(float(value), weekend)
+            scores[m] = z
+            self.latest[m] = (date, float(value), z)
+            if not math.isnan(z) and abs(z) >= self.z_threshold:
+                self.anomalies.append((date, m, float(value), z))
+        return scores
+
+    def summary(self):
+        """One row per metric: latest day, rolling mean/std, z-score, weekday/weekend means and anomaly count."""
+        rows = []
+        for m in self.metrics:
+            stat = self.stats[m]
+            date, value, z = self.latest.get(m, (None, math.nan, math.nan))
+            weekday, weekend = stat.group_mean(False), stat.group_mean(True)
+            rows.append({
+                "metric": m, "date": date, "latest": value, "rolling_mean": stat.mean, "rolling_std": stat.std,
+                "z": z, "weekday_mean": weekday, "weekend_mean": weekend,
+                "weekend_gap_pct": (weekend / weekday - 1) * 100 if weekday else math.nan,
+                "anomalies": sum(1 for a in self.anomalies if a[1] == m),
+            })
+        return pd.DataFrame(rows).set_index("metric")
+
+    def anomaly_table(self):
+        return pd.DataFrame(self.anomalies, columns=["date", "metric", "value", "z"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling statistics and anomalies from the DPR sheet.")
+    parser.add_argument("--workbook", default=WORKBOOK_PATH)
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--z", type=float, default=Z_THRESHOLD)
+    args = parser.parse_args()
+
+    daily = load_dpr(args.workbook)
+    monitor = DPRMonitor.from_frame(daily, window=args.window, z_threshold=args.z)
+    print(f"{len(daily)} days, {daily.index.min():%Y-%m-%d} to {daily.index.max():%Y-%m-%d}\n")
+    print(monitor.summary().to_markdown(floatfmt=".3f"))
+    anomalies = monitor.anomaly_table()
+    if not anomalies.empty:
+        print("\nAnomalies:")
+        print(anomalies.to_markdown(index=False, floatfmt=".3f"))
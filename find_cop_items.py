@@ -1,24 +1,18 @@
-import pandas as pd
+from workbook_cache import WORKBOOK_PATH, read_sheet
+from keyword_search import find_hits
+
+KEYWORDS = ['store', 'spare', 'cwip', 'fa', 'depreciation', 'fixed', 'power', 'electr']
 
 def search_cop():
     try:
-        df = pd.read_excel('NAS - PL  Jan 26-KAK.xlsx', sheet_name='COP', header=None)
-        
-        keywords = ['store', 'spare', 'cwip', 'fa', 'depreciation', 'fixed', 'power', 'electr']
+        df = read_sheet('COP')
         
         print(f"Total rows in COP sheet: {len(df)}")
         
-        found_rows = []
-        for index, row in df.iterrows():
-            row_str = str(row.values).lower()
-            for k in keywords:
-                if k in row_str:
-                    found_rows.append((index, row.iloc[0:5].values)) # Keep it brief
-                    break
-        
         print("\n--- Found Items ---")
-        for idx, content in found_rows:
-            print(f"Row {idx}: {content}")
+        # Matches come from the inverted index when index_files.py has indexed this workbook
+        for hit in find_hits(KEYWORDS, WORKBOOK_PATH, sheets=['COP']):
+            print(f"Row {hit.row}: {df.iloc[hit.row, 0:5].values}") # Keep it brief
             
         # Also print rows 60-120 to see what was missed after the first extracted batch
         print("\n--- Rows 60-100 Preview ---")
@@ -0,0 +1,736 @@
+import argparse
+import datetime
+import itertools
+import math
+import re
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from openpyxl import load_workbook
+from openpyxl.formula import Tokenizer
+from openpyxl.formula.tokenizer import Token
+from openpyxl.utils.cell import column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.utils.datetime import to_excel
+
+from profiling import section
+from workbook_cache import WORKBOOK_PATH
+
+# Sheets whose formulas make up the cost model; cells they reference on other sheets are loaded as inputs
+FORMULA_SHEETS = ("P&L H V1", "COP", "Clinker and Cement Costing", "Process Cost")
+ERRORS = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+CELL_REF = re.compile(r"[A-Z]{1,3}[0-9]+(:[A-Z]{1,3}[0-9]+)?")
+COLUMN_REF = re.compile(r"([A-Z]{1,3}):([A-Z]{1,3})")
+
+# changed: {cell: new value} for cells whose value moved; evaluated: formulas recalculated; stale: cells that
+# may be out of date because they are, or are computed from, formulas the engine can't evaluate (empty when
+# the recalculation is complete)
+Recalc = namedtuple("Recalc", ["changed", "evaluated", "ms", "stale"])
+
+_MISSING = object()
+
+# Excel results the engine must reproduce (run by --check): inputs on a scratch sheet, then formula -> value.
+# References, unlike literals, skip text, blanks and logicals inside SUM/AVERAGE/COUNT/MIN/MAX/AND/OR.
+EXCEL_CASES_INPUTS = {"A1": 10.0, "A3": "label", "A4": 20.0, "A5": True}
+EXCEL_CASES = {
+    "=SUM(A1,A3,A4)": 30.0,
+    "=SUM(A1:A5)": 30.0,
+    "=COUNT(A1,A2,A3,A4)": 2,
+    "=COUNT(A1:A5)": 2,
+    "=COUNT(1,\"2\",TRUE)": 3,
+    "=AVERAGE(A1,A2,A4)": 15.0,
+    "=MIN(A1,A3,A4)": 10.0,
+    "=MAX(A3,A5,A4)": 20.0,
+    "=SUM(A1,TRUE)": 11.0,
+    "=AND(A1,A3)": True,
+    "=A1+A2": 10.0,
+    "=A3&A2": "label",
+}
+
+
+class FormulaError(Exception):
+    """An Excel error value (#DIV/0!, #VALUE!, ...) raised while evaluating a formula."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class Unsupported(ValueError):
+    """A formula the engine can't evaluate; its cell keeps the value Excel cached."""
+
+
+# --- Excel value semantics ---
+
+def _scalar(v):
+    if isinstance(v, tuple):
+        if len(v) == 1 and len(v[0]) == 1:
+            return v[0][0]
+        raise FormulaError("#VALUE!")
+    return v
+
+
+def _num(v):
+    v = _scalar(v)
+    if v is None:
+        return 0.0
+    if isinstance(v, (bool, int, float)):
+        return v
+    if isinstance(v, (datetime.datetime, datetime.date)):
+        return to_excel(v)
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        raise FormulaError("#VALUE!")
+
+
+def _text(v):
+    v = _scalar(v)
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _bool(v):
+    v = _scalar(v)
+    if isinstance(v, str):
+        if v.upper() in ("TRUE", "FALSE"):
+            return v.upper() == "TRUE"
+        raise FormulaError("#VALUE!")
+    return bool(_num(v))
+
+
+def _comparable(a, b):
+    # Blank compares as 0, "" or FALSE depending on the other side; otherwise numbers < text < logicals
+    a, b = _scalar(a), _scalar(b)
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0
+
+    def rank(v):
+        if isinstance(v, bool):
+            return 2, v
+        if isinstance(v, str):
+            return 1, v.lower()
+        return 0, _num(v)
+    return rank(a), rank(b)
+
+
+def _div(a, b):
+    b = _num(b)
+    if b == 0:
+        raise FormulaError("#DIV/0!")
+    return _num(a) / b
+
+
+def _pow(a, b):
+    try:
+        return math.pow(_num(a), _num(b))
+    except (OverflowError, ValueError):
+        raise FormulaError("#NUM!")
+
+
+def _compare(test):
+    def run(a, b):
+        a, b = _comparable(a, b)
+        return test(a, b)
+    return run
+
+
+INFIX = {
+    "+": lambda a, b: _num(a) + _num(b),
+    "-": lambda a, b: _num(a) - _num(b),
+    "*": lambda a, b: _num(a) * _num(b),
+    "/": _div,
+    "^": _pow,
+    "&": lambda a, b: _text(a) + _text(b),
+    "=": _compare(lambda a, b: a == b),
+    "<>": _compare(lambda a, b: a != b),
+    "<": _compare(lambda a, b: a < b),
+    ">": _compare(lambda a, b: a > b),
+    "<=": _compare(lambda a, b: a <= b),
+    ">=": _compare(lambda a, b: a >= b),
+}
+PRECEDENCE = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+
+
+def _numbers(args):
+    """Numeric arguments the way SUM/AVERAGE/MIN/MAX see them.
+
+    References (ranges and single cells, both tuples) skip text, blanks and logicals; literals are coerced.
+    """
+    out = []
+    for a in args:
+        if isinstance(a, tuple):
+            out.extend(v for row in a for v in row if isinstance(v, (int, float)) and not isinstance(v, bool))
+        else:
+            out.append(_num(a))
+    return out
+
+
+def _count(*args):
+    # Literals count when they read as numbers ("2", TRUE); referenced cells only when they hold one
+    n = 0
+    for a in args:
+        if isinstance(a, tuple):
+            n += len(_numbers((a,)))
+        else:
+            try:
+                _num(a)
+                n += 1
+            except FormulaError:
+                pass
+    return n
+
+
+def _logicals(args):
+    """AND/OR arguments: references skip text and blanks; no logical value at all is #VALUE!."""
+    out = []
+    for a in args:
+        if isinstance(a, tuple):
+            out.extend(bool(v) for row in a for v in row if isinstance(v, (bool, int, float)))
+        else:
+            out.append(_bool(a))
+    if not out:
+        raise FormulaError("#VALUE!")
+    return out
+
+
+def _average(*args):
+    values = _numbers(args)
+    if not values:
+        raise FormulaError("#DIV/0!")
+    return sum(values) / len(values)
+
+
+def _round(x, digits=0, mode=None):
+    # Excel rounds half away from zero; ROUNDUP/ROUNDDOWN move away from / towards zero
+    x, digits = _num(x), int(_num(digits))
+    scale = 10.0 ** digits
+    step = {None: lambda v: math.floor(v + 0.5), "up": math.ceil, "down": math.floor}[mode]
+    return math.copysign(step(round(abs(x) * scale, 9)) / scale, x)
+
+
+def _sumproduct(*arrays):
+    shapes = {(len(a), len(a[0])) if isinstance(a, tuple) else (1, 1) for a in arrays}
+    if len(shapes) != 1:
+        raise FormulaError("#VALUE!")
+    cells = [[v for row in a for v in row] if isinstance(a, tuple) else [a] for a in arrays]
+    total = 0.0
+    for values in zip(*cells):
+        product = 1.0
+        for v in values:
+            product *= v if isinstance(v, (int, float)) and not isinstance(v, bool) else 0.0
+        total += product
+    return total
+
+
+FUNCTIONS = {
+    "SUM": lambda *a: sum(_numbers(a)),
+    "AVERAGE": _average,
+    "MIN": lambda *a: min(_numbers(a), default=0.0),
+    "MAX": lambda *a: max(_numbers(a), default=0.0),
+    "COUNT": _count,
+    "ABS": lambda x: abs(_num(x)),
+    "ROUND": _round,
+    "ROUNDUP": lambda x, d=0: _round(x, d, "up"),
+    "ROUNDDOWN": lambda x, d=0: _round(x, d, "down"),
+    "SUMPRODUCT": _sumproduct,
+    "AND": lambda *a: all(_logicals(a)),
+    "OR": lambda *a: any(_logicals(a)),
+    "NOT": lambda x: not _bool(x),
+}
+
+
+# --- Formula compiler: openpyxl tokens -> nested closures ---
+
+class _Compiler:
+    """Precedence-climbing parser over openpyxl's tokens that builds one closure per formula."""
+
+    def __init__(self, model, sheet, text):
+        self.model, self.sheet = model, sheet
+        self.tokens = [t for t in Tokenizer(text).items if t.type != Token.WSPACE]
+        self.pos = 0
+        self.refs = set()
+
+    def compile(self):
+        if not self.tokens:
+            raise Unsupported("empty formula")
+        node = self.expr(0)
+        if self.pos != len(self.tokens):
+            raise Unsupported(f"unexpected '{self.tokens[self.pos].value}'")
+        return node
+
+    def references(self):
+        """Cells and whole columns a formula refers to, read off its tokens without compiling it.
+
+        Used for unsupported formulas so changes still reach them; named ranges can't be resolved and are skipped.
+        """
+        columns = set()
+        for token in self.tokens:
+            if token.type != Token.OPERAND or token.subtype != Token.RANGE:
+                continue
+            try:
+                self.reference(token.value)
+            except Unsupported:
+                try:
+                    sheet, text = self.split(token.value)
+                except Unsupported:
+                    continue
+                match = COLUMN_REF.fullmatch(text)
+                if match:
+                    first, last = (column_index_from_string(c) for c in match.groups())
+                    columns.update((sheet, get_column_letter(c)) for c in range(first, last + 1))
+        return self.refs, columns
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise Unsupported("formula ends early")
+        self.pos += 1
+        return token
+
+    def expr(self, min_prec):
+        left = self.unary()
+        while True:
+            token = self.peek()
+            if token is None or token.type != Token.OP_IN or token.value not in PRECEDENCE:
+                if token is not None and token.type == Token.OP_IN:
+                    raise Unsupported(f"operator '{token.value}'")
+                return left
+            prec = PRECEDENCE[token.value]
+            if prec < min_prec:
+                return left
+            self.take()
+            # ^ is left-associative in Excel, like the rest
+            right = self.expr(prec + 1)
+            op = INFIX[token.value]
+            left = (lambda op, a, b: lambda: op(a(), b()))(op, left, right)
+
+    def unary(self):
+        token = self.peek()
+        if token is not None and token.type == Token.OP_PRE:
+            self.take()
+            # Excel binds negation tighter than ^: -2^2 is 4
+            operand = self.unary()
+            return (lambda f: lambda: -_num(f()))(operand) if token.value == "-" else operand
+        node = self.primary()
+        while self.peek() is not None and self.peek().type == Token.OP_POST:
+            self.take()
+            node = (lambda f: lambda: _num(f()) / 100)(node)
+        return node
+
+    def primary(self):
+        token = self.take()
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                value = float(token.value)
+                return lambda: value
+            if token.subtype == Token.TEXT:
+                value = token.value[1:-1].replace('""', '"')
+                return lambda: value
+            if token.subtype == Token.LOGICAL:
+                value = token.value.upper() == "TRUE"
+                return lambda: value
+            if token.subtype == Token.ERROR:
+                code = token.value.upper()
+
+                def error():
+                    raise FormulaError(code)
+                return error
+            return self.reference(token.value)
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            return self.function(token.value[:-1].upper())
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.expr(0)
+            closing = self.take()
+            if closing.type != Token.PAREN:
+                raise Unsupported("unbalanced parentheses")
+            return node
+        raise Unsupported(f"unexpected '{token.value}'")
+
+    def arguments(self):
+        args = []
+        if self.peek() is not None and self.peek().type == Token.FUNC and self.peek().subtype == Token.CLOSE:
+            self.take()
+            return args
+        while True:
+            token = self.peek()
+            if token is not None and (token.type == Token.SEP or token.subtype == Token.CLOSE):
+                args.append(lambda: None)  # Omitted argument, e.g. IF(x,,y)
+            else:
+                args.append(self.expr(0))
+            token = self.take()
+            if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                return args
+            if token.type != Token.SEP or token.subtype != Token.ARG:
+                raise Unsupported(f"unexpected '{token.value}' in arguments")
+
+    def function(self, name):
+        if name.startswith("_XLFN."):
+            name = name[6:]
+        args = self.arguments()
+        # IF and IFERROR only evaluate the branch they need
+        if name == "IF" and len(args) in (2, 3):
+            test, then = args[0], args[1]
+            other = args[2] if len(args) == 3 else (lambda: False)
+            return lambda: then() if _bool(test()) else other()
+        if name == "IFERROR" and len(args) == 2:
+            value, fallback = args
+
+            def iferror():
+                try:
+                    return _scalar(value())
+                except FormulaError:
+                    return fallback()
+            return iferror
+        func = FUNCTIONS.get(name)
+        if func is None:
+            raise Unsupported(f"function {name}")
+        return lambda: func(*(a() for a in args))
+
+    def split(self, text):
+        """(sheet, "A1:B2") of a reference, with the formula's own sheet when none is given."""
+        sheet = self.sheet
+        if "!" in text:
+            prefix, text = text.rsplit("!", 1)
+            if "[" in prefix:
+                raise Unsupported("external workbook reference")
+            sheet = prefix[1:-1].replace("''", "'") if prefix.startswith("'") else prefix
+            sheet = self.model.sheet_name(sheet)
+        return sheet, text.replace("$", "").upper()
+
+    def reference(self, text):
+        sheet, text = self.split(text)
+        if not CELL_REF.fullmatch(text):
+            raise Unsupported(f"reference {text}")
+        min_col, min_row, max_col, max_row = range_boundaries(text)
+        keys = tuple(tuple((sheet, f"{get_column_letter(c)}{r}") for c in range(min_col, max_col + 1))
+                     for r in range(min_row, max_row + 1))
+        self.refs.update(k for row in keys for k in row)
+        read = self.model._read
+        # A single cell is a 1x1 range: functions tell references from literals by the tuple
+        if len(keys) == 1 and len(keys[0]) == 1:
+            key = keys[0][0]
+            return lambda: ((read(key),),)
+        return lambda: tuple(tuple(read(k) for k in row) for row in keys)
+
+
+# --- The model ---
+
+class FormulaModel:
+    """Cell values plus compiled formulas, recalculated incrementally along the dependency graph.
+
+    Cells are keyed (sheet, "C5"). Changing input cells recomputes only the formulas downstream
+    of them, in dependency order. Formulas the engine can't parse (see `unsupported`) and
+    circular references keep the value Excel cached, so the model stays usable around them; their
+    precedents are still tracked, so once an input they read changes they and everything computed
+    from them are reported stale rather than silently left behind.
+    """
+
+    def __init__(self, sheet_names=()):
+        self.values = {}
+        self.formulas = {}
+        self.unsupported = {}
+        self._compiled = {}
+        self._precedents = {}
+        self._dependents = defaultdict(set)
+        self._column_dependents = defaultdict(set)
+        self._stale = set()
+        self._order = {}
+        self._sheets = {name.lower(): name for name in sheet_names}
+
+    @classmethod
+    def from_workbook(cls, path=WORKBOOK_PATH, sheets=FORMULA_SHEETS):
+        """Loads the formulas of `sheets` plus the cached values they start from."""
+        with section("formula model load"):
+            wb = load_workbook(path, read_only=True)
+            try:
+                model = cls(wb.sheetnames)
+                scope = [s for s in sheets if s in wb.sheetnames]
+                for name in [s for s in sheets if s not in scope]:
+                    print(f"Formula model: sheet '{name}' not in {path}")
+                texts = {}
+                for name in scope:
+                    for row in wb[name].iter_rows():
+                        for cell in row:
+                            if cell.value is None:
+                                continue
+                            if cell.data_type == "f":
+                                texts[(name, cell.coordinate)] = getattr(cell.value, "text", cell.value)
+                            else:
+                                model.values[(name, cell.coordinate)] = cell.value
+            finally:
+                wb.close()
+
+            for key, text in texts.items():
+                model.add_formula(key, text)
+
+            # Excel's cached results: starting values for the formulas, and the inputs read off other sheets
+            outside = sorted({key[0] for key in model._dependents} - set(scope))
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                for name in scope + outside:
+                    for row in wb[name].iter_rows():
+                        for cell in row:
+                            key = (name, getattr(cell, "coordinate", None))
+                            if cell.value is not None and (name in outside or key in texts):
+                                model.values[key] = cell.value
+            finally:
+                wb.close()
+            model.finalize()
+        return model
+
+    def sheet_name(self, name):
+        """Workbook spelling of a sheet name (Excel references are case-insensitive)."""
+        try:
+            return self._sheets[name.lower()]
+        except KeyError:
+            raise Unsupported(f"unknown sheet '{name}'")
+
+    def key(self, ref, sheet=None):
+        """(sheet, "C5") from a key tuple, "Sheet!$C$5", "'P&L H V1'!C5", or "C5" with `sheet`."""
+        if isinstance(ref, tuple):
+            sheet, ref = ref
+        elif "!" in ref:
+            sheet, ref = ref.rsplit("!", 1)
+            if sheet.startswith("'"):
+                sheet = sheet[1:-1].replace("''", "'")
+        if sheet is None:
+            raise ValueError(f"no sheet given for {ref}")
+        return self._sheets.get(sheet.lower(), sheet), ref.replace("$", "").upper()
+
+    def add_formula(self, key, text):
+        """Compiles one formula and links it into the graph; unsupported ones are recorded with their precedents."""
+        self.formulas[key] = text
+        try:
+            compiler = _Compiler(self, key[0], text)
+            self._compiled[key] = compiler.compile()
+            refs = compiler.refs
+        except Unsupported as e:
+            self.unsupported[key] = str(e)
+            try:
+                compiler = _Compiler(self, key[0], text)
+                refs, columns = compiler.references()
+            except Exception:
+                # Not even tokenizable: nothing to link
+                return
+            for column in columns:
+                self._column_dependents[column].add(key)
+        self._precedents[key] = refs
+        for ref in refs:
+            self._dependents[ref].add(key)
+
+    def finalize(self):
+        """Orders the formulas topologically and computes any that have no cached value."""
+        pending = {key: sum(ref in self._compiled for ref in refs) for key, refs in self._precedents.items()
+                   if key in self._compiled}
+        ready = [key for key, n in pending.items() if n == 0]
+        order = []
+        while ready:
+            key = ready.pop()
+            order.append(key)
+            for dep in self._dependents.get(key, ()):
+                if dep in pending:
+                    pending[dep] -= 1
+                    if pending[dep] == 0:
+                        ready.append(dep)
+        self._order = {key: i for i, key in enumerate(order)}
+        for key in set(self._compiled) - set(self._order):
+            # In a cycle, or downstream of one: keep Excel's iterated result
+            self.unsupported[key] = "circular reference"
+            del self._compiled[key]
+
+        # Files saved by tools that don't store results (e.g. openpyxl) have no cached values
+        missing = [key for key in self._compiled if key not in self.values]
+        if missing:
+            self._recalc(sorted(set(missing) | set(self._affected(missing)), key=self._order.__getitem__))
+
+    def _read(self, key):
+        value = self.values.get(key)
+        if isinstance(value, str) and value in ERRORS:
+            raise FormulaError(value)
+        return value
+
+    def _evaluate(self, key):
+        try:
+            value = _scalar(self._compiled[key]())
+            return 0 if value is None else value
+        except FormulaError as e:
+            return e.code
+        except ZeroDivisionError:
+            return "#DIV/0!"
+        except (OverflowError, ValueError):
+            return "#NUM!"
+
+    def _downstream(self, keys):
+        """Formulas downstream of `keys` in dependency order, plus the cells among them left stale.
+
+        The walk passes through formulas the engine can't evaluate: they keep their old value, so they and
+        everything computed from them are stale.
+        """
+        seen, stale = set(), set()
+        stack = [(key, False) for key in keys]
+        while stack:
+            key, tainted = stack.pop()
+            deps = self._dependents.get(key, ())
+            if self._column_dependents:
+                column = (key[0], key[1].rstrip("0123456789"))
+                deps = itertools.chain(deps, self._column_dependents.get(column, ()))
+            for dep in deps:
+                dep_stale = tainted or dep not in self._compiled
+                if dep in seen and (dep in stale or not dep_stale):
+                    continue
+                seen.add(dep)
+                if dep_stale:
+                    stale.add(dep)
+                stack.append((dep, dep_stale))
+        return sorted((key for key in seen if key in self._compiled), key=self._order.__getitem__), stale
+
+    def _affected(self, keys):
+        """Formulas downstream of `keys`, in dependency order."""
+        return self._downstream(keys)[0]
+
+    def _recalc(self, order):
+        changed = {}
+        for key in order:
+            value = self._evaluate(key)
+            if value != self.values.get(key):
+                changed[key] = value
+            self.values[key] = value
+        return changed
+
+    def get(self, ref, sheet=None):
+        return self.values.get(self.key(ref, sheet))
+
+    def precedents(self, ref, sheet=None):
+        return set(self._precedents.get(self.key(ref, sheet), ()))
+
+    def dependents(self, ref, sheet=None):
+        return set(self._dependents.get(self.key(ref, sheet), ()))
+
+    def set(self, changes):
+        """Writes {cell: value} inputs and recalculates only the formulas downstream of them."""
+        start = time.perf_counter()
+        keys = []
+        for ref, value in changes.items():
+            key = self.key(ref)
+            if key in self._compiled:
+                raise ValueError(f"{key[0]}!{key[1]} holds a formula; change its inputs instead")
+            self.values[key] = value
+            keys.append(key)
+        order, stale = self._downstream(keys)
+        changed = self._recalc(order)
+        self._stale |= stale
+        return Recalc(changed, len(order), (time.perf_counter() - start) * 1000, frozenset(self._stale))
+
+    def what_if(self, changes):
+        """Same as set(), then puts every touched cell back: the model is left unchanged."""
+        keys = [self.key(ref) for ref in changes]
+        saved = {key: self.values.get(key, _MISSING) for key in keys + self._affected(keys)}
+        stale = set(self._stale)
+        try:
+            return self.set(changes)
+        finally:
+            self._stale = stale
+            for key, value in saved.items():
+                if value is _MISSING:
+                    self.values.pop(key, None)
+                else:
+                    self.values[key] = value
+
+    def recalculate(self):
+        """Full recalculation of every supported formula."""
+        start = time.perf_counter()
+        order = sorted(self._compiled, key=self._order.__getitem__)
+        changed = self._recalc(order)
+        # Unsupported cells still hold what they held, so whatever set() left stale stays stale
+        return Recalc(changed, len(order), (time.perf_counter() - start) * 1000, frozenset(self._stale))
+
+    def check(self, rel_tol=1e-9, abs_tol=1e-6):
+        """Recalculates everything and lists [(cell, cached, computed)] where the engine disagrees with Excel."""
+        cached = {key: self.values.get(key) for key in self._compiled}
+        self.recalculate()
+        mismatches = []
+        for key, before in cached.items():
+            after = self.values[key]
+            if isinstance(before, (int, float)) and isinstance(after, (int, float)):
+                if math.isclose(before, after, rel_tol=rel_tol, abs_tol=abs_tol):
+                    continue
+            elif before == after:
+                continue
+            mismatches.append((key, before, after))
+        return mismatches
+
+
+def excel_cases():
+    """Evaluates EXCEL_CASES on a scratch sheet; returns [(formula, expected, computed)] that differ."""
+    model = FormulaModel(["Check"])
+    for ref, value in EXCEL_CASES_INPUTS.items():
+        model.values[("Check", ref)] = value
+    cells = {}
+    for i, formula in enumerate(EXCEL_CASES):
+        cells[formula] = ("Check", f"C{i + 1}")
+        model.add_formula(cells[formula], formula)
+    model.finalize()
+    return [(formula, expected, model.values.get(cells[formula])) for formula, expected in EXCEL_CASES.items()
+            if model.values.get(cells[formula]) != expected
+            or isinstance(expected, bool) != isinstance(model.values.get(cells[formula]), bool)]
+
+
+def _parse_assignment(text):
+    ref, _, value = text.partition("=")
+    try:
+        return ref, float(value)
+    except ValueError:
+        return ref, value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the workbook's formulas and recalculate what-ifs incrementally.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--sheets", nargs="+", default=list(FORMULA_SHEETS))
+    parser.add_argument("--check", action="store_true", help="Recalculate everything and compare with Excel's values")
+    parser.add_argument("--set", nargs="+", metavar="CELL=VALUE", help="e.g. COP!D10=1.25 \"'P&L H V1'!C5=900\"")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        model = FormulaModel.from_workbook(args.path, args.sheets)
+        print(f"Loaded {len(model.formulas):,} formulas ({len(model._compiled):,} evaluated, "
+              f"{len(model.unsupported):,} kept as cached values) in {(time.perf_counter() - start) * 1000:,.0f} ms")
+        for sheet, n in Counter(key[0] for key in model.formulas).items():
+            print(f"  {sheet}: {n:,}")
+        if model.unsupported:
+            print("Not evaluated:")
+            for reason, n in Counter(model.unsupported.values()).most_common(10):
+                print(f"  {n:>5,}  {reason}")
+
+        if args.check:
+            failures = excel_cases()
+            print(f"\n{len(EXCEL_CASES) - len(failures)} of {len(EXCEL_CASES)} Excel semantics cases pass")
+            for formula, expected, computed in failures:
+                print(f"  {formula}  Excel {expected!r}  engine {computed!r}")
+            mismatches = model.check()
+            print(f"\n{len(mismatches):,} of {len(model._compiled):,} formulas differ from Excel's cached value")
+            for (sheet, ref), before, after in mismatches[:20]:
+                print(f"  {sheet}!{ref}: {model.formulas[(sheet, ref)]}  Excel {before!r}  engine {after!r}")
+
+        if args.set:
+            result = model.set(dict(_parse_assignment(a) for a in args.set))
+            print(f"\nRecalculated {result.evaluated:,} formulas in {result.ms:.2f} ms; {len(result.changed):,} changed")
+            if result.stale:
+                print(f"{len(result.stale):,} cells may be stale (they use formulas the engine can't evaluate):")
+                for sheet, ref in sorted(result.stale)[:30]:
+                    print(f"  {sheet}!{ref}: {model.formulas[(sheet, ref)]}")
+            for (sheet, ref), value in list(result.changed.items())[:30]:
+                print(f"  {sheet}!{ref} = {value!r}")
+    except Exception as e:
+        print(f"Error: {e}")
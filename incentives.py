@@ -0,0 +1,181 @@
+import argparse
+import re
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+# Dealer-level incentive sheets -> scheme name
+SCHEME_SHEETS = {
+    "Annual Incentive": "Annual",
+    "Quarterly Incentive": "Quarterly",
+    "Special Incentive": "Special",
+    "Qtrly Spl and Annual Incentives": "Quarterly (calc)",
+}
+
+DEALER_CODE = re.compile(r"^CL-\d+$")
+COLUMNS = ["dealer_code", "dealer", "scheme", "period", "target_qty", "actual_qty", "incentive"]
+
+# Slab schedule: rate per ton for the first slab whose threshold the dealer reaches.
+# basis "achievement" compares actual/target; "qty" compares actual tons (schemes without targets).
+Slabs = namedtuple("Slabs", ["thresholds", "rates", "basis"])
+
+
+def _lower(df):
+    return df.apply(lambda col: col.map(lambda v: str(v).strip().lower() if pd.notna(v) else ""))
+
+
+def _dealer_columns(df, first_row, before_col):
+    """(code column, name column): the column left of the figures that holds the most CL-xxxx codes."""
+    block = df.iloc[first_row:, :before_col].astype("string").fillna("").apply(lambda c: c.str.strip())
+    hits = block.apply(lambda c: c.str.match(DEALER_CODE.pattern)).sum()
+    if hits.max() == 0:
+        raise ValueError("no dealer codes found")
+    code_col = hits.idxmax()
+    name_col = code_col + 1 if code_col + 1 < before_col else code_col
+    return code_col, name_col
+
+
+def _frame(df, rows, code_col, name_col, scheme, period, target, actual, incentive):
+    num = lambda col: pd.to_numeric(df.loc[rows, col], errors="coerce").to_numpy(dtype=float) if col is not None \
+        else np.full(len(rows), np.nan)
+    return pd.DataFrame({
+        "dealer_code": df.loc[rows, code_col].astype(str).str.strip().to_numpy(),
+        "dealer": df.loc[rows, name_col].astype(str).str.strip().to_numpy(),
+        "scheme": scheme,
+        "period": period,
+        "target_qty": num(target),
+        "actual_qty": num(actual),
+        "incentive": num(incentive),
+    })
+
+
+def parse_target_sheet(df, scheme):
+    """Monthly (Target Qty, Actual Qty, Incentive) blocks -> one row per dealer and month.
+
+    Blocks whose heading isn't a date (e.g. "Total - Quarter") are totals and are skipped.
+    """
+    text = _lower(df.iloc[:20])
+    sub_row = next(r for r in range(len(text)) if (text.iloc[r] == "target qty").any())
+    starts = [c for c in text.columns[:-2]
+              if text.iat[sub_row, c] == "target qty" and text.iat[sub_row, c + 1] == "actual qty"
+              and "incentive" in text.iat[sub_row, c + 2]]
+
+    data = df.iloc[sub_row + 1:]
+    code_col, name_col = _dealer_columns(df, sub_row + 1, starts[0])
+    rows = data.index[data[code_col].astype(str).str.strip().str.match(DEALER_CODE.pattern)]
+
+    frames = []
+    for c in starts:
+        # Month headings sit above the block's first column (merged cells), one or two rows up
+        heading = next((df.iat[r, c] for r in range(sub_row - 1, max(sub_row - 3, -1), -1) if pd.notna(df.iat[r, c])), None)
+        period = pd.to_datetime(heading, errors="coerce") if heading is not None and hasattr(heading, "year") else pd.NaT
+        if pd.isna(period):
+            continue
+        frames.append(_frame(df, rows, code_col, name_col, scheme, period.strftime("%Y-%m"), c, c + 1, c + 2))
+    if not frames:
+        raise ValueError("no monthly target blocks")
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_annual_sheet(df, scheme):
+    """(Quantity, Amount) columns under "Annual Incentive" -> one row per dealer."""
+    text = _lower(df.iloc[:20])
+    sub_row = next(r for r in range(len(text)) if (text.iloc[r] == "quantity").any())
+    qty_col = int(np.flatnonzero(text.iloc[sub_row].to_numpy() == "quantity")[0])
+    amount_col = qty_col + 1
+
+    title = " ".join(text.iloc[:sub_row].to_numpy().ravel())
+    match = re.search(r"month of ([a-z]{3})[a-z]*-(\d{2})", title)
+    period = pd.to_datetime(f"{match.group(1)} {match.group(2)}", format="%b %y").strftime("%Y-%m") if match else "annual"
+
+    data = df.iloc[sub_row + 1:]
+    code_col, name_col = _dealer_columns(df, sub_row + 1, qty_col)
+    rows = data.index[data[code_col].astype(str).str.strip().str.match(DEALER_CODE.pattern)]
+    return _frame(df, rows, code_col, name_col, scheme, period, None, qty_col, amount_col)
+
+
+def load_incentives(path=WORKBOOK_PATH):
+    """All incentive sheets as one long table with categorical keys and float64 figures."""
+    frames = []
+    for sheet, scheme in SCHEME_SHEETS.items():
+        try:
+            df = read_sheet(sheet, path)
+            text = _lower(df.iloc[:20])
+            parser = parse_target_sheet if (text == "target qty").any().any() else parse_annual_sheet
+            frames.append(parser(df, scheme))
+        except (KeyError, ValueError, StopIteration, IndexError) as e:
+            print(f"Skipping '{sheet}': {e}")
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype="category" if i < 4 else float) for i, c in enumerate(COLUMNS)})
+
+    table = pd.concat(frames, ignore_index=True)
+    table = table[(table["actual_qty"].fillna(0) != 0) | (table["incentive"].fillna(0) != 0)]
+    # Dealers repeat across schemes and months: dictionary-encode the keys once
+    for col in ("dealer_code", "dealer", "scheme", "period"):
+        table[col] = table[col].astype("category")
+    table[["target_qty", "actual_qty", "incentive"]] = table[["target_qty", "actual_qty", "incentive"]].fillna(0.0)
+    return table.reset_index(drop=True)
+
+
+def cost_per_ton(table, by=("scheme",), incentive_col="incentive"):
+    """Incentive paid, tons and incentive per ton grouped by any key columns (dealer, scheme, period)."""
+    grouped = table.groupby(list(by), observed=True)[[incentive_col, "actual_qty"]].sum()
+    grouped["per_ton"] = grouped[incentive_col] / grouped["actual_qty"].where(grouped["actual_qty"] != 0)
+    return grouped.sort_values(incentive_col, ascending=False)
+
+
+def infer_slabs(table):
+    """One-slab schedule per scheme matching what was paid: 100% of target (or any tons) at the median paid rate."""
+    slabs = {}
+    for scheme, rows in table.groupby("scheme", observed=True):
+        paid = rows[(rows["incentive"] > 0) & (rows["actual_qty"] > 0)]
+        rate = float((paid["incentive"] / paid["actual_qty"]).median()) if len(paid) else 0.0
+        basis = "achievement" if (rows["target_qty"] > 0).any() else "qty"
+        slabs[scheme] = Slabs((1.0 if basis == "achievement" else 0.0,), (rate,), basis)
+    return slabs
+
+
+def apply_slabs(table, slabs):
+    """Incentive every row would earn under `slabs` ({scheme: Slabs}); one vectorized lookup per scheme."""
+    result = np.zeros(len(table))
+    scheme = table["scheme"].to_numpy()
+    actual = table["actual_qty"].to_numpy()
+    target = table["target_qty"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        achievement = np.where(target > 0, actual / target, 0.0)
+    for name, (thresholds, rates, basis) in slabs.items():
+        mask = scheme == name
+        x = achievement[mask] if basis == "achievement" else actual[mask]
+        idx = np.searchsorted(np.asarray(thresholds, dtype=float), x, side="right") - 1
+        rate = np.where(idx >= 0, np.asarray(rates, dtype=float)[np.clip(idx, 0, None)], 0.0)
+        result[mask] = rate * actual[mask]
+    return result
+
+
+def leakage(table, slabs, by=("dealer_code", "dealer")):
+    """Incentive paid above what the slab schedule allows, per dealer (largest first)."""
+    view = table.assign(schedule=apply_slabs(table, slabs))
+    view["excess"] = (view["incentive"] - view["schedule"]).clip(lower=0)
+    grouped = view.groupby(list(by), observed=True)[["incentive", "schedule", "excess", "actual_qty"]].sum()
+    grouped["excess_per_ton"] = grouped["excess"] / grouped["actual_qty"].where(grouped["actual_qty"] != 0)
+    return grouped[grouped["excess"] > 0].sort_values("excess", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dealer incentive cost per ton and leakage.")
+    parser.add_argument("--workbook", default=WORKBOOK_PATH)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_incentives(args.workbook)
+    print(f"{len(table):,} dealer rows in {time.perf_counter() - start:.2f}s\n")
+    print(cost_per_ton(table).to_markdown())
+    start = time.perf_counter()
+    leaks = leakage(table, infer_slabs(table))
+    print(f"\nLeakage vs inferred slabs ({(time.perf_counter() - start) * 1000:.1f} ms):")
+    print(leaks.head(args.top).to_markdown())
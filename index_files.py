@@ -1,7 +1,18 @@
 import os
-import pandas as pd
 from pptx import Presentation
 import glob
+from workbook_cache import file_digest
+from sheet_stream import sheet_names, summarize_workbook
+from inverted_index import build_index, open_index, pptx_documents, xlsx_documents, INDEX_DIR, INDEX_VERSION
+import itertools
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = r"c:\Users\Gigabyte\Desktop\lucky cement testing"
+FRAGMENT_DIR = ".index_fragments"
+MANIFEST_FILE = os.path.join(FRAGMENT_DIR, "manifest.json")
+SHEETS_PER_TASK = 8  # Workbooks with more sheets than this are summarized in parallel chunks
 
 def extract_pptx_content(filepath):
     """Extracts text content from a PPTX file."""
@@ -20,47 +31,145 @@ def extract_pptx_content(filepath):
     except Exception as e:
         return f"Error reading {filepath}: {e}"
 
-def extract_xlsx_content(filepath):
-    """Extracts a summary of an XLSX file."""
+def extract_xlsx_content(filepath, sheets=None, track_memory=False):
+    """Extracts a summary of an XLSX file (or only the given sheets, in that order).
+
+    track_memory adds each sheet's peak memory; it traces every allocation, which makes extraction ~4x slower.
+    """
     try:
-        xl = pd.ExcelFile(filepath)
         summary = []
-        for sheet_name in xl.sheet_names:
-            df = xl.parse(sheet_name)
-            summary.append(f"Sheet: {sheet_name}")
-            summary.append("Columns: " + ", ".join(df.columns.astype(str)))
-            summary.append(f"Rows: {len(df)}")
+        # Rows are streamed in chunks; only the header and the 5-row preview are kept in memory
+        for sheet in summarize_workbook(filepath, sheets, track_memory=track_memory):
+            summary.append(f"Sheet: {sheet.name}")
+            summary.append("Columns: " + ", ".join(str(c) for c in sheet.columns))
+            summary.append(f"Rows: {sheet.n_rows}")
+            if sheet.peak_bytes is not None:
+                summary.append(f"Peak memory: {sheet.peak_bytes / 2**20:.2f} MB")
             summary.append("First 5 rows preview:")
-            summary.append(df.head().to_markdown(index=False))
+            summary.append(sheet.head.to_markdown(index=False))
             summary.append("-" * 20)
         return "\n".join(summary)
     except Exception as e:
         return f"Error reading {filepath}: {e}"
 
-def main():
-    base_dir = r"c:\Users\Gigabyte\Desktop\lucky cement testing"
+def _load_manifest():
+    try:
+        with open(MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _is_unchanged(filepath, entry):
+    """Cheap stat check first; only hash the file when size or mtime moved."""
+    if not entry or entry.get("failed") or not os.path.exists(os.path.join(FRAGMENT_DIR, entry["fragment"])):
+        return False
+    stat = os.stat(filepath)
+    if (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+        return True
+    return file_digest(filepath).split("-")[0] == entry["digest"].split("-")[0]
+
+def _failed(text):
+    return text.startswith("Error reading")
+
+def _extract_changed(changed, workers, track_memory=False):
+    """Runs the extractors in a process pool; big workbooks are split into sheet chunks.
+
+    Returns {path: (content, failed)}, where failed is set if any chunk of the file couldn't be read.
+    """
+    contents = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pptx_jobs = {p: pool.submit(extract_pptx_content, p) for p in changed if p.endswith(".pptx")}
+        xlsx_files = [p for p in changed if p.endswith(".xlsx")]
+
+        xlsx_jobs = {}
+        for filepath in xlsx_files:
+            try:
+                names = sheet_names(filepath)
+            except Exception as e:
+                contents[filepath] = (f"Error reading {filepath}: {e}", True)
+                continue
+            chunks = [names[i:i + SHEETS_PER_TASK] for i in range(0, len(names), SHEETS_PER_TASK)]
+            xlsx_jobs[filepath] = [pool.submit(extract_xlsx_content, filepath, chunk, track_memory)
+                                  for chunk in chunks]
+
+        for filepath, job in pptx_jobs.items():
+            text = job.result()
+            contents[filepath] = (text, _failed(text))
+        for filepath, jobs in xlsx_jobs.items():
+            chunks = [job.result() for job in jobs]
+            contents[filepath] = ("\n".join(chunks), any(_failed(chunk) for chunk in chunks))
+    return contents
+
+def main(full=False, workers=None, base_dir=BASE_DIR, track_memory=False):
     output_file = "file_index.md"
-    
+
+    # Same section order as before: decks first, then workbooks, each sorted by name
+    files = sorted(glob.glob(os.path.join(base_dir, "*.pptx"))) + sorted(glob.glob(os.path.join(base_dir, "*.xlsx")))
+    os.makedirs(FRAGMENT_DIR, exist_ok=True)
+    manifest = {} if full else _load_manifest()
+
+    changed = [p for p in files if not _is_unchanged(p, manifest.get(os.path.basename(p)))]
+    for filepath in changed:
+        print(f"Processing {os.path.basename(filepath)}...")
+    contents = _extract_changed(changed, workers, track_memory) if changed else {}
+
+    new_manifest = {}
+    for filepath in files:
+        filename = os.path.basename(filepath)
+        stat = os.stat(filepath)
+        if filepath in contents:
+            text, failed = contents[filepath]
+            digest = file_digest(filepath)
+            fragment = f"{os.path.splitext(filename)[0]}.{digest}.md"
+            if failed:
+                # Never treat a failed extraction as up to date: the file is retried on the next run
+                print(f"{filename}: extraction failed, will retry on the next run")
+            with open(os.path.join(FRAGMENT_DIR, fragment), "w", encoding="utf-8") as f:
+                f.write(f"## {filename}\n\n" + text + "\n\n")
+        else:
+            # Same content (possibly only touched): keep the fragment, record today's size and mtime
+            # so the next run doesn't hash it again
+            digest, fragment, failed = manifest[filename]["digest"], manifest[filename]["fragment"], False
+        new_manifest[filename] = {
+            "digest": digest,
+            "fragment": fragment,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "failed": failed,
+        }
+
+    # Remove fragments no longer referenced (deleted or replaced files)
+    live = {entry["fragment"] for entry in new_manifest.values()}
+    for name in os.listdir(FRAGMENT_DIR):
+        if name.endswith(".md") and name not in live:
+            os.remove(os.path.join(FRAGMENT_DIR, name))
+
     with open(output_file, "w", encoding="utf-8") as f:
         f.write("# File Index\n\n")
-        
-        # PPTX Files
-        for filepath in glob.glob(os.path.join(base_dir, "*.pptx")):
-            filename = os.path.basename(filepath)
-            print(f"Processing {filename}...")
-            f.write(f"## {filename}\n\n")
-            content = extract_pptx_content(filepath)
-            f.write(content + "\n\n")
-            
-        # XLSX Files
-        for filepath in glob.glob(os.path.join(base_dir, "*.xlsx")):
-            filename = os.path.basename(filepath)
-            print(f"Processing {filename}...")
-            f.write(f"## {filename}\n\n")
-            content = extract_xlsx_content(filepath)
-            f.write(content + "\n\n")
-
-    print(f"Indexing complete. Saved to {output_file}")
+        for filepath in files:
+            with open(os.path.join(FRAGMENT_DIR, new_manifest[os.path.basename(filepath)]["fragment"]), encoding="utf-8") as frag:
+                f.write(frag.read())
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(new_manifest, f, indent=2, sort_keys=True)
+
+    print(f"Indexing complete ({len(changed)} of {len(files)} files re-extracted). Saved to {output_file}")
+
+    # Token -> cell/slide postings so lookups don't need to open any workbook
+    index = open_index()
+    if changed or set(manifest) != set(new_manifest) or index is None or index.version != INDEX_VERSION:
+        documents = itertools.chain(
+            *(pptx_documents(p) for p in files if p.endswith(".pptx")),
+            *(xlsx_documents(p) for p in files if p.endswith(".xlsx")),
+        )
+        n_terms, n_cells = build_index(documents, digests={name: e["digest"] for name, e in new_manifest.items()})
+        print(f"Inverted index: {n_terms:,} terms over {n_cells:,} cells. Saved to {INDEX_DIR}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build file_index.md and the inverted index.")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-extract every file")
+    parser.add_argument("--base-dir", default=BASE_DIR, help="Folder holding the decks and workbooks")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--track-memory", action="store_true",
+                        help="Record each sheet's peak memory in the index (traces allocations, much slower)")
+    args = parser.parse_args()
+    main(full=args.full, workers=args.workers, base_dir=args.base_dir, track_memory=args.track_memory)
@@ -0,0 +1,281 @@
+import argparse
+import bisect
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_index")
+
+TOKEN_RE = re.compile(r"\w+")
+# Bumped when the stored cells change meaning, so older indexes stop counting as current
+INDEX_VERSION = 2
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+# --- Versioned builds ---
+# Like workbook_cache, each build is written to its own temp dir and published under a new, time-ordered name,
+# so concurrent builds never share files and a reader never finds the index half-replaced.
+
+def new_build_dir(index_dir):
+    """A unique temp dir inside index_dir to write one build into."""
+    os.makedirs(index_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=".tmp-", dir=index_dir)
+
+
+def _builds(index_dir):
+    try:
+        entries = os.listdir(index_dir)
+    except OSError:
+        return []
+    return sorted(e for e in entries if e[:1].isdigit() and os.path.isdir(os.path.join(index_dir, e)))
+
+
+def latest_build(index_dir):
+    """The newest published build under index_dir (index_dir itself when it holds a single unversioned index)."""
+    builds = _builds(index_dir)
+    return os.path.join(index_dir, builds[-1]) if builds else index_dir
+
+
+def publish_build(tmp, index_dir):
+    """Renames a finished temp dir to the newest build and drops older ones. Returns the build dir."""
+    build = os.path.join(index_dir, f"{time.time_ns():020d}-{os.path.basename(tmp)[len('.tmp-'):]}")
+    os.replace(tmp, build)
+    # The previous build is kept since a reader may have just resolved it. Removing one that is still
+    # memory-mapped fails on Windows; it is left and retried after the next build.
+    for entry in _builds(index_dir)[:-2]:
+        shutil.rmtree(os.path.join(index_dir, entry), ignore_errors=True)
+    # Loose files of an index written before builds were versioned
+    for entry in os.listdir(index_dir):
+        if os.path.isfile(os.path.join(index_dir, entry)):
+            try:
+                os.remove(os.path.join(index_dir, entry))
+            except OSError:
+                pass
+    return build
+
+
+# --- Document sources: (file, location, row, col, text) ---
+
+def xlsx_documents(filepath):
+    """One document per non-empty workbook cell, read through the workbook cache."""
+    from workbook_cache import read_workbook
+
+    filename = os.path.basename(filepath)
+    for sheet, df in read_workbook(filepath).items():
+        grid = df.to_numpy(dtype=object)
+        rows, cols = np.nonzero(pd.notna(grid))
+        for r, c in zip(rows, cols):
+            # Kept verbatim so a row can be rejoined exactly as keyword_search.row_text builds it
+            text = str(grid[r, c])
+            if text:
+                yield filename, sheet, int(r), int(c), text
+
+
+def pptx_documents(filepath):
+    """One document per text shape, located by slide number and shape order."""
+    from pptx import Presentation
+
+    filename = os.path.basename(filepath)
+    for i, slide in enumerate(Presentation(filepath).slides):
+        shapes = [s for s in slide.shapes if hasattr(s, "text") and s.text]
+        for j, shape in enumerate(shapes):
+            yield filename, f"Slide {i+1}", j, 0, shape.text
+
+
+# --- Build ---
+
+def build_index(documents, index_dir=INDEX_DIR, digests=None):
+    """Writes token -> (cell, position) postings as sorted, memory-mappable arrays.
+
+    digests ({filename: file_digest}) lets readers check the index still matches a file.
+    """
+    sources, source_ids = [], {}
+    cells, texts = [], []
+    vocab = {}
+    tok_ids, tok_cells, tok_pos = [], [], []
+
+    for filename, location, row, col, text in documents:
+        key = (filename, location)
+        if key not in source_ids:
+            source_ids[key] = len(sources)
+            sources.append({"file": filename, "location": location})
+        cell_id = len(cells)
+        cells.append((source_ids[key], row, col))
+        texts.append(text.encode("utf-8"))
+        for pos, token in enumerate(tokenize(text)):
+            tok_ids.append(vocab.setdefault(token, len(vocab)))
+            tok_cells.append(cell_id)
+            tok_pos.append(pos)
+
+    # Renumber tokens alphabetically so the vocabulary can be bisected at query time
+    terms = sorted(vocab)
+    rank = np.empty(len(vocab), dtype=np.int64)
+    rank[[vocab[t] for t in terms]] = np.arange(len(terms))
+    tok_rank = rank[np.asarray(tok_ids, dtype=np.int64)]
+    tok_cells = np.asarray(tok_cells, dtype=np.int32)
+    tok_pos = np.asarray(tok_pos, dtype=np.int32)
+    order = np.lexsort((tok_pos, tok_cells, tok_rank))
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tok_rank, minlength=len(terms)), out=offsets[1:])
+
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=text_offsets[1:])
+
+    tmp = new_build_dir(index_dir)
+    try:
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "post_cells.npy"), tok_cells[order])
+        np.save(os.path.join(tmp, "post_pos.npy"), tok_pos[order])
+        np.save(os.path.join(tmp, "cells.npy"), np.asarray(cells, dtype=np.int32).reshape(-1, 3))
+        np.save(os.path.join(tmp, "text.npy"), np.frombuffer(b"".join(texts), dtype=np.uint8))
+        np.save(os.path.join(tmp, "text_offsets.npy"), text_offsets)
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        with open(os.path.join(tmp, "sources.json"), "w", encoding="utf-8") as f:
+            json.dump(sources, f)
+        with open(os.path.join(tmp, "digests.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": digests or {}}, f)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    publish_build(tmp, index_dir)
+    return len(terms), len(cells)
+
+
+# --- Query ---
+
+class InvertedIndex:
+    """Read-only view over an index written by build_index; arrays are memory-mapped."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        index_dir = latest_build(index_dir)
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        self.offsets = load("offsets.npy")
+        self.post_cells = load("post_cells.npy")
+        self.post_pos = load("post_pos.npy")
+        self.cells = load("cells.npy")
+        self.text = load("text.npy")
+        self.text_offsets = load("text_offsets.npy")
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(index_dir, "sources.json"), encoding="utf-8") as f:
+            self.sources = json.load(f)
+        try:
+            with open(os.path.join(index_dir, "digests.json"), encoding="utf-8") as f:
+                built = json.load(f)
+        except OSError:
+            built = {}
+        self.version = built.get("version")
+        self.digests = built.get("files", {}) if self.version == INDEX_VERSION else {}
+        self._vocab_text, self._term_starts, self._row_keys = None, None, None
+
+    def is_current(self, filepath):
+        """True when the file was indexed and its content hasn't changed since (mtime alone doesn't count)."""
+        from workbook_cache import file_digest
+
+        built = self.digests.get(os.path.basename(filepath))
+        return bool(built) and os.path.exists(filepath) and built.split("-")[0] == file_digest(filepath).split("-")[0]
+
+    def _term_ids(self, token, prefix=False):
+        lo = bisect.bisect_left(self.vocab, token)
+        if not prefix:
+            return [lo] if lo < len(self.vocab) and self.vocab[lo] == token else []
+        hi = bisect.bisect_left(self.vocab, token + "\uffff", lo)
+        return list(range(lo, hi))
+
+    def terms_containing(self, text):
+        """Ids of every term with `text` anywhere inside it (not only at the start)."""
+        if self._vocab_text is None:
+            self._vocab_text = "\n".join(self.vocab)
+            self._term_starts = np.cumsum([0] + [len(t) + 1 for t in self.vocab[:-1]]).tolist()
+        starts = (m.start() for m in re.finditer(re.escape(text.lower()), self._vocab_text))
+        return sorted({bisect.bisect_right(self._term_starts, i) - 1 for i in starts})
+
+    def row_cells(self, source, row):
+        """(col, text) of every cell in one sheet row, in column order."""
+        if self._row_keys is None:
+            # Cells are written sheet by sheet, row by row, so (source, row) keys are already sorted
+            self._row_keys = (self.cells[:, 0].astype(np.int64) << 32) | self.cells[:, 1]
+        key = (int(source) << 32) | int(row)
+        lo, hi = np.searchsorted(self._row_keys, [key, key + 1])
+        return sorted((int(self.cells[i, 2]), self.cell_text(i)) for i in range(lo, hi))
+
+    def postings(self, token, prefix=False):
+        """Returns (cell_ids, positions) for a token, or every token it prefixes."""
+        ids = self._term_ids(token, prefix)
+        if not ids:
+            return np.empty(0, np.int32), np.empty(0, np.int32)
+        # Prefix matches are adjacent in the sorted vocabulary, so their postings are one slice
+        lo, hi = self.offsets[ids[0]], self.offsets[ids[-1] + 1]
+        return np.asarray(self.post_cells[lo:hi]), np.asarray(self.post_pos[lo:hi])
+
+    def match(self, query, phrase=False, prefix=False):
+        """Cell ids containing every query token (in order and adjacent when phrase=True)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, np.int64)
+        if phrase and len(tokens) > 1:
+            # Align each token's positions to the phrase start and intersect (cell, start) keys
+            keys = None
+            for i, token in enumerate(tokens):
+                cells, pos = self.postings(token, prefix and i == len(tokens) - 1)
+                k = (cells.astype(np.int64) << 32) | ((pos.astype(np.int64) - i) & 0xFFFFFFFF)
+                keys = np.unique(k) if keys is None else np.intersect1d(keys, k)
+                if keys.size == 0:
+                    break
+            return np.unique(keys >> 32)
+        result = None
+        for token in tokens:
+            cells = np.unique(self.postings(token, prefix)[0])
+            result = cells if result is None else np.intersect1d(result, cells, assume_unique=True)
+            if result.size == 0:
+                break
+        return result.astype(np.int64)
+
+    def cell_text(self, cell_id):
+        lo, hi = self.text_offsets[cell_id], self.text_offsets[cell_id + 1]
+        return self.text[lo:hi].tobytes().decode("utf-8")
+
+    def lookup(self, query, phrase=False, prefix=False, limit=None):
+        """Resolves a keyword or phrase query to a (file, location, row, col, text) DataFrame."""
+        ids = self.match(query, phrase, prefix)[:limit]
+        records = []
+        for cell_id in ids:
+            source, row, col = self.cells[cell_id]
+            src = self.sources[source]
+            records.append((src["file"], src["location"], int(row), int(col), self.cell_text(cell_id)))
+        return pd.DataFrame(records, columns=["file", "location", "row", "col", "text"])
+
+
+def open_index(index_dir=INDEX_DIR):
+    """The on-disk index, or None when index_files.py hasn't built one yet."""
+    try:
+        return InvertedIndex(index_dir)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the on-disk inverted index built by index_files.py.")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--phrase", action="store_true", help="Match the words as an adjacent phrase")
+    parser.add_argument("--prefix", action="store_true", help="Treat words as prefixes (store -> stores)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+
+    index = InvertedIndex(args.index_dir)
+    results = index.lookup(" ".join(args.query), args.phrase, args.prefix, args.limit)
+    if results.empty:
+        print("No matches.")
+    else:
+        print(results.to_markdown(index=False))
@@ -0,0 +1,137 @@
+import argparse
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from inverted_index import INDEX_DIR, open_index
+from workbook_cache import WORKBOOK_PATH, read_sheet, read_workbook
+
+Hit = namedtuple("Hit", ["sheet", "row", "keyword", "snippet"])
+
+SNIPPET_CONTEXT = 40
+
+
+def _terms(keywords):
+    terms = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+    if not terms:
+        raise ValueError("At least one keyword is required")
+    return terms
+
+
+def compile_keywords(keywords):
+    """One alternation for all keywords; longer terms first so 'fixed cost' wins over 'fixed'."""
+    return re.compile("|".join(re.escape(t) for t in _terms(keywords)))
+
+
+def _snippet(text, keyword):
+    pos = max(text.lower().find(keyword), 0)
+    start = max(pos - SNIPPET_CONTEXT, 0)
+    return re.sub(r"\s+", " ", text[start:pos + len(keyword) + SNIPPET_CONTEXT])
+
+
+def row_text(df):
+    """Concatenates each row's non-empty cells into a single string column."""
+    if df.empty:
+        return pd.Series([], dtype=object)
+    cells = df.astype(object).where(df.notna(), "").astype(str)
+    columns = [cells[c] for c in cells.columns]
+    return columns[0].str.cat(columns[1:], sep=" ").str.strip()
+
+
+def search_frame(df, pattern, sheet=None):
+    """Yields one Hit per row whose text matches the compiled pattern (first match wins)."""
+    text = row_text(df)
+    if text.empty:
+        return
+    lower = text.str.lower()
+    keyword = lower.str.extract(f"({pattern.pattern})", expand=False)
+    matched = keyword.notna()
+
+    for row, kw, original in zip(text.index[matched], keyword[matched], text[matched]):
+        yield Hit(sheet, int(row), kw, _snippet(original, kw))
+
+
+def iter_hits(keywords, frames=None, path=WORKBOOK_PATH, sheets=None, limit=None):
+    """Streams hits sheet by sheet; stops once `limit` hits have been produced."""
+    pattern = compile_keywords(keywords)
+    if frames is None:
+        frames = {s: read_sheet(s, path) for s in sheets} if sheets else read_workbook(path)
+
+    count = 0
+    for sheet, df in frames.items():
+        if sheets and sheet not in sheets:
+            continue
+        for hit in search_frame(df, pattern, sheet):
+            yield hit
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def index_hits(keywords, index, path=WORKBOOK_PATH, sheets=None, limit=None):
+    """The same hits as iter_hits, with the inverted index choosing which rows to look at: no sheet is opened.
+
+    A row is a candidate when one of its cells has a keyword's longest word run inside a token; candidates
+    are rejoined from their cells exactly as row_text does and matched with the same pattern.
+    """
+    pattern = compile_keywords(keywords)
+    filename = os.path.basename(path)
+    order = {sheet: i for i, sheet in enumerate(sheets)} if sheets else None
+    sources = np.array([i for i, src in enumerate(index.sources)
+                        if src["file"] == filename and (order is None or src["location"] in order)], dtype=np.int64)
+
+    runs = [max(re.findall(r"\w+", kw), key=len, default="") for kw in _terms(keywords)]
+    if all(runs):
+        terms = sorted({t for run in runs for t in index.terms_containing(run)})
+        ids = [np.asarray(index.post_cells[index.offsets[t]:index.offsets[t + 1]]) for t in terms]
+        cells = np.asarray(index.cells[np.unique(np.concatenate(ids)) if ids else []], dtype=np.int64).reshape(-1, 3)
+    else:
+        # A keyword with no word characters (e.g. "&") can't be looked up: every row is a candidate
+        cells = np.asarray(index.cells, dtype=np.int64)
+    cells = cells[np.isin(cells[:, 0], sources)]
+    rows = {(int(source), int(row)) for source, row in cells[:, :2]}
+    sheet_of = lambda source: index.sources[source]["location"]
+    rank = (lambda key: (order[sheet_of(key[0])], key[1])) if order else None
+
+    count = 0
+    for source, row in sorted(rows, key=rank):
+        text, end = "", None
+        for col, value in index.row_cells(source, row):
+            text += (" " * (col - end) if end is not None else "") + value
+            end = col
+        text = text.strip()
+        match = pattern.search(text.lower())
+        if match is None:
+            continue
+        yield Hit(sheet_of(source), row, match.group(0), _snippet(text, match.group(0)))
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+def find_hits(keywords, path=WORKBOOK_PATH, sheets=None, limit=None, index_dir=INDEX_DIR):
+    """index_hits when index_files.py has indexed this version of the workbook, otherwise iter_hits."""
+    index = open_index(index_dir)
+    if index is not None and index.is_current(path):
+        return index_hits(keywords, index, path, sheets, limit)
+    return iter_hits(keywords, path=path, sheets=sheets, limit=limit)
+
+
+def search(keywords, frames=None, path=WORKBOOK_PATH, sheets=None, limit=None):
+    """Collects iter_hits into a (sheet, row, keyword, snippet) DataFrame."""
+    return pd.DataFrame(list(iter_hits(keywords, frames, path, sheets, limit)), columns=Hit._fields)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search every sheet of the workbook for keywords.")
+    parser.add_argument("keywords", nargs="+")
+    parser.add_argument("--workbook", default=WORKBOOK_PATH)
+    parser.add_argument("--sheet", action="append", help="Restrict to a sheet (repeatable)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many hits")
+    args = parser.parse_args()
+
+    for hit in find_hits(args.keywords, args.workbook, args.sheet, args.limit):
+        print(f"{hit.sheet} | row {hit.row} | {hit.keyword} | {hit.snippet}", flush=True)
@@ -0,0 +1,225 @@
+import argparse
+import json
+import math
+import sys
+import time
+from collections import namedtuple
+from contextlib import redirect_stdout
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from cop_ledger import load_ledger
+from cop_levers import BASE_CLINKER_PCT, clinker_factor, packing
+from data_layer import RAW_MIX_MATERIALS, load_snapshot
+from power_dispatch import dispatch, load_dispatch_inputs
+from raw_mix_optimizer import base_shares
+from scenario_engine import scenario_impact
+from workbook_cache import WORKBOOK_PATH
+
+DEFAULT_PORT = 8765
+
+Waterfall = namedtuple("Waterfall", ["gross_profit", "operating_profit", "gross_margin_pct", "operating_margin_pct"])
+Scenario = namedtuple("Scenario", ["profit", "margin_pct"])
+RawMixCost = namedtuple("RawMixCost", ["cost_per_ton", "savings"])
+PowerCost = namedtuple("PowerCost", ["cost", "optimal_cost", "optimal_gas_share_pct"])
+
+
+def _pct(num, den):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / np.where(den != 0, den, 1) * 100, np.nan)
+
+
+def waterfall(net_revenue, raw_material, power_fuel, distribution, fixed_costs):
+    """P&L waterfall: Revenue - Raw Mat - Power = Gross Profit; Gross Profit - Dist - Fixed = Operating Profit."""
+    net_revenue, raw_material, power_fuel, distribution, fixed_costs = (
+        np.asarray(x, dtype=float) for x in (net_revenue, raw_material, power_fuel, distribution, fixed_costs))
+    gross = net_revenue - raw_material - power_fuel
+    operating = gross - distribution - fixed_costs
+    return Waterfall(gross, operating, _pct(gross, net_revenue), _pct(operating, net_revenue))
+
+
+def scenario(fuel_pct, volume_pct, price_pct, base_revenue, base_fuel_cost, base_profit):
+    """Scenario Simulator profit and margin (%) for fuel/volume/price variances in percent."""
+    return Scenario(*scenario_impact(fuel_pct, volume_pct, price_pct, base_revenue, base_fuel_cost, base_profit))
+
+
+def raw_mix_cost(shares, costs, base_shares=None, total_raw_mix_t=0.0):
+    """Cost per ton of one or many mixes (last axis = materials, shares in % normalized to 100).
+
+    Savings are against `base_shares` over the month's total raw mix tonnage.
+    """
+    shares, costs = np.asarray(shares, dtype=float), np.asarray(costs, dtype=float)
+    cost = shares @ costs / shares.sum(axis=-1)
+    if base_shares is None:
+        return RawMixCost(cost, np.zeros_like(cost))
+    base = np.asarray(base_shares, dtype=float)
+    return RawMixCost(cost, (base @ costs / base.sum() - cost) * total_raw_mix_t)
+
+
+def power_cost(demand, gas_share_pct, hfo_cost, gas_cost, gas_cap_pct=100.0):
+    """Monthly generation cost at a gas share (%), and the least-cost split under a gas cap (% of generation)."""
+    demand, share = np.asarray(demand, dtype=float), np.asarray(gas_share_pct, dtype=float) / 100
+    cost = demand * (share * gas_cost + (1 - share) * hfo_cost)
+    best = dispatch(demand, demand * np.asarray(gas_cap_pct, dtype=float) / 100, hfo_cost, gas_cost)
+    return PowerCost(cost, best.cost, best.gas_share * 100)
+
+
+def clinker_savings(target_clinker_pct, cement_t):
+    """Clinker factor savings with the strength guardrail (status 0 = unsellable, 1 = quality risk, 2 = approved)."""
+    return clinker_factor(target_clinker_pct, cement_t)
+
+
+def packing_savings(bag_gsm, total_bags, avg_bag_cost):
+    """Net packing saving of a paper bag GSM, breakage included."""
+    return packing(bag_gsm, total_bags, avg_bag_cost)
+
+
+KERNELS = {
+    "waterfall": waterfall,
+    "scenario": scenario,
+    "raw_mix_cost": raw_mix_cost,
+    "power_cost": power_cost,
+    "clinker_factor": clinker_savings,
+    "packing": packing_savings,
+}
+
+
+@lru_cache(maxsize=4)
+def defaults(path=WORKBOOK_PATH):
+    """Base inputs for every kernel from the workbook (or the demo snapshot), so callers only pass what varies."""
+    snap = load_snapshot(path)
+    periods, costs = load_dispatch_inputs(snap, path)
+    return {
+        "waterfall": {"net_revenue": snap.net_revenue, "raw_material": snap.raw_material,
+                      "power_fuel": snap.power_fuel, "distribution": snap.distribution,
+                      "fixed_costs": snap.fixed_costs},
+        "scenario": {"fuel_pct": 0.0, "volume_pct": 0.0, "price_pct": 0.0, "base_revenue": snap.net_revenue,
+                     "base_fuel_cost": snap.power_fuel, "base_profit": snap.net_profit},
+        "raw_mix_cost": {"shares": base_shares(snap).tolist(),
+                         "costs": load_ledger(path).issue_rates(RAW_MIX_MATERIALS).tolist(),
+                         "base_shares": base_shares(snap).tolist(), "total_raw_mix_t": snap.total_raw_mix_t},
+        "power_cost": {"demand": float(periods["demand"].iloc[-1]), "gas_share_pct": 20.0,
+                       "hfo_cost": float(costs["hfo_cost"][-1]), "gas_cost": float(costs["gas_cost"][-1]),
+                       "gas_cap_pct": 40.0},
+        "clinker_factor": {"target_clinker_pct": BASE_CLINKER_PCT, "cement_t": snap.cement_t},
+        "packing": {"bag_gsm": 80, "total_bags": snap.paper_bags, "avg_bag_cost": snap.paper_bag_cost},
+    }
+
+
+def _jsonable(value):
+    value = np.asarray(value)
+    if value.dtype.kind == "f":
+        # JSON has no NaN/inf: they go out as null
+        value = np.where(np.isfinite(value), value, None)
+    return value.tolist()
+
+
+def evaluate(name, params=None, path=WORKBOOK_PATH):
+    """Runs one kernel on JSON-style params (scalars or lists) over the defaults; returns {field: list or number}."""
+    if name not in KERNELS:
+        raise KeyError(f"unknown kernel '{name}' (available: {', '.join(KERNELS)})")
+    inputs = {**defaults(path)[name], **(params or {})}
+    result = KERNELS[name](**inputs)
+    return {field: _jsonable(v) for field, v in result._asdict().items()}
+
+
+class KernelHandler(BaseHTTPRequestHandler):
+    """GET / lists kernels and their default inputs; POST /<kernel> with a JSON object of inputs evaluates it."""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.strip("/"):
+            self._send(404, {"error": "GET / lists the kernels; evaluate with POST /<kernel>"})
+        else:
+            self._send(200, {"kernels": defaults(WORKBOOK_PATH)})
+
+    def do_POST(self):
+        name = self.path.strip("/")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            start = time.perf_counter()
+            result = evaluate(name, params)
+            self._send(200, {"kernel": name, "result": result, "ms": (time.perf_counter() - start) * 1000})
+        except KeyError as e:
+            self._send(404, {"error": str(e).strip("'\"")})
+        except (TypeError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        print(f"[kernel] {self.address_string()} {format % args}")
+
+
+def serve(port=DEFAULT_PORT, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), KernelHandler)
+    print(f"Margin kernel on http://{host}:{port}/ ({', '.join(KERNELS)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _parse_params(pairs):
+    """key=value arguments; values are JSON (numbers, lists), anything else is kept as text."""
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard calculations without Streamlit: one-off, batch or HTTP.")
+    parser.add_argument("kernel", nargs="?", choices=list(KERNELS), help="Kernel to evaluate once")
+    parser.add_argument("params", nargs="*", help="key=value inputs, e.g. fuel_pct='[-10,0,10]'")
+    parser.add_argument("--batch", metavar="JSONL", help='File of {"kernel": ..., "params": {...}} lines ("-" for stdin)')
+    parser.add_argument("--serve", action="store_true", help="Serve the kernels over local HTTP")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    # Loader notices go to stderr so stdout stays machine-readable JSON
+    with redirect_stdout(sys.stderr):
+        defaults(WORKBOOK_PATH)
+
+    if args.serve:
+        serve(args.port)
+    elif args.batch:
+        # One result line per request line, in order; a failed request reports its error and the rest continue
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        with source:
+            for line in source:
+                if not line.strip():
+                    continue
+                request = None
+                try:
+                    request = json.loads(line)
+                    print(json.dumps({"kernel": request["kernel"],
+                                      "result": evaluate(request["kernel"], request.get("params"))}))
+                except (AttributeError, KeyError, TypeError, ValueError) as e:
+                    # Malformed JSON or a line that isn't a request object gets an error line too
+                    kernel = request.get("kernel") if isinstance(request, dict) else None
+                    print(json.dumps({"kernel": kernel, "error": str(e)}))
+    elif args.kernel:
+        start = time.perf_counter()
+        result = evaluate(args.kernel, _parse_params(args.params))
+        elapsed = time.perf_counter() - start
+        print(json.dumps(result))
+        n = max(len(v) if isinstance(v, list) else 1 for v in result.values())
+        print(f"{n:,} evaluations in {elapsed * 1000:.1f} ms ({n / elapsed if elapsed else math.inf:,.0f}/s)",
+              file=sys.stderr)
+    else:
+        parser.print_help()
@@ -1,152 +1,273 @@
+import argparse
+import base64
+import glob
+import os
+import re
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import markdown
 from xhtml2pdf import pisa
-import os
-import pathlib
 
-def convert_md_to_pdf(md_file_path, pdf_file_path):
-    # Read Markdown content
-    with open(md_file_path, 'r', encoding='utf-8') as md_file:
-        md_content = md_file.read()
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo icon no-bg.png")
 
-    # Convert Markdown to HTML
-    html_content = markdown.markdown(md_content, extensions=['tables'])
+# Tables up to this many rows are kept on one page; longer ones (e.g. the file_index.md sheet
+# previews) are split into chunks of this size with the header repeated. xhtml2pdf lays out and
+# re-splits a table as one block, which gets quadratically slower as it grows.
+TABLE_CHUNK_ROWS = 40
 
-    # Custom Page Breaks
-    html_content = html_content.replace('<!-- pagebreak -->', '<pdf:nextpage />')
-    
-    # Wrap tables to prevent breaking inside, and ensure headings stay with them
-    # This is a bit of a hack for xhtml2pdf, but <pdf:nextpage /> before table if needed is hard to calculate.
-    # We rely on CSS 'page-break-inside: avoid' which xhtml2pdf supports on <div> or <table>
-    html_content = html_content.replace('<table>', '<table style="-pdf-keep-with-next: true; page-break-inside: avoid;">')
-    
-    # Add page number to footer
-    html_footer = """
-    <div id="footer_content" style="font-size: 9px; text-align: center; border-top: 1px solid #eee; padding-top: 5px;">Page <pdf:pagenumber> of <pdf:pagecount></div>
-    """
-    # Add basic styling for PDF with Nyrix Branding
-    # Branding Colors: Purple (#8A5CF5), Dark BG (#0A0A0A) - adapted for white paper
-    # Use absolute path for image, xhtml2pdf prefers this over URIs for local files usually
-    logo_path = r"c:\Users\Gigabyte\Desktop\lucky cement testing\logo icon no-bg.png"
-    if not os.path.exists(logo_path):
-        print(f"Warning: Logo not found at {logo_path}")
-    
-    styled_html = f"""
+RenderResult = namedtuple("RenderResult", ["md_path", "pdf_path", "ok", "ms", "error"])
+
+# Basic styling for PDF with Nyrix Branding
+# Branding Colors: Purple (#8A5CF5), Dark BG (#0A0A0A) - adapted for white paper
+PAGE_TEMPLATE = """
     <html>
     <head>
     <style>
         /* Removed simple @page for stability - xhtml2pdf has issues with complex page rules in some versions */
-        @page {{
+        @page {
             margin: 2cm;
-        }}
-        body {{ 
-            font-family: Helvetica, Arial, sans-serif; 
-            font-size: 11px; 
-            line-height: 1.6; 
-            color: #333; 
+        }
+        body {
+            font-family: Helvetica, Arial, sans-serif;
+            font-size: 11px;
+            line-height: 1.6;
+            color: #333;
             text-align: justify;
-        }}
-        
+        }
+
         /* Header Section with Logo */
-        .header-container {{
+        .header-container {
             text-align: right;
             margin-bottom: 20px;
             /* border-bottom: 3px solid #8A5CF5; Removed per user request */
             padding-bottom: 15px;
-        }}
-        .logo {{
+        }
+        .logo {
             width: 120px;
             height: auto;
-        }}
-        
+        }
+
         /* Typography Branding */
-        h1 {{ 
-            color: #8A5CF5; 
+        h1 {
+            color: #8A5CF5;
             font-size: 24px;
-            margin-top: 0px; 
+            margin-top: 0px;
             margin-bottom: 10px;
             text-align: left; /* Keep headers left-aligned usually looks better even with justified body */
-        }}
-        h2 {{ 
-            color: #2c3e50; 
+        }
+        h2 {
+            color: #2c3e50;
             font-size: 16px;
-            margin-top: 25px; 
+            margin-top: 25px;
             margin-bottom: 10px;
             /* border-bottom: 1px solid #e0e0e0; Removed per user request */
-            padding-bottom: 5px; 
+            padding-bottom: 5px;
             text-align: left;
-        }}
-        h3 {{ 
-            color: #8A5CF5; 
+        }
+        h3 {
+            color: #8A5CF5;
             font-size: 13px;
-            margin-top: 15px; 
+            margin-top: 15px;
             margin-bottom: 5px;
             text-transform: uppercase;
             text-align: left;
-        }}
-        
+        }
+
         /* Remove Horizontal Rules */
-        hr {{
+        hr {
             display: none;
             border: 0;
-        }}
-        
+        }
+
         /* Table Styling */
-        table {{ width: 100%; border-collapse: collapse; margin: 15px 0; }}
-        th, td {{ border: 1px solid #e0e0e0; padding: 10px; text-align: left; }}
-        th {{ 
+        table { width: 100%; border-collapse: collapse; margin: 15px 0; }
+        th, td { border: 1px solid #e0e0e0; padding: 10px; text-align: left; }
+        th {
             background-color: #f8f5ff; /* Very light purple tint */
             color: #5c3eb5; /* Darker purple for text */
             font-weight: bold;
             border-bottom: 2px solid #8A5CF5;
-        }}
-        
+        }
+
         /* Blockquotes/Notes */
-        blockquote {{ 
-            background-color: #f8f9fa; 
-            border-left: 4px solid #8A5CF5; 
-            margin: 1.5em 0; 
-            padding: 10px 15px; 
-            font-style: italic; 
+        blockquote {
+            background-color: #f8f9fa;
+            border-left: 4px solid #8A5CF5;
+            margin: 1.5em 0;
+            padding: 10px 15px;
+            font-style: italic;
             color: #555;
-        }}
-        code {{ background-color: #f4f4f4; padding: 2px 5px; border-radius: 3px; font-family: monospace; }}
-        
+        }
+        code { background-color: #f4f4f4; padding: 2px 5px; border-radius: 3px; font-family: monospace; }
+
         /* Pricing Table Specifics */
-        tr:nth-child(even) {{ background-color: #fcfcfc; }}
-        
+        tr:nth-child(even) { background-color: #fcfcfc; }
+
     </style>
     </head>
     <body>
     <div class="header-container">
-        <img src="{logo_path}" class="logo" />
+        <img src="@@LOGO@@" class="logo" />
     </div>
-    {html_content}
+    @@BODY@@
     </body>
     </html>
     """
 
-    # Write HTML to temporary file (optional, for debugging)
-    with open('temp_debug.html', 'w', encoding='utf-8') as f:
-        f.write(styled_html)
-    print("Saved temp_debug.html for verification")
+KEEP_TOGETHER = '<table style="-pdf-keep-with-next: true; page-break-inside: avoid;">'
+TABLE = re.compile(r"<table>(.*?)</table>", re.DOTALL)
+ROW = re.compile(r"<tr>.*?</tr>", re.DOTALL)
+
+# Per-process state: the page wrapper with the logo already embedded, and a reusable Markdown parser
+_page = None
+_md = None
 
-    # Convert HTML to PDF
-    with open(pdf_file_path, "wb") as pdf_file:
-        pisa_status = pisa.CreatePDF(styled_html, dest=pdf_file)
 
-    if pisa_status.err:
-        print(f"Error converting Markdown to PDF: {pisa_status.err}")
-        return False
+def compile_page(logo_path=LOGO_PATH):
+    """Splits the page template around the body, with the logo embedded as a data URI (read once)."""
+    logo = ""
+    if os.path.exists(logo_path):
+        with open(logo_path, "rb") as f:
+            logo = "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
     else:
-        print(f"Successfully created PDF: {pdf_file_path}")
-        return True
+        print(f"Warning: Logo not found at {logo_path}")
+    head, tail = PAGE_TEMPLATE.replace("@@LOGO@@", logo).split("@@BODY@@")
+    return head, tail
+
+
+def _init_worker(page):
+    global _page
+    _page = page
+
+
+def _split_table(match):
+    # Wrap tables to prevent breaking inside, and ensure headings stay with them; long tables
+    # are cut into chunks that may break between them, each repeating the header row
+    body = match.group(1)
+    rows = ROW.findall(body)
+    head_end = body.find("</thead>")
+    header = ROW.findall(body[:head_end]) if head_end >= 0 else []
+    rows = rows[len(header):]
+    if len(rows) <= TABLE_CHUNK_ROWS:
+        return KEEP_TOGETHER + body + "</table>"
+    thead = "<thead>" + "".join(header) + "</thead>" if header else ""
+    return "".join(f'<table repeat="1">{thead}<tbody>{"".join(rows[i:i + TABLE_CHUNK_ROWS])}</tbody></table>'
+                   for i in range(0, len(rows), TABLE_CHUNK_ROWS))
+
+
+def render_html(md_content):
+    """Full page HTML for one Markdown document."""
+    global _page, _md
+    if _page is None:
+        _page = compile_page()
+    if _md is None:
+        _md = markdown.Markdown(extensions=['tables'])
+
+    # Convert Markdown to HTML
+    html_content = _md.reset().convert(md_content)
+
+    # Custom Page Breaks
+    html_content = html_content.replace('<!-- pagebreak -->', '<pdf:nextpage />')
+    html_content = TABLE.sub(_split_table, html_content)
+    return _page[0] + html_content + _page[1]
+
+
+def convert_md_to_pdf(md_file_path, pdf_file_path, debug_html=False):
+    # Read Markdown content
+    with open(md_file_path, 'r', encoding='utf-8') as md_file:
+        md_content = md_file.read()
+    styled_html = render_html(md_content)
+
+    # Unique temp names next to the output: concurrent renders never share a file, and a
+    # failed render never leaves a half-written PDF under the final name
+    out_dir = os.path.dirname(os.path.abspath(pdf_file_path))
+    stem = os.path.splitext(os.path.basename(pdf_file_path))[0]
+    if debug_html:
+        fd, html_path = tempfile.mkstemp(prefix=f"{stem}.", suffix=".html", dir=out_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(styled_html)
+        print(f"Saved {html_path} for verification")
+
+    # Convert HTML to PDF
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{stem}.", suffix=".pdf.tmp", dir=out_dir)
+    try:
+        with os.fdopen(fd, "wb") as pdf_file:
+            pisa_status = pisa.CreatePDF(styled_html, dest=pdf_file)
+        if pisa_status.err:
+            print(f"Error converting Markdown to PDF: {pisa_status.err}")
+            return False
+        os.replace(tmp_path, pdf_file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Successfully created PDF: {pdf_file_path}")
+    return True
+
+
+def _render(md_path, pdf_path, debug_html):
+    start = time.perf_counter()
+    try:
+        ok = convert_md_to_pdf(md_path, pdf_path, debug_html)
+        error = None if ok else "xhtml2pdf reported errors"
+    except Exception as e:
+        ok, error = False, str(e)
+    return RenderResult(md_path, pdf_path, ok, (time.perf_counter() - start) * 1000, error)
+
+
+def convert_batch(jobs, workers=None, debug_html=False, logo_path=LOGO_PATH):
+    """Renders [(md_path, pdf_path), ...] across a process pool; returns RenderResults in completion order.
+
+    The page template and logo are prepared once here and handed to each worker at start-up.
+    """
+    page = compile_page(logo_path)
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(page)
+        return [_report(_render(md, pdf, debug_html)) for md, pdf in jobs]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(page,)) as pool:
+        futures = [pool.submit(_render, md, pdf, debug_html) for md, pdf in jobs]
+        for future in as_completed(futures):
+            results.append(_report(future.result()))
+    return results
+
+
+def _report(result):
+    status = "ok" if result.ok else f"FAILED ({result.error})"
+    print(f"[render] {os.path.basename(result.md_path)} -> {result.pdf_path}: {result.ms:,.0f} ms {status}")
+    return result
+
+
+def _inputs(paths):
+    """Markdown files from the arguments; directories contribute their *.md files."""
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "*.md"))) if os.path.isdir(path) else [path]
+    return files
+
 
 if __name__ == "__main__":
-    md_path = r"C:\Users\Gigabyte\.gemini\antigravity\brain\7f56243b-8adf-4097-bd8b-c4bc9028ae36\Nyrix_AI_Proposal_Lucky_Cement.md"
-    # Using a new filename to avoid file lock issues
-    pdf_path = r"c:\Users\Gigabyte\Desktop\lucky cement testing\Nyrix_Proposal_Final.pdf"
-    
-    if os.path.exists(md_path):
-        convert_md_to_pdf(md_path, pdf_path)
+    parser = argparse.ArgumentParser(description="Render Markdown documents to branded PDFs, in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Markdown files or directories of them")
+    parser.add_argument("-o", "--out-dir", help="Where PDFs go (default: next to each input)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU, at most one per file)")
+    parser.add_argument("--debug-html", action="store_true", help="Also keep the generated HTML of each document")
+    args = parser.parse_args()
+
+    files = _inputs(args.inputs)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    jobs = [(md, os.path.join(args.out_dir or os.path.dirname(os.path.abspath(md)),
+                              os.path.splitext(os.path.basename(md))[0] + ".pdf")) for md in files]
+    if not jobs:
+        print("No Markdown files found")
     else:
-        print(f"Markdown file not found: {md_path}")
+        start = time.perf_counter()
+        results = convert_batch(jobs, args.workers, args.debug_html)
+        failed = sum(not r.ok for r in results)
+        print(f"{len(results) - failed} of {len(results)} documents rendered in {time.perf_counter() - start:,.1f} s "
+              f"(sum of render times {sum(r.ms for r in results) / 1000:,.1f} s)")
@@ -0,0 +1,112 @@
+import argparse
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from scenario_engine import VOLUME_REVENUE_FACTOR, scenario_impact
+
+DRIVERS = ("HFO/Gas Price", "Clinker Volume", "Cement Price")
+PERCENTILES = (5, 50, 95)
+
+
+@dataclass(frozen=True)
+class RiskConfig:
+    """Inputs of one margin-at-risk run; frozen so it can key the result cache."""
+    base_revenue: float
+    base_fuel_cost: float
+    base_profit: float
+    base_gross_profit: float
+    mean_pct: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    stdev_pct: Tuple[float, float, float] = (10.0, 5.0, 4.0)
+    # Fuel/volume/price correlation: dearer fuel tends to come with firmer cement prices
+    correlation: Tuple[Tuple[float, ...], ...] = ((1.0, -0.2, 0.4), (-0.2, 1.0, -0.3), (0.4, -0.3, 1.0))
+    draws: int = 1_000_000
+    seed: int = 2026
+    chunk_size: int = 250_000
+    workers: int = 1
+
+    def __post_init__(self):
+        if self.draws < 1 or self.chunk_size < 1:
+            raise ValueError(f"draws and chunk_size must be at least 1 (got {self.draws:,} and {self.chunk_size:,})")
+
+
+RiskResult = namedtuple("RiskResult", ["profit", "margin", "prob_loss", "profit_hist", "draws", "seconds"])
+
+
+def _cholesky(correlation, stdev):
+    cov = np.asarray(correlation, dtype=float) * np.outer(stdev, stdev)
+    # Tiny jitter keeps user-entered, borderline-singular matrices factorizable
+    return np.linalg.cholesky(cov + np.eye(len(stdev)) * 1e-12)
+
+
+def _simulate_chunk(config, seed_seq, n):
+    """Draws `n` correlated variances and returns (net profit, gross margin %) arrays."""
+    rng = np.random.default_rng(seed_seq)
+    chol = _cholesky(config.correlation, config.stdev_pct)
+    variances = rng.standard_normal((n, 3)) @ chol.T + np.asarray(config.mean_pct)
+    fuel, volume, price = variances.T
+
+    profit, _ = scenario_impact(fuel, volume, price, config.base_revenue, config.base_fuel_cost, config.base_profit)
+    # Gross profit moves by the same revenue and fuel impacts as net profit in this model
+    revenue = config.base_revenue * (1 + price / 100 + volume / 100 * VOLUME_REVENUE_FACTOR)
+    gross = config.base_gross_profit + (profit - config.base_profit)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = gross / revenue * 100
+    return profit, margin
+
+
+def _chunks(config):
+    sizes = [config.chunk_size] * (config.draws // config.chunk_size)
+    if config.draws % config.chunk_size:
+        sizes.append(config.draws % config.chunk_size)
+    # One child seed per chunk: results are identical whatever the worker count
+    return list(zip(np.random.SeedSequence(config.seed).spawn(len(sizes)), sizes))
+
+
+@lru_cache(maxsize=32)
+def simulate(config):
+    """Runs the Monte Carlo for `config`; repeated configs are served from the cache."""
+    start = time.perf_counter()
+    chunks = _chunks(config)
+    if config.workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=config.workers) as pool:
+            results = list(pool.map(_simulate_chunk, [config] * len(chunks), *zip(*chunks)))
+    else:
+        results = [_simulate_chunk(config, seed, n) for seed, n in chunks]
+
+    profit = np.concatenate([r[0] for r in results])
+    margin = np.concatenate([r[1] for r in results])
+    return RiskResult(
+        profit=dict(zip(PERCENTILES, np.percentile(profit, PERCENTILES))),
+        margin=dict(zip(PERCENTILES, np.nanpercentile(margin, PERCENTILES))),
+        prob_loss=float((profit < 0).mean()),
+        profit_hist=np.histogram(profit, bins=60),
+        draws=config.draws,
+        seconds=time.perf_counter() - start,
+    )
+
+
+if __name__ == "__main__":
+    from data_layer import DEFAULT_SNAPSHOT as snap
+
+    parser = argparse.ArgumentParser(description="Margin-at-risk Monte Carlo over fuel, volume and price.")
+    parser.add_argument("--draws", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=2026)
+    args = parser.parse_args()
+
+    try:
+        config = RiskConfig(snap.net_revenue, snap.power_fuel, snap.net_profit, snap.gross_profit,
+                            draws=args.draws, workers=args.workers, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    result = simulate(config)
+    print(f"{result.draws:,} draws in {result.seconds * 1000:,.0f} ms")
+    for p in PERCENTILES:
+        print(f"P{p}: net profit {result.profit[p]:,.1f} M | gross margin {result.margin[p]:.2f}%")
+    print(f"P(loss): {result.prob_loss:.2%}")
@@ -0,0 +1,216 @@
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_layer import load_snapshot
+from dpr_analytics import load_dpr, monthly_metrics
+from workbook_cache import WORKBOOK_PATH
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".period_store")
+
+PERIOD_FORMATS = ("%b-%y", "%b %y", "%b-%Y", "%b %Y", "%B %Y", "%B-%y", "%Y-%m")
+
+# Derived series: name -> (numerator, denominator, scale); P&L lines are in millions
+RATIOS = {
+    "gross_margin_pct": ("gross_profit", "net_revenue", 100.0),
+    "net_margin_pct": ("net_profit", "net_revenue", 100.0),
+    "power_fuel_per_ton": ("power_fuel", "clinker_production_t", 1e6),
+    "raw_material_per_ton": ("raw_material", "clinker_production_t", 1e6),
+}
+
+
+def period_key(label, filename=""):
+    """'Jan-26', 'Jan 2026', ... -> '2026-01'; falls back to a month named in the file name."""
+    for text in (label, os.path.basename(filename)):
+        text = str(text).strip()
+        for fmt in PERIOD_FORMATS:
+            try:
+                return pd.to_datetime(text, format=fmt).strftime("%Y-%m")
+            except ValueError:
+                pass
+        match = re.search(r"([A-Za-z]{3})[a-z]*[\s-]+(\d{2}|\d{4})\b", text)
+        if match:
+            fmt = "%b %y" if len(match.group(2)) == 2 else "%b %Y"
+            try:
+                return pd.to_datetime(f"{match.group(1)} {match.group(2)}", format=fmt).strftime("%Y-%m")
+            except ValueError:
+                pass
+    return None
+
+
+def snapshot_metrics(snapshot):
+    """Flat metric -> value mapping of everything the dashboard reads from one month's P&L and COP."""
+    metrics = {
+        "net_revenue": snapshot.net_revenue,
+        "raw_material": snapshot.raw_material,
+        "power_fuel": snapshot.power_fuel,
+        "distribution": snapshot.distribution,
+        "fixed_costs": snapshot.fixed_costs,
+        "net_profit": snapshot.net_profit,
+        "gross_profit": snapshot.gross_profit,
+        "clinker_production_t": snapshot.clinker_production_t,
+        "total_raw_mix_t": snapshot.total_raw_mix_t,
+        "cement_t": snapshot.cement_t,
+        "paper_bags": snapshot.paper_bags,
+        "paper_bag_cost": snapshot.paper_bag_cost,
+        "hfo_pg_liters": snapshot.hfo_pg_liters,
+        "gas_pg_nm3": snapshot.gas_pg_nm3,
+        "hfo_price_per_liter": snapshot.hfo_price_per_liter,
+        "gas_price_per_nm3": snapshot.gas_price_per_nm3,
+    }
+    for m in snapshot.raw_materials:
+        metrics[f"qty:{m.name}"] = m.qty
+        metrics[f"cost_per_ton:{m.name}"] = m.cost_per_ton
+    return metrics
+
+
+class PeriodStore:
+    """Append-only, period-partitioned columnar store of monthly metrics.
+
+    Each ingest writes a new <period>/<version>/ partition (metric ids + values as .npy) and
+    never rewrites one; the latest version of a period wins. All partitions are small, so
+    they are folded into one dense periods x metrics matrix for range queries.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.refresh()
+
+    def _load_metric_names(self):
+        try:
+            with open(os.path.join(self.store_dir, "metrics.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _latest_versions(self):
+        latest = {}
+        for period in sorted(os.listdir(self.store_dir)):
+            period_dir = os.path.join(self.store_dir, period)
+            if not os.path.isdir(period_dir) or period.startswith("."):
+                continue
+            versions = sorted(v for v in os.listdir(period_dir) if not v.startswith(".tmp-"))
+            if versions:
+                latest[period] = os.path.join(period_dir, versions[-1])
+        return latest
+
+    def refresh(self):
+        """Re-reads the partitions (only needed after another process has appended)."""
+        self.metric_names = self._load_metric_names()
+        self.metric_ids = {m: i for i, m in enumerate(self.metric_names)}
+        latest = self._latest_versions()
+        self.periods = np.array(sorted(latest), dtype=object)
+        self.values = np.full((len(self.periods), len(self.metric_names)), np.nan)
+        self.sources = {}
+        for i, period in enumerate(self.periods):
+            ids = np.load(os.path.join(latest[period], "metrics.npy"))
+            self.values[i, ids] = np.load(os.path.join(latest[period], "values.npy"))
+            with open(os.path.join(latest[period], "meta.json"), encoding="utf-8") as f:
+                self.sources[period] = json.load(f)
+
+    def has(self, period, digest):
+        return self.sources.get(period, {}).get("digest") == digest
+
+    def append(self, period, metrics, source="", digest=None):
+        """Writes one period's metrics as a new partition version."""
+        names = self._load_metric_names()
+        new = [m for m in metrics if m not in set(names)]
+        if new:
+            # The metric dictionary only ever grows, so ids in older partitions stay valid
+            names += new
+            tmp = os.path.join(self.store_dir, f".metrics-{os.getpid()}.json")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(names, f)
+            os.replace(tmp, os.path.join(self.store_dir, "metrics.json"))
+        ids = {m: i for i, m in enumerate(names)}
+
+        version = f"{time.time_ns():020d}-{digest or 'nodigest'}"
+        period_dir = os.path.join(self.store_dir, period)
+        os.makedirs(period_dir, exist_ok=True)
+        tmp = os.path.join(period_dir, f".tmp-{version}")
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "metrics.npy"), np.array([ids[m] for m in metrics], dtype=np.int32))
+        np.save(os.path.join(tmp, "values.npy"), np.array(list(metrics.values()), dtype=np.float64))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"period": period, "source": source, "digest": digest, "ingested": time.time()}, f)
+        os.replace(tmp, os.path.join(period_dir, version))
+        self.refresh()
+
+    def query(self, metrics=None, start=None, end=None):
+        """Periods x metrics DataFrame for start <= period <= end ('YYYY-MM'); ratio names from RATIOS allowed."""
+        lo = 0 if start is None else int(np.searchsorted(self.periods, start, side="left"))
+        hi = len(self.periods) if end is None else int(np.searchsorted(self.periods, end, side="right"))
+        block = pd.DataFrame(self.values[lo:hi], index=pd.Index(self.periods[lo:hi], name="period"),
+                             columns=self.metric_names)
+        metrics = list(self.metric_names) if metrics is None else list(metrics)
+        for name in metrics:
+            if name in RATIOS and name not in block:
+                num, den, scale = RATIOS[name]
+                if num in block and den in block:
+                    block[name] = block[num] / block[den].where(block[den] != 0) * scale
+        return block.reindex(columns=metrics)
+
+
+def ingest_workbook(path, store):
+    """Adds one monthly workbook to the store; skipped when that exact file is already in it.
+
+    Only workbooks whose P&L and COP sheets both parsed are stored: anything else would put the
+    default figures into the history as if they were that month's.
+    """
+    snapshot = load_snapshot(path)
+    missing = [sheet for part, sheet in (("pl", "P&L"), ("cop", "COP")) if part not in snapshot.parts]
+    if missing:
+        print(f"Skipping {path}: {' and '.join(missing)} sheet not readable")
+        return None
+    # The COP title or the file name; never the default snapshot's label
+    label = snapshot.period if "period" in snapshot.parts else ""
+    period = period_key(label, path)
+    if period is None:
+        print(f"Skipping {path}: no period in the COP title or the file name")
+        return None
+    if not store.has(period, snapshot.digest):
+        metrics = snapshot_metrics(snapshot)
+        try:
+            metrics.update(monthly_metrics(load_dpr(path)))
+        except (KeyError, ValueError, StopIteration) as e:
+            print(f"{path}: DPR sheet not usable ({e}), storing P&L and COP only")
+        store.append(period, metrics, os.path.basename(path), snapshot.digest)
+    return period
+
+
+def ingest_folder(base_dir, store, pattern="*.xlsx"):
+    return [p for p in (ingest_workbook(f, store) for f in sorted(glob.glob(os.path.join(base_dir, pattern)))) if p]
+
+
+def clear_store(store_dir=STORE_DIR):
+    shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest monthly workbooks into the period store and query it.")
+    parser.add_argument("--ingest", metavar="DIR", help="Folder of monthly workbooks to add")
+    parser.add_argument("--workbook", default=None, help="Single workbook to add (default: the dashboard's)")
+    parser.add_argument("--metrics", nargs="*", default=["net_revenue", "power_fuel", "power_fuel_per_ton",
+                                                         "gross_margin_pct"])
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    store = PeriodStore(args.store_dir)
+    if args.ingest:
+        print(f"Ingested: {', '.join(ingest_folder(args.ingest, store)) or 'nothing'}")
+    elif args.workbook or os.path.exists(WORKBOOK_PATH):
+        print(f"Ingested: {ingest_workbook(args.workbook or WORKBOOK_PATH, store)}")
+    start = time.perf_counter()
+    result = store.query(args.metrics, args.start, args.end)
+    print(f"{len(result)} periods in {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(result.to_markdown())
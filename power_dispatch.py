@@ -0,0 +1,195 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+PG_ANALYSIS_SHEET = "PG Analysis"
+PG_GENERATION_SHEET = "PG Generation"
+PG_COST_SHEET = "PG Cost"
+
+# No sheet meters gas-fired generation separately, so the gas yield is assumed; the HFO yield is only assumed
+# when neither "PG Generation" nor "PG Analysis" gives one
+HFO_KWH_PER_LITER = 4.2
+GAS_KWH_PER_NM3 = 3.6
+
+# Fallback when the PG sheets aren't available: the original demo energy model (MMBtu)
+DEMO_PERIODS = pd.DataFrame({"period": ["Demo Month"], "demand": [500000.0], "hfo_share": [0.8]})
+DEMO_COSTS = {"unit": "MMBtu", "currency": "USD", "hfo_cost": 12.0, "gas_cost": 4.5}
+
+# Row labels in the "Patriculars" column of "PG Analysis", matched whole and by unit so that e.g. a
+# "Generation from Gas (KWH)" row is never read as gas burnt
+PG_ROWS = {
+    "generation_kwh": r"^(?:units |total |power )?generat\w* \(kwh\)$",
+    "hfo_liters": r"^(?:hfo|fuel oil|furnace oil)(?: consumption)? \(lit\w*\)$",
+    "gas_nm3": r"^(?:natural )?gas(?: consumption)? \(nm3\)$",
+}
+
+Dispatch = namedtuple("Dispatch", ["gas", "hfo", "cost", "gas_share"])
+
+
+def _text(value):
+    return " ".join(str(value).split()).lower() if pd.notna(value) else ""
+
+
+def load_pg_periods(path=WORKBOOK_PATH):
+    """Monthly generation and fuel use from "PG Analysis" as a (period, generation_kwh, hfo_liters, gas_nm3) table."""
+    df = read_sheet(PG_ANALYSIS_SHEET, path)
+    header_row = next(r for r in range(min(len(df), 15))
+                      if df.iloc[r].astype(str).str.strip().str.lower().isin(["patriculars", "particulars"]).any())
+    header = df.iloc[header_row]
+    label_col = header.astype(str).str.strip().str.lower().isin(["patriculars", "particulars"]).idxmax()
+    # Only real date cells are periods; text headers would trip the date parser
+    dates = pd.to_datetime(header.where(header.map(lambda v: hasattr(v, "year"))), errors="coerce")
+    period_cols = dates[dates.notna()].index
+
+    labels = df[label_col].map(_text)
+    table = {"period": dates[period_cols].dt.strftime("%Y-%m").to_numpy()}
+    for field, pattern in PG_ROWS.items():
+        rows = labels.index[(labels.index > header_row) & labels.str.contains(pattern, regex=True)]
+        if len(rows):
+            table[field] = pd.to_numeric(df.loc[rows[0], period_cols], errors="coerce").fillna(0).to_numpy(dtype=float)
+        else:
+            table[field] = np.zeros(len(period_cols))
+    periods = pd.DataFrame(table)
+    return periods[periods["generation_kwh"] > 0].drop_duplicates("period", keep="last").reset_index(drop=True)
+
+
+def load_hfo_yields(path=WORKBOOK_PATH):
+    """Metered HFO yield (kWh per liter) per month from "PG Generation" as a (period, hfo_yield) table.
+
+    The sheet has one block of columns per month ("MONTHLY REPORT" ... "MONTH: <date>") and one row per
+    genset; only gensets that burnt HFO count, and total rows are skipped.
+    """
+    df = read_sheet(PG_GENERATION_SHEET, path)
+    text = df.map(_text).to_numpy()
+    top = text[:15]
+    starts = sorted({int(c) for c in np.nonzero(top == "monthly report")[1]}) or [0]
+    bounds = starts[1:] + [df.shape[1]]
+
+    records = []
+    for start, end in zip(starts, bounds):
+        block = top[:, start:end]
+        gen = np.argwhere(block == "total generation")
+        hfo = np.argwhere(block == "hfo")
+        month = np.argwhere(block == "month:")
+        if not len(gen) or not len(hfo) or not len(month):
+            continue
+        date = pd.to_datetime(df.iat[month[0][0], start + month[0][1] + 1], errors="coerce")
+        if pd.isna(date):
+            continue
+        first = max(gen[0][0], hfo[0][0]) + 1
+        data = df.iloc[first:]
+        kwh = pd.to_numeric(data.iloc[:, start + gen[0][1]], errors="coerce").fillna(0).to_numpy()
+        liters = pd.to_numeric(data.iloc[:, start + hfo[0][1]], errors="coerce").fillna(0).to_numpy()
+        units = np.array(["total" not in t for t in text[first:, start]]) & (kwh > 0) & (liters > 0)
+        if units.any():
+            records.append((date.strftime("%Y-%m"), kwh[units].sum() / liters[units].sum()))
+    if not records:
+        raise ValueError(f"{PG_GENERATION_SHEET}: no month with genset generation and HFO burn")
+    return pd.DataFrame(records, columns=["period", "hfo_yield"]).drop_duplicates("period", keep="last")
+
+
+def load_fuel_prices(path=WORKBOOK_PATH):
+    """Price paid per liter of HFO and per NM3 of gas in "PG Cost": (hfo_price, gas_price, currency).
+
+    Each fuel has a quantity column and an amount column under its heading; total and subtotal rows repeat
+    the same fuel at the same price, so the ratio of the column sums is the month's price either way.
+    """
+    df = read_sheet(PG_COST_SHEET, path)
+    text = df.map(_text).to_numpy()
+    header_row = next(r for r in range(min(len(text), 15)) if {"equipment", "hfo", "natural gas"} <= set(text[r]))
+    units = text[header_row + 1]
+    data = df.iloc[header_row + 2:].apply(pd.to_numeric, errors="coerce")
+
+    prices, currency = [], None
+    for fuel, unit in (("hfo", "(liters)"), ("natural gas", "(nm3)")):
+        col = list(text[header_row]).index(fuel)
+        if units[col] != unit or not re.fullmatch(r"\([a-z]{3}\)", units[col + 1]):
+            raise ValueError(f"{PG_COST_SHEET}: expected {unit} and an amount column under {fuel!r}")
+        qty, amount = data.iloc[:, col].sum(), data.iloc[:, col + 1].sum()
+        if qty <= 0 or amount <= 0:
+            raise ValueError(f"{PG_COST_SHEET}: no {fuel!r} quantity or amount")
+        prices.append(amount / qty)
+        currency = units[col + 1].strip("()").upper()
+    return prices[0], prices[1], currency
+
+
+def unit_costs(periods, hfo_price_per_liter, gas_price_per_nm3, gas_kwh_per_nm3=GAS_KWH_PER_NM3):
+    """Per-period fuel cost per kWh.
+
+    The HFO yield is the metered "hfo_yield" column where there is one; otherwise each month's HFO-fired
+    generation / HFO burnt, where generation includes the gas-fired units, so their share (gas burnt x gas
+    yield) is taken out first.
+    """
+    hfo_kwh = (periods["generation_kwh"] - periods["gas_nm3"] * gas_kwh_per_nm3).clip(lower=0)
+    hfo_yield = np.where(periods["hfo_liters"] > 0,
+                         hfo_kwh / periods["hfo_liters"].where(periods["hfo_liters"] > 0),
+                         HFO_KWH_PER_LITER)
+    if "hfo_yield" in periods:
+        hfo_yield = periods["hfo_yield"].fillna(pd.Series(hfo_yield, index=periods.index)).to_numpy()
+    hfo_yield = np.clip(np.nan_to_num(hfo_yield, nan=HFO_KWH_PER_LITER), 1.0, 10.0)
+    return hfo_price_per_liter / hfo_yield, np.full(len(periods), gas_price_per_nm3 / gas_kwh_per_nm3)
+
+
+def dispatch(demand, gas_cap, hfo_cost, gas_cost, min_hfo_share=0.0):
+    """Least-cost gas/HFO split for every period at once (all arguments broadcast).
+
+    Two fuels, one demand equality and a gas cap: the LP optimum burns as much of the
+    cheaper fuel as the caps allow, so no solver is needed.
+    """
+    demand, gas_cap, hfo_cost, gas_cost = (np.asarray(x, dtype=float) for x in (demand, gas_cap, hfo_cost, gas_cost))
+    gas_limit = np.minimum(gas_cap, demand * (1 - min_hfo_share))
+    gas = np.where(gas_cost < hfo_cost, np.clip(gas_limit, 0, None), 0.0)
+    hfo = demand - gas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(demand > 0, gas / demand, 0.0)
+    return Dispatch(gas, hfo, gas * gas_cost + hfo * hfo_cost, share)
+
+
+def mix_curve(demand, hfo_cost, gas_cost, shares=np.linspace(0, 1, 101)):
+    """Total cost at each gas share (rows) for each period (columns)."""
+    shares = np.asarray(shares, dtype=float)[:, None]
+    return np.asarray(demand, dtype=float)[None, :] * (shares * gas_cost + (1 - shares) * hfo_cost)
+
+
+def actual_costs(periods, hfo_price_per_liter, gas_price_per_nm3):
+    """What each month's recorded fuel burn cost."""
+    return periods["hfo_liters"].to_numpy() * hfo_price_per_liter + periods["gas_nm3"].to_numpy() * gas_price_per_nm3
+
+
+def load_dispatch_inputs(snapshot, path=WORKBOOK_PATH):
+    """Periods table plus per-period costs: from the PG sheets, or the demo model when they can't be read.
+
+    Fuel is priced at what "PG Cost" says the plant paid, else at the COP purchase rates (snapshot currency).
+    """
+    try:
+        periods = load_pg_periods(path)
+        if periods.empty:
+            raise ValueError("no generation data")
+    except (OSError, StopIteration, ValueError, KeyError) as e:
+        print(f"PG sheets not usable, using demo energy model: {e}")
+        periods = DEMO_PERIODS.copy()
+        n = len(periods)
+        return periods, {"unit": DEMO_COSTS["unit"], "currency": DEMO_COSTS["currency"],
+                         "hfo_cost": np.full(n, DEMO_COSTS["hfo_cost"]),
+                         "gas_cost": np.full(n, DEMO_COSTS["gas_cost"]), "actual_cost": None}
+
+    try:
+        periods = periods.merge(load_hfo_yields(path), on="period", how="left")
+    except (OSError, StopIteration, ValueError, KeyError) as e:
+        print(f"{PG_GENERATION_SHEET} not usable, deriving the HFO yield from {PG_ANALYSIS_SHEET}: {e}")
+    try:
+        hfo_price, gas_price, currency = load_fuel_prices(path)
+    except (OSError, StopIteration, ValueError, KeyError) as e:
+        print(f"{PG_COST_SHEET} not usable, pricing fuel at the COP purchase rates: {e}")
+        hfo_price, gas_price, currency = snapshot.hfo_price_per_liter, snapshot.gas_price_per_nm3, snapshot.currency
+
+    periods["demand"] = periods["generation_kwh"]
+    gas_kwh = periods["gas_nm3"] * GAS_KWH_PER_NM3
+    periods["hfo_share"] = np.clip(1 - gas_kwh / periods["demand"], 0, 1)
+    hfo_cost, gas_cost = unit_costs(periods, hfo_price, gas_price)
+    return periods, {"unit": "kWh", "currency": currency, "hfo_cost": hfo_cost, "gas_cost": gas_cost,
+                     "actual_cost": actual_costs(periods, hfo_price, gas_price)}
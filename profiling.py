@@ -0,0 +1,182 @@
+import argparse
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# NYRIX_PROFILE=1 turns recording on at import; NYRIX_PROFILE_LOG=<file> also appends the buffer there at exit
+BUFFER_SIZE = 5000
+LOG_PATH = os.environ.get("NYRIX_PROFILE_LOG")
+
+Sample = namedtuple("Sample", ["section", "started", "wall_ms", "cpu_ms", "peak_kb", "thread"])
+
+_buffer = deque(maxlen=BUFFER_SIZE)
+_local = threading.local()
+_peak_owner = threading.Lock()
+_enabled = False
+_DISABLED = nullcontext()
+
+
+def enable(trace_memory=True):
+    """Starts recording; peak memory needs tracemalloc, which slows allocations while it runs."""
+    global _enabled
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextmanager
+def peak_memory():
+    """Yields a one-item list that holds the block's peak traced memory in bytes on exit (None when not measured).
+
+    tracemalloc keeps one peak counter for the whole process, so only one thread measures at a time: blocks
+    on other threads meanwhile get None. Even then the peak counts every thread's allocations, so it is
+    approximate while other sessions are busy.
+    """
+    result = [None]
+    if not tracemalloc.is_tracing():
+        yield result
+        return
+    # Nested blocks share the counter: before a child resets it, the parent's peak so far is saved on the
+    # parent's frame, and the child's peak is handed back on exit
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    owned = stack[-1][2] if stack else _peak_owner.acquire(blocking=False)
+    current = 0
+    if owned:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+    frame = [current, 0, owned]
+    stack.append(frame)
+    try:
+        yield result
+    finally:
+        stack.pop()
+        if owned and tracemalloc.is_tracing():
+            top = max(tracemalloc.get_traced_memory()[1], frame[1])
+            result[0] = top - frame[0]
+            if stack:
+                stack[-1][1] = max(stack[-1][1], top)
+        if owned and not stack:
+            _peak_owner.release()
+
+
+@contextmanager
+def _measure(name):
+    peak = [None]
+    started, wall, cpu = time.time(), time.perf_counter(), time.thread_time()
+    try:
+        with peak_memory() as peak:
+            yield
+    finally:
+        wall_ms = (time.perf_counter() - wall) * 1000
+        cpu_ms = (time.thread_time() - cpu) * 1000
+        peak_kb = peak[0] / 1024 if peak[0] is not None else float("nan")
+        _buffer.append(Sample(name, started, wall_ms, cpu_ms, peak_kb, threading.current_thread().name))
+
+
+def section(name):
+    """Context manager timing one named block; a shared no-op when profiling is off."""
+    return _measure(name) if _enabled else _DISABLED
+
+
+def profiled(name=None):
+    """Decorator form of section(); the name defaults to the function's."""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _measure(label):
+                return func(*args, **kwargs)
+        return run
+    return decorate
+
+
+def samples():
+    return list(_buffer)
+
+
+def clear():
+    _buffer.clear()
+
+
+def to_frame(records=None):
+    return pd.DataFrame(samples() if records is None else records, columns=Sample._fields)
+
+
+def summary(records=None):
+    """Per-section calls, total/mean/p95 wall time, CPU time and worst peak memory."""
+    df = to_frame(records)
+    if df.empty:
+        return pd.DataFrame(columns=["calls", "total_ms", "mean_ms", "p95_ms", "cpu_ms", "peak_kb"])
+    grouped = df.groupby("section")
+    return pd.DataFrame({
+        "calls": grouped.size(),
+        "total_ms": grouped["wall_ms"].sum(),
+        "mean_ms": grouped["wall_ms"].mean(),
+        "p95_ms": grouped["wall_ms"].quantile(0.95),
+        "cpu_ms": grouped["cpu_ms"].sum(),
+        "peak_kb": grouped["peak_kb"].max(),
+    }).sort_values("total_ms", ascending=False)
+
+
+def to_jsonl(records=None):
+    return "".join(json.dumps(s._asdict()) + "\n" for s in (samples() if records is None else records))
+
+
+def export_jsonl(path, records=None):
+    """Appends the samples to a JSON lines file; returns how many were written."""
+    records = samples() if records is None else records
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl(records))
+    return len(records)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [Sample(**json.loads(line)) for line in f if line.strip()]
+
+
+if os.environ.get("NYRIX_PROFILE") == "1":
+    enable()
+    if LOG_PATH:
+        atexit.register(lambda: export_jsonl(LOG_PATH))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise a profiling JSON lines export.")
+    parser.add_argument("path")
+    parser.add_argument("--section", help="Only sections whose name contains this text")
+    args = parser.parse_args()
+
+    records = read_jsonl(args.path)
+    if args.section:
+        records = [r for r in records if args.section in r.section]
+    print(f"{len(records):,} samples from {args.path}\n")
+    print(summary(records).to_markdown(floatfmt=".1f"))
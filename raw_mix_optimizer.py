@@ -0,0 +1,102 @@
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_layer import RAW_MIX_MATERIALS
+
+# Composition bounds (% of raw mix) that keep the kiln feed chemistry workable
+DEFAULT_BOUNDS = OrderedDict([
+    ("Limestones (Low Sulpher)", (70.0, 92.0)),
+    ("Limestones (High Sulpher)", (0.0, 10.0)),
+    ("Clay", (5.0, 15.0)),
+    ("Iron Ore", (1.5, 5.0)),
+    ("Bauxite", (0.0, 2.0)),
+    ("Silica Sand", (0.0, 3.0)),
+])
+
+MixSolution = namedtuple("MixSolution", ["shares", "cost_per_ton", "feasible"])
+
+
+def _solve_batch(costs, order, lower, upper):
+    """Exact LP optimum of min c.x s.t. sum(x) = 100, lower <= x <= upper, for K bound sets at once.
+
+    With only box bounds and the 100% equality the LP is solved by filling the cheapest
+    materials first, so all K problems reduce to one cumulative sum over the cost order.
+    """
+    lower, upper = np.atleast_2d(lower), np.atleast_2d(upper)
+    remaining = 100.0 - lower.sum(axis=1, keepdims=True)
+    room = (upper - lower)[:, order]
+    filled_before = np.cumsum(room, axis=1) - room
+    extra = np.clip(remaining - filled_before, 0.0, room)
+
+    shares = lower.copy()
+    shares[:, order] += extra
+    feasible = (remaining[:, 0] >= -1e-9) & (room.sum(axis=1) >= remaining[:, 0] - 1e-9)
+    return shares, shares @ costs / 100, feasible
+
+
+class RawMixOptimizer:
+    """Minimum-cost raw mix over the COP sheet materials.
+
+    The cost ordering is computed once per price vector and reused by every re-solve, and
+    solutions are memoized per bound set, so a widget change costs microseconds.
+    """
+
+    def __init__(self, names, costs, cache_size=256):
+        self.names = list(names)
+        self.costs = np.asarray(costs, dtype=float)
+        self.order = np.argsort(self.costs, kind="stable")
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(RAW_MIX_MATERIALS, [snapshot.material(n).cost_per_ton for n in RAW_MIX_MATERIALS])
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """Prices each material at its weighted-average cost after the month's receipts."""
+        return cls(RAW_MIX_MATERIALS, ledger.issue_rates(RAW_MIX_MATERIALS))
+
+    def _bounds(self, bounds):
+        bounds = {**DEFAULT_BOUNDS, **(bounds or {})}
+        lower = np.array([bounds[n][0] for n in self.names], dtype=float)
+        upper = np.array([bounds[n][1] for n in self.names], dtype=float)
+        return lower, upper
+
+    def solve(self, bounds=None):
+        """Optimal shares (%) for {material: (min %, max %)}; unspecified materials use DEFAULT_BOUNDS."""
+        lower, upper = self._bounds(bounds)
+        key = (lower.tobytes(), upper.tobytes())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        shares, cost, feasible = _solve_batch(self.costs, self.order, lower, upper)
+        solution = MixSolution(pd.Series(shares[0], index=self.names), float(cost[0]), bool(feasible[0]))
+        self._cache[key] = solution
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return solution
+
+    def cost_of(self, shares):
+        """Cost per ton of a given mix (shares in %, normalized to 100)."""
+        shares = np.asarray(shares, dtype=float)
+        return float(shares @ self.costs / shares.sum())
+
+    def frontier(self, material, values, side="lower", bounds=None):
+        """Optimal cost per ton as one bound of `material` sweeps `values` (all points solved in one pass)."""
+        lower, upper = self._bounds(bounds)
+        values = np.asarray(values, dtype=float)
+        lower = np.repeat(lower[None, :], len(values), axis=0)
+        upper = np.repeat(upper[None, :], len(values), axis=0)
+        j = self.names.index(material)
+        (lower if side == "lower" else upper)[:, j] = values
+        shares, cost, feasible = _solve_batch(self.costs, self.order, lower, upper)
+        return pd.DataFrame({"bound": values, "cost_per_ton": np.where(feasible, cost, np.nan), "feasible": feasible})
+
+
+def base_shares(snapshot):
+    """Current mix (%) from the COP sheet quantities."""
+    qty = np.array([snapshot.material(n).qty for n in RAW_MIX_MATERIALS], dtype=float)
+    return pd.Series(qty / qty.sum() * 100, index=RAW_MIX_MATERIALS)
@@ -1,6 +1,6 @@
-import pandas as pd
+from workbook_cache import read_sheet
 try:
-    df = pd.read_excel('NAS - PL  Jan 26-KAK.xlsx', sheet_name='COP', header=None)
+    df = read_sheet('COP')
     # Get first 60 rows and 15 columns to capture the structure
     preview = df.iloc[0:60, 0:15]
     with open('cop_sheet_preview.md', 'w') as f:
@@ -0,0 +1,102 @@
+import argparse
+import os
+import statistics
+import subprocess
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_app.py")
+
+# (tab, widget type, label, two values to alternate between): one slider/select per interactive section
+INTERACTIONS = [
+    ("Margin Radar", "selectbox", "Metric", ("Gross Margin (%)", "Net Margin (%)")),
+    ("Scenario Simulator", "slider", "HFO/Gas Price Variance", (5, -5)),
+    ("Scenario Simulator", "slider", "HFO/Gas Price Volatility (σ)", (12.0, 8.0)),
+    ("COP Deep Dive", "slider", "Limestones (Low Sulpher)", ((70.0, 90.0), (70.0, 92.0))),
+    ("COP Deep Dive", "slider", "Gas Utilization in PG (%)", (40, 20)),
+    ("COP Deep Dive", "slider", "Target Clinker Factor (%)", (80.0, 83.1)),
+    ("COP Deep Dive", "select_slider", "Paper Bag Specification (GSM)", (75, 80)),
+    ("Dealer Incentives", "slider", "Rate (IQD / Ton)", (500, 1000)),
+]
+
+
+def _widget(at, kind, label):
+    return next((w for w in getattr(at, kind) if w.label == label), None)
+
+
+def _open_tab(at, name):
+    # Apps with lazily rendered tabs keep the selected tab under the tabs' key; AppTest has no
+    # browser to remember it, so it is set again before every run
+    label = next((t.label for t in at.tabs if name in t.label), None)
+    if label is not None:
+        at.session_state["main_tab"] = label
+
+
+def measure(app_path=APP_PATH, repeats=5, timeout=300):
+    """Median wall time of a full script rerun after each interaction.
+
+    AppTest always reruns the whole script, so fragment-scoped sections are measured at their
+    upper bound here; the app logs the fragment-only time ("[rerun] <section>") when served.
+    """
+    # Both apps run in this process: start each from cold caches so neither reuses the other's results
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    results = [("(first load)", "", (time.perf_counter() - start) * 1000)]
+    for tab, kind, label, values in INTERACTIONS:
+        _open_tab(at, tab)
+        at.run()
+        widget = _widget(at, kind, label)
+        if widget is None:
+            results.append((tab, label, float("nan")))
+            continue
+        times = []
+        for i in range(repeats):
+            _widget(at, kind, label).set_value(values[i % 2])
+            _open_tab(at, tab)
+            start = time.perf_counter()
+            at.run()
+            times.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{label}: {at.exception[0].value}")
+        results.append((tab, label, statistics.median(times)))
+    return results
+
+
+def baseline_app(revision, app_path=APP_PATH):
+    """Writes demo_app.py as of `revision` next to the current one (same imports) and returns its path."""
+    source = subprocess.run(["git", "show", f"{revision}:demo_app.py"], cwd=os.path.dirname(app_path),
+                            check=True, capture_output=True, text=True).stdout
+    path = os.path.join(os.path.dirname(app_path), f".demo_app_{revision.replace('/', '_')}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rerun latency per interaction, optionally against an older revision.")
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--baseline", metavar="REV", help="git revision of demo_app.py to compare against")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    before = None
+    if args.baseline:
+        # The baseline goes first, so one-off import costs are charged to it rather than the current app
+        path = baseline_app(args.baseline, args.app)
+        try:
+            before = measure(path, args.repeats)
+        finally:
+            os.remove(path)
+    after = measure(args.app, args.repeats)
+
+    print(f"{'Tab':<20} {'Interaction':<32} " + (f"{'Before (ms)':>12} " if before else "") + f"{'After (ms)':>12}")
+    for i, (tab, label, after_ms) in enumerate(after):
+        row = f"{tab:<20} {label:<32} "
+        if before:
+            row += f"{before[i][2]:>12.0f} "
+        print(row + f"{after_ms:>12.0f}")
@@ -0,0 +1,330 @@
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from inverted_index import latest_build, new_build_dir, publish_build, tokenize
+from profiling import profiled
+from workbook_cache import WORKBOOK_PATH, file_digest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RETRIEVAL_DIR = os.path.join(BASE_DIR, ".retrieval_index")
+FILE_INDEX_PATH = os.path.join(BASE_DIR, "file_index.md")
+DECK_PATH = "YB Holding BOD Presentation Dec 2023.pptx"
+
+# BM25 parameters (standard Okapi defaults)
+K1 = 1.5
+B = 0.75
+
+# Optional dense re-ranking: only used when sentence-transformers is installed and the index was built with it
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_WEIGHT = 0.5
+
+Passage = namedtuple("Passage", ["file", "citation", "text"])
+Hit = namedtuple("Hit", ["score", "file", "citation", "text"])
+
+
+# --- Passage sources ---
+
+def markdown_passages(path=FILE_INDEX_PATH, skip=()):
+    """Slides and sheet preview rows from file_index.md, cited by slide number or sheet/row."""
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    filename, citation, block = None, None, []
+
+    def flush():
+        text = "\n".join(block).strip()
+        if filename not in skip and citation and text:
+            yield Passage(filename, citation, text)
+
+    sheet, table_row = None, None
+    for line in lines:
+        if line.startswith("## "):
+            yield from flush()
+            filename, citation, block, sheet = line[3:].strip(), None, [], None
+        elif re.match(r"Slide \d+:$", line):
+            yield from flush()
+            citation, block = line.rstrip(":"), []
+        elif line.startswith("Sheet: "):
+            yield from flush()
+            sheet, citation, block, table_row = line[7:].strip(), None, [], None
+        elif sheet:
+            # Preview tables: header line, separator, then data rows (Excel row = preview row + 2)
+            if not line.startswith("|"):
+                table_row = None
+            elif table_row is None:
+                table_row = -1
+            elif set(line) <= set("|-: "):
+                table_row = 0
+            elif filename not in skip:
+                cells = [c.strip() for c in line.strip("|").split("|")]
+                text = " | ".join(c for c in cells if c and c != "nan")
+                if text:
+                    yield Passage(filename, f"Sheet {sheet}, row {table_row + 2}", text)
+                table_row += 1
+        elif line.strip() != "---":
+            block.append(line)
+    yield from flush()
+
+
+def sheet_passages(filepath):
+    """One passage per non-empty workbook row (all cells joined), cited by sheet and Excel row."""
+    from workbook_cache import read_workbook
+
+    filename = os.path.basename(filepath)
+    for sheet, df in read_workbook(filepath).items():
+        text = df.astype("string").fillna("").agg(" | ".join, axis=1).str.strip(" |")
+        text = text.str.replace(r"(\s*\|\s*)+", " | ", regex=True)
+        for r in np.flatnonzero(text.str.len().to_numpy() > 0):
+            yield Passage(filename, f"Sheet {sheet}, row {r + 1}", text.iloc[r])
+
+
+def slide_passages(filepath):
+    """One passage per slide of a deck, cited by slide number."""
+    from pptx import Presentation
+
+    filename = os.path.basename(filepath)
+    for i, slide in enumerate(Presentation(filepath).slides):
+        text = "\n".join(s.text for s in slide.shapes if hasattr(s, "text") and s.text)
+        if text.strip():
+            yield Passage(filename, f"Slide {i+1}", text)
+
+
+def default_sources(workbook=WORKBOOK_PATH, deck=DECK_PATH, file_index=FILE_INDEX_PATH):
+    """Files the chat index is built from; file_index.md stands in for any that aren't on disk."""
+    return [p for p in (file_index, workbook, deck) if p and os.path.exists(p)]
+
+
+def default_passages(workbook=WORKBOOK_PATH, deck=DECK_PATH, file_index=FILE_INDEX_PATH):
+    present = default_sources(workbook, deck, file_index)
+    if workbook in present:
+        yield from sheet_passages(workbook)
+    if deck in present:
+        yield from slide_passages(deck)
+    if file_index in present:
+        # Full sources supersede their file_index.md preview
+        yield from markdown_passages(file_index, skip={os.path.basename(p) for p in present})
+
+
+def _embedder():
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    return SentenceTransformer(EMBED_MODEL, device="cpu")
+
+
+# --- Build ---
+
+def build_retrieval_index(passages, index_dir=RETRIEVAL_DIR, sources=(), embed=False):
+    """Writes BM25 postings (term -> doc, tf), doc lengths and passage text as memory-mappable arrays."""
+    files, citations, texts = [], [], []
+    vocab = {}
+    tok_ids, tok_docs = [], []
+    for file, citation, text in passages:
+        doc_id = len(texts)
+        files.append(file)
+        citations.append(citation)
+        texts.append(text.encode("utf-8"))
+        for token in tokenize(text):
+            tok_ids.append(vocab.setdefault(token, len(vocab)))
+            tok_docs.append(doc_id)
+
+    terms = sorted(vocab)
+    rank = np.empty(len(vocab), dtype=np.int64)
+    rank[[vocab[t] for t in terms]] = np.arange(len(terms))
+    tok_rank = rank[np.asarray(tok_ids, dtype=np.int64)]
+    tok_docs = np.asarray(tok_docs, dtype=np.int64)
+    doc_len = np.bincount(tok_docs, minlength=len(texts)).astype(np.float32)
+
+    if texts:
+        # Collapse repeated (term, doc) pairs into one posting carrying the term frequency
+        pairs, tf = np.unique(tok_rank * len(texts) + tok_docs, return_counts=True)
+        post_terms, post_docs = np.divmod(pairs, len(texts))
+    else:
+        # No passages (none of the sources on disk): an empty index still loads and simply finds nothing
+        tf = post_terms = post_docs = np.empty(0, dtype=np.int64)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(post_terms, minlength=len(terms)), out=offsets[1:])
+
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=text_offsets[1:])
+
+    tmp = new_build_dir(index_dir)
+    try:
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "post_docs.npy"), post_docs.astype(np.int32))
+        np.save(os.path.join(tmp, "post_tf.npy"), tf.astype(np.float32))
+        np.save(os.path.join(tmp, "doc_len.npy"), doc_len)
+        np.save(os.path.join(tmp, "text.npy"), np.frombuffer(b"".join(texts), dtype=np.uint8))
+        np.save(os.path.join(tmp, "text_offsets.npy"), text_offsets)
+
+        model = _embedder() if embed else None
+        if model is not None:
+            vectors = model.encode([t.decode("utf-8") for t in texts], batch_size=64, normalize_embeddings=True)
+            np.save(os.path.join(tmp, "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        with open(os.path.join(tmp, "passages.json"), "w", encoding="utf-8") as f:
+            json.dump({"files": files, "citations": citations}, f)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"sources": {os.path.abspath(p): file_digest(p) for p in sources},
+                       "embed_model": EMBED_MODEL if model is not None else None}, f)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    publish_build(tmp, index_dir)
+    return len(terms), len(texts)
+
+
+def _can_embed():
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+
+def _is_current(index_dir, sources, embed=False):
+    index_dir = latest_build(index_dir)
+    try:
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            built = json.load(f)["sources"]
+    except (OSError, ValueError, KeyError):
+        return False
+    # An index built without vectors is out of date once they are asked for and can be computed
+    if embed and not os.path.exists(os.path.join(index_dir, "vectors.npy")) and _can_embed():
+        return False
+    return built == {os.path.abspath(p): file_digest(p) for p in sources}
+
+
+def ensure_index(index_dir=RETRIEVAL_DIR, workbook=WORKBOOK_PATH, deck=DECK_PATH, file_index=FILE_INDEX_PATH,
+                 embed=False):
+    """Builds the index unless one for the same source files (by content hash, and with vectors when embed is
+    set and sentence-transformers is installed) is already on disk."""
+    sources = default_sources(workbook, deck, file_index)
+    if not _is_current(index_dir, sources, embed):
+        start = time.perf_counter()
+        n_terms, n_docs = build_retrieval_index(default_passages(workbook, deck, file_index), index_dir,
+                                                sources, embed)
+        print(f"Retrieval index: {n_docs:,} passages, {n_terms:,} terms in {time.perf_counter() - start:.2f}s")
+    return index_dir
+
+
+# --- Query ---
+
+class Retriever:
+    """BM25 (plus optional embedding) search over an index written by build_retrieval_index."""
+
+    def __init__(self, index_dir=RETRIEVAL_DIR):
+        index_dir = latest_build(index_dir)
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        self.offsets = load("offsets.npy")
+        self.post_docs = load("post_docs.npy")
+        self.post_tf = load("post_tf.npy")
+        self.doc_len = np.asarray(load("doc_len.npy"))
+        self.text = load("text.npy")
+        self.text_offsets = load("text_offsets.npy")
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            self.term_ids = {t: i for i, t in enumerate(json.load(f))}
+        with open(os.path.join(index_dir, "passages.json"), encoding="utf-8") as f:
+            passages = json.load(f)
+        self.files, self.citations = passages["files"], passages["citations"]
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.n_docs = len(self.doc_len)
+        self.avg_len = float(self.doc_len.mean()) if self.n_docs else 0.0
+        # Length normalization depends only on the document, so it is folded in once
+        self.norm = K1 * (1 - B + B * self.doc_len / max(self.avg_len, 1e-9))
+
+        self.vectors, self.model = None, None
+        if meta.get("embed_model") and os.path.exists(os.path.join(index_dir, "vectors.npy")):
+            self.model = _embedder()
+            if self.model is not None:
+                self.vectors = load("vectors.npy")
+
+    def passage_text(self, doc_id):
+        lo, hi = self.text_offsets[doc_id], self.text_offsets[doc_id + 1]
+        return self.text[lo:hi].tobytes().decode("utf-8")
+
+    def bm25(self, query):
+        """Dense BM25 score per passage; only the postings of the query terms are touched."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            t = self.term_ids.get(token)
+            if t is None:
+                continue
+            lo, hi = self.offsets[t], self.offsets[t + 1]
+            docs, tf = np.asarray(self.post_docs[lo:hi]), np.asarray(self.post_tf[lo:hi])
+            idf = np.log1p((self.n_docs - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            scores[docs] += idf * tf * (K1 + 1) / (tf + self.norm[docs])
+        return scores
+
+    @profiled("chat retrieval")
+    def search(self, query, k=5):
+        """Top-k passages as Hit(score, file, citation, text), best first."""
+        scores = self.bm25(query)
+        if self.vectors is not None and scores.max(initial=0) > 0:
+            q = self.model.encode([query], normalize_embeddings=True)[0].astype(np.float32)
+            scores = (1 - EMBED_WEIGHT) * scores / scores.max() + EMBED_WEIGHT * np.clip(self.vectors @ q, 0, None)
+        k = min(k, int((scores > 0).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [Hit(float(scores[i]), self.files[i], self.citations[i], self.passage_text(i)) for i in top]
+
+
+def iter_answer(query, hits, max_chars=280):
+    """Markdown answer quoting the retrieved passages, yielded one line at a time."""
+    if not hits:
+        yield f"I couldn't find anything about **{query}** in the workbook, board deck or file index."
+        return
+    yield f"Here is what the source files say about **{query}**:\n"
+    for hit in hits:
+        snippet = " ".join(hit.text.split())
+        if len(snippet) > max_chars:
+            snippet = snippet[:max_chars].rsplit(" ", 1)[0] + " …"
+        yield f"\n- {snippet} *({hit.file}, {hit.citation})*"
+
+
+def format_answer(query, hits, max_chars=280):
+    return "".join(iter_answer(query, hits, max_chars))
+
+
+def stream_answer(retriever, query, k=5):
+    """Yields the answer as soon as each passage is ready; nothing waits on a timer."""
+    yield from iter_answer(query, retriever.search(query, k))
+
+
+def timed_stream(chunks, label, log=print):
+    """Passes chunks through, logging time-to-first-chunk and total time once the consumer is done."""
+    start = time.perf_counter()
+    first = None
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        yield chunk
+    total = time.perf_counter() - start
+    log(f"[chat] {label!r}: first chunk {(first or total) * 1000:.1f} ms, total {total * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask the chat retrieval index a question.")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--embed", action="store_true", help="Also build dense vectors (needs sentence-transformers)")
+    parser.add_argument("--index-dir", default=RETRIEVAL_DIR)
+    args = parser.parse_args()
+
+    retriever = Retriever(ensure_index(args.index_dir, embed=args.embed))
+    query = " ".join(args.query)
+    start = time.perf_counter()
+    hits = retriever.search(query, args.k)
+    print(f"{len(hits)} passages in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+    print(format_answer(query, hits))
@@ -0,0 +1,369 @@
+import argparse
+import itertools
+import math
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_layer import source_digest
+from incentives import DEALER_CODE, load_incentives
+from workbook_cache import WORKBOOK_PATH, read_sheet
+
+SALES_SHEET = "Sales Data"
+MONTHLY_SHEET = "Monthly Sales"
+RENTAL_SHEET = "Rental"
+
+DIMENSIONS = ("dealer", "region", "product", "month")
+# Measure -> (source, grain it is stored at). Region is never stored: it is a rollup of dealer (the customer's city)
+MEASURES = {
+    "dispatch_t": (SALES_SHEET, ("dealer", "product", "month")),
+    "dispatch_usd": (SALES_SHEET, ("dealer", "product", "month")),
+    "dispatch_iqd": (SALES_SHEET, ("dealer", "product", "month")),
+    "net_qty_t": (MONTHLY_SHEET, ("product", "month")),
+    "gross_sales": (MONTHLY_SHEET, ("product", "month")),
+    "incentive": ("incentive sheets", ("dealer", "month")),
+    "rental": (RENTAL_SHEET, ("month",)),
+}
+FACT_COLUMNS = ["dealer", "dealer_name", "region", "product", "month", "measure", "value"]
+
+# "Sales Data" blocks (titled above the header row): title pattern -> measure
+DISPATCH_BLOCKS = ((r"dispatched quantity", "dispatch_t"), (r"dispatched value.*usd", "dispatch_usd"),
+                   (r"dispatched value.*iqd", "dispatch_iqd"))
+ITEM_CODE = re.compile(r"^FG-\d+$")
+MONTH_TEXT = re.compile(r"\b([A-Za-z]{3})[a-z]*[-\s']*(\d{4}|\d{2})\b")
+NO_REGION = "(no sales)"
+
+
+def _text(value):
+    return " ".join(str(value).split()) if pd.notna(value) else ""
+
+
+def _lower(df):
+    return df.map(lambda v: _text(v).lower())
+
+
+def _is_date(value):
+    return hasattr(value, "year") and not isinstance(value, str) and pd.notna(value)
+
+
+def _month(value):
+    """'YYYY-MM' of a date cell or of text such as 'Jan-26' / 'For The month of Jan-26'; None otherwise."""
+    if _is_date(value):
+        return pd.Timestamp(value).strftime("%Y-%m")
+    for match in MONTH_TEXT.finditer(_text(value)):
+        year = match.group(2)
+        try:
+            return pd.to_datetime(f"{match.group(1)} {year}", format="%b %y" if len(year) == 2 else "%b %Y").strftime("%Y-%m")
+        except ValueError:
+            continue
+    return None
+
+
+def _product(label):
+    # "SRC Bags" (Sales Data) and "SRC Bag" (Monthly Sales) are the same product
+    return re.sub(r"\bbags\b", "Bag", _text(label), flags=re.IGNORECASE)
+
+
+def _header_row(text, *labels):
+    return next(r for r in range(len(text)) if all((text.iloc[r] == label).any() for label in labels))
+
+
+def _column(header, label):
+    return int(np.flatnonzero(header == label)[0])
+
+
+def parse_sales_data(df):
+    """Customer x product dispatches (tons, USD, IQD) of the month -> long facts."""
+    text = _lower(df.iloc[:30])
+    head = _header_row(text, "card code", "city")
+    header = text.iloc[head].to_numpy()
+    code_col, name_col, city_col = (_column(header, label) for label in ("card code", "card name", "city"))
+    month = next((m for m in map(_month, df.iloc[:head].to_numpy().ravel()) if m), None)
+    if month is None:
+        raise ValueError("no 'For The month of' title")
+
+    codes = df.iloc[:, code_col].map(_text)
+    rows = np.flatnonzero(codes.str.match(DEALER_CODE.pattern).to_numpy())
+    rows = rows[rows > head]
+    if not len(rows):
+        raise ValueError("no dealer rows")
+    # Product names may wrap onto the row under the header ("CEM II" / "Mumtaz Bulk")
+    wrap = head + 1 if head + 1 < len(df) and head + 1 not in rows else None
+
+    frames = []
+    for pattern, measure in DISPATCH_BLOCKS:
+        start = next((c for r in range(max(head - 2, 0), head) for c in range(df.shape[1])
+                      if re.search(pattern, text.iat[r, c])), None)
+        if start is None:
+            continue
+        end = next((c for c in range(start, df.shape[1]) if header[c] == "total"), None)
+        if end is None:
+            raise ValueError(f"no 'Total' column closing the '{pattern}' block")
+        for c in range(start, end):
+            product = _product(f"{_text(df.iat[head, c])} {_text(df.iat[wrap, c]) if wrap is not None else ''}")
+            frames.append(pd.DataFrame({
+                "dealer": codes.iloc[rows].to_numpy(),
+                "dealer_name": df.iloc[rows, name_col].map(_text).to_numpy(),
+                "region": df.iloc[rows, city_col].map(_text).replace("", NO_REGION).to_numpy(),
+                "product": product,
+                "month": month,
+                "measure": measure,
+                "value": pd.to_numeric(df.iloc[rows, c], errors="coerce").to_numpy(dtype=float),
+            }))
+    if not frames:
+        raise ValueError("no 'Dispatched ...' blocks")
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_monthly_sales(df):
+    """Item x month (Net Qty Sold, Gross Sales) blocks -> long facts, one block per month."""
+    text = _lower(df.iloc[:30])
+    head = _header_row(text, "item description")
+    header = text.iloc[head].to_numpy()
+    desc_col = _column(header, "item description")
+    code_col = next(c for c in range(len(header)) if header[c].startswith("item no"))
+
+    # Month headings are merged across their block: the nearest date at or left of "Net Qty Sold"
+    dates = df.iloc[:head].map(_is_date)
+    date_row = int(dates.sum(axis=1).to_numpy().argmax())
+    headings = df.iloc[date_row].where(dates.iloc[date_row]).ffill()
+
+    rows = np.flatnonzero(df.iloc[:, code_col].map(_text).str.match(ITEM_CODE.pattern).to_numpy())
+    rows = rows[rows > head]
+    products = df.iloc[rows, desc_col].map(_product).to_numpy()
+
+    frames, seen = [], set()
+    for c in np.flatnonzero(header == "net qty sold"):
+        month = _month(headings.iloc[c])
+        gross = next((g for g in range(c + 1, len(header)) if header[g] == "gross sales"), None)
+        if month is None or gross is None or month in seen:
+            continue
+        seen.add(month)
+        for measure, col in (("net_qty_t", c), ("gross_sales", gross)):
+            frames.append(pd.DataFrame({"product": products, "month": month, "measure": measure,
+                                        "value": pd.to_numeric(df.iloc[rows, col], errors="coerce").to_numpy(dtype=float)}))
+    if not frames:
+        raise ValueError("no dated 'Net Qty Sold' blocks")
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_rental(df):
+    """Month-wise vehicle rentals -> total per month."""
+    text = _lower(df.iloc[:30])
+    head = _header_row(text, "month", "vehicle")
+    header = text.iloc[head].to_numpy()
+    month_col, vehicle_col = _column(header, "month"), _column(header, "vehicle")
+    total_col = int(np.flatnonzero(header == "total")[-1])
+
+    body = df.iloc[head + 1:]
+    # The month is written once per group of vehicles
+    months = body.iloc[:, month_col].map(_month).ffill()
+    vehicles = body.iloc[:, vehicle_col].map(_text)
+    amount = pd.to_numeric(body.iloc[:, total_col], errors="coerce")
+    keep = months.notna() & (vehicles != "") & ~vehicles.str.lower().str.startswith("total") & amount.notna()
+    if not keep.any():
+        raise ValueError("no monthly rental rows")
+    totals = amount[keep].groupby(months[keep]).sum()
+    return pd.DataFrame({"month": totals.index, "measure": "rental", "value": totals.to_numpy(dtype=float)})
+
+
+def incentive_facts(table):
+    """Dealer x month incentive paid (all schemes) from `incentives.load_incentives`."""
+    if table.empty:
+        return pd.DataFrame(columns=FACT_COLUMNS)
+    period = table["period"].astype(str)
+    table = table[period.str.match(r"^\d{4}-\d{2}$")]
+    return pd.DataFrame({"dealer": table["dealer_code"].astype(str).to_numpy(),
+                         "dealer_name": table["dealer"].astype(str).to_numpy(),
+                         "month": table["period"].astype(str).to_numpy(),
+                         "measure": "incentive", "value": table["incentive"].to_numpy(dtype=float)})
+
+
+class SalesCube:
+    """Sales, incentive and rental figures as dense arrays over dictionary-encoded dimensions.
+
+    Each measure is stored at its own grain (MEASURES) and summed once, at build time, into every
+    combination of its dimensions, with dealers also rolled up into their region. A query takes the
+    smallest rollup carrying the dimensions it groups or filters by, slices it and sums the rest.
+    """
+
+    def __init__(self, facts):
+        facts = facts.reindex(columns=FACT_COLUMNS)
+        facts = facts[facts["measure"].isin(list(MEASURES)) & facts["value"].notna()].reset_index(drop=True)
+
+        # Dictionary-encode the stored dimensions: sorted labels, one int code per fact row (-1 = not set)
+        self.labels, codes = {}, {}
+        for dim in ("dealer", "product", "month"):
+            codes[dim], self.labels[dim] = pd.factorize(facts[dim], sort=True)
+            self.labels[dim] = np.asarray(self.labels[dim], dtype=object)
+
+        # Dealer attributes: name and region (the first one any source gives)
+        dealers = facts[facts["dealer"].notna()]
+        name = dealers[dealers["dealer_name"].fillna("") != ""].drop_duplicates("dealer").set_index("dealer")["dealer_name"]
+        region = dealers[dealers["region"].notna()].drop_duplicates("dealer").set_index("dealer")["region"]
+        self.dealer_name = name.reindex(self.labels["dealer"]).fillna("").to_numpy(dtype=object)
+        self.dealer_region, regions = pd.factorize(region.reindex(self.labels["dealer"]).fillna(NO_REGION), sort=True)
+        self.labels["region"] = np.asarray(regions, dtype=object)
+        self._index = {dim: pd.Index(labels) for dim, labels in self.labels.items()}
+        self._region_matrix = np.zeros((len(regions), len(self.labels["dealer"])))
+        self._region_matrix[self.dealer_region, np.arange(len(self.labels["dealer"]))] = 1.0
+
+        measure = facts["measure"].to_numpy()
+        values = facts["value"].to_numpy(dtype=float)
+        self.rollups = {}
+        for name, (_, grain) in MEASURES.items():
+            base = np.zeros(tuple(len(self.labels[d]) for d in grain))
+            mask = measure == name
+            np.add.at(base, tuple(codes[d][mask] for d in grain), values[mask])
+            self.rollups[name] = self._rollup(base, grain)
+
+    def _rollup(self, base, grain):
+        """{dims kept: array} for every subset of `grain`, plus the region version of every dealer one."""
+        rollups = {}
+        for keep in itertools.product((True, False), repeat=len(grain)):
+            dims = tuple(d for d, k in zip(grain, keep) if k)
+            array = base.sum(axis=tuple(i for i, k in enumerate(keep) if not k))
+            rollups[dims] = array
+            if dims and dims[0] == "dealer":
+                # Dealer is always the first axis: regions are a matrix product over it
+                rollups[("region",) + dims[1:]] = np.tensordot(self._region_matrix, array, axes=1)
+        return rollups
+
+    @property
+    def empty(self):
+        return not self.measures()
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for rollups in self.rollups.values() for a in rollups.values())
+
+    def measures(self):
+        """Measures with any data."""
+        return [m for m, rollups in self.rollups.items() if rollups[()] != 0]
+
+    def dimensions(self, measure):
+        grain = MEASURES[measure][1]
+        return tuple(d for d in DIMENSIONS if d in grain or (d == "region" and "dealer" in grain))
+
+    def label(self, dim, value):
+        """How a label is shown: dealers get their name after the code."""
+        if dim != "dealer":
+            return value
+        codes = self._codes("dealer", value)
+        return f"{value} {self.dealer_name[codes[0]]}".strip() if len(codes) else value
+
+    def _codes(self, dim, labels):
+        codes = self._index[dim].get_indexer(pd.Index(np.atleast_1d(labels)))
+        return codes[codes >= 0]
+
+    def query(self, measure, by=(), **filters):
+        """`measure` summed by the dimensions in `by`, over the labels listed per dimension in `filters`.
+
+        Returns a float when `by` is empty, otherwise a Series indexed by `by` (a MultiIndex for several).
+        """
+        if measure not in self.rollups:
+            raise KeyError(f"unknown measure '{measure}' (available: {', '.join(MEASURES)})")
+        by = tuple(by)
+        filters = {dim: np.atleast_1d(labels) for dim, labels in filters.items() if labels is not None}
+        available = self.dimensions(measure)
+        for dim in by + tuple(filters):
+            if dim not in available:
+                raise KeyError(f"'{measure}' is not broken down by {dim} (only {', '.join(available)})")
+
+        # With dealers in play a region filter is a dealer filter, and grouping by both reads the dealer rollup
+        if "region" in filters and ("dealer" in by or "dealer" in filters):
+            dealers = np.flatnonzero(np.isin(self.dealer_region, self._codes("region", filters.pop("region"))))
+            if "dealer" in filters:
+                dealers = np.intersect1d(dealers, self._codes("dealer", filters["dealer"]))
+            filters["dealer"] = self.labels["dealer"][dealers]
+        if "region" in by and "dealer" in filters and "dealer" not in by:
+            series = self.query(measure, by + ("dealer",), **filters)
+            return series.groupby(level=list(by)).sum()
+        both = "region" in by and "dealer" in by
+        needed = (set(by) | set(filters)) - ({"region"} if both else set())
+        key = tuple(d for d in DIMENSIONS if d in needed)
+
+        array = self.rollups[measure][key]
+        index = [self._codes(d, filters[d]) if d in filters else np.arange(n) for d, n in zip(key, array.shape)]
+        if key:
+            array = array[np.ix_(*index)]
+        kept = [d for d in key if d in by]
+        array = array.sum(axis=tuple(i for i, d in enumerate(key) if d not in by))
+        if not kept:
+            return float(array)
+
+        labels = {d: self.labels[d][idx] for d, idx in zip(key, index) if d in by}
+        order = [d for d in by if d in kept]
+        array = np.transpose(array, [kept.index(d) for d in order])
+        index = pd.MultiIndex.from_product([labels[d] for d in order], names=order) if len(order) > 1 \
+            else pd.Index(labels[order[0]], name=order[0])
+        series = pd.Series(array.ravel(), index=index, name=measure)
+        if both:
+            levels = {d: series.index.get_level_values(d) for d in order}
+            levels["region"] = self.labels["region"][self.dealer_region[self._codes("dealer", levels["dealer"])]]
+            series.index = pd.MultiIndex.from_arrays([levels[d] for d in by], names=by)
+        return series
+
+    def drill(self, measure, path, selected=(), **filters):
+        """One drill-down step: `selected` holds the labels picked so far along `path`; returns the next level."""
+        filters = {**filters, **{dim: [label] for dim, label in zip(path, selected)}}
+        return self.query(measure, by=(path[len(selected)],), **filters)
+
+    def year_on_year(self, measure="gross_sales", month=None):
+        """Growth (%) of `measure` in `month` (default: the latest with data) over the same month a year before.
+
+        NaN when either month is missing.
+        """
+        by_month = self.query(measure, by=("month",))
+        by_month = by_month[by_month != 0]
+        if by_month.empty:
+            return math.nan
+        month = month or by_month.index[-1]
+        prior = (pd.Period(month, "M") - 12).strftime("%Y-%m")
+        if month not in by_month.index or prior not in by_month.index:
+            return math.nan
+        return float((by_month[month] / by_month[prior] - 1) * 100)
+
+
+def load_sales_cube(path=WORKBOOK_PATH, incentives=None):
+    """Cube of the sales, rental and incentive sheets (empty without the workbook).
+
+    Sheets that can't be parsed are left out. `incentives` takes an already loaded incentive table.
+    """
+    frames = []
+    if source_digest(path) is not None:
+        for sheet, parser in ((SALES_SHEET, parse_sales_data), (MONTHLY_SHEET, parse_monthly_sales),
+                              (RENTAL_SHEET, parse_rental)):
+            try:
+                frames.append(parser(read_sheet(sheet, path)))
+            except (KeyError, ValueError, StopIteration, IndexError) as e:
+                print(f"Skipping '{sheet}': {e}")
+        frames.append(incentive_facts(load_incentives(path) if incentives is None else incentives))
+    frames = [f.reindex(columns=FACT_COLUMNS) for f in frames if len(f)]
+    return SalesCube(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FACT_COLUMNS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dealer / region / product / month sales cube.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--measure", default="dispatch_t", choices=list(MEASURES))
+    parser.add_argument("--by", nargs="*", default=["region"], choices=DIMENSIONS)
+    parser.add_argument("--month", nargs="*", help="Only these months (YYYY-MM)")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        cube = load_sales_cube(args.path)
+        print(f"Cube built in {time.perf_counter() - start:.2f}s: "
+              f"{', '.join(f'{len(v):,} {d}s' for d, v in cube.labels.items())}, {cube.nbytes / 1024:,.0f} KiB of rollups")
+        print(f"Measures with data: {', '.join(cube.measures()) or 'none'}\n")
+        start = time.perf_counter()
+        result = cube.query(args.measure, args.by, month=args.month)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(result.sort_values(ascending=False).to_markdown(floatfmt=",.2f") if isinstance(result, pd.Series)
+              else f"{args.measure}: {result:,.2f}")
+        print(f"\nQuery answered in {elapsed:.2f} ms")
+    except Exception as e:
+        print(f"Error: {e}")
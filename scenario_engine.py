@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Slider ranges of the Scenario Simulator tab, in percent (41 x 31 x 21 combinations)
+FUEL_RANGE = np.arange(-20, 21)
+VOLUME_RANGE = np.arange(-15, 16)
+PRICE_RANGE = np.arange(-10, 11)
+
+# Volume moves revenue slightly less than 1:1 because of fixed components
+VOLUME_REVENUE_FACTOR = 0.8
+
+ScenarioGrid = namedtuple("ScenarioGrid", ["fuel", "volume", "price", "profit", "margin"])
+
+
+def scenario_impact(fuel_pct, volume_pct, price_pct, base_revenue, base_fuel_cost, base_profit):
+    """Projected net profit and margin (%) for fuel/volume/price variances in percent.
+
+    Inputs broadcast like NumPy arrays, so scalars give one scenario and shaped arrays give a grid.
+    """
+    fuel_pct, volume_pct, price_pct = (np.asarray(x, dtype=float) for x in (fuel_pct, volume_pct, price_pct))
+    revenue_impact = base_revenue * (price_pct / 100) + base_revenue * (volume_pct / 100) * VOLUME_REVENUE_FACTOR
+    fuel_impact = base_fuel_cost * (fuel_pct / 100) + base_fuel_cost * (volume_pct / 100)
+
+    new_profit = base_profit + revenue_impact - fuel_impact
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_margin = new_profit / (base_revenue + revenue_impact) * 100
+    return new_profit, new_margin
+
+
+def scenario_grid(base_revenue, base_fuel_cost, base_profit, fuel=FUEL_RANGE, volume=VOLUME_RANGE, price=PRICE_RANGE):
+    """Evaluates every fuel x volume x price combination in one call; surfaces are indexed [fuel, volume, price]."""
+    fuel, volume, price = (np.asarray(x, dtype=float) for x in (fuel, volume, price))
+    profit, margin = scenario_impact(
+        fuel[:, None, None], volume[None, :, None], price[None, None, :],
+        base_revenue, base_fuel_cost, base_profit,
+    )
+    return ScenarioGrid(fuel, volume, price, profit, margin)
+
+
+def grid_slice(grid, volume_pct):
+    """Fuel x price profit and margin surfaces at the volume closest to `volume_pct`."""
+    j = int(np.abs(grid.volume - volume_pct).argmin())
+    return grid.profit[:, j, :], grid.margin[:, j, :]
+
+
+def tornado(base_revenue, base_fuel_cost, base_profit, fuel=FUEL_RANGE, volume=VOLUME_RANGE, price=PRICE_RANGE):
+    """Profit swing of each driver across its full range with the others held at 0%."""
+    drivers = {"HFO/Gas Price": (fuel, 0), "Production Volume": (volume, 1), "Cement Price": (price, 2)}
+    rows = []
+    for name, (values, axis) in drivers.items():
+        lo_hi = np.zeros((3, 2))
+        lo_hi[axis] = [np.min(values), np.max(values)]
+        profit, _ = scenario_impact(*lo_hi, base_revenue, base_fuel_cost, base_profit)
+        rows.append({"Driver": name, "Low": profit[0] - base_profit, "High": profit[1] - base_profit,
+                     "Range": f"{lo_hi[axis][0]:+.0f}% .. {lo_hi[axis][1]:+.0f}%"})
+    df = pd.DataFrame(rows)
+    return df.reindex((df["High"] - df["Low"]).abs().sort_values().index)
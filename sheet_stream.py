@@ -0,0 +1,125 @@
+import argparse
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from profiling import peak_memory, section
+from workbook_cache import WORKBOOK_PATH, header_labels
+
+SheetSummary = namedtuple("SheetSummary", ["name", "columns", "n_rows", "head", "peak_bytes"])
+
+CHUNK_ROWS = 500
+
+
+@contextmanager
+def open_workbook(filepath):
+    """Read-only openpyxl workbook: rows are streamed from the XML, never held as a sheet."""
+    with section("load_workbook"):
+        wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        yield wb
+    finally:
+        wb.close()
+
+
+def sheet_names(filepath):
+    with open_workbook(filepath) as wb:
+        return list(wb.sheetnames)
+
+
+def _cell(value):
+    # Same normalisation pandas applies to openpyxl values (integral floats become ints)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_row_chunks(ws, chunk_rows=CHUNK_ROWS):
+    """Yields lists of up to `chunk_rows` raw row tuples from a read-only worksheet."""
+    ws.reset_dimensions()  # Some exporters write a wrong <dimension>; don't trust it
+    chunk = []
+    for row in ws.iter_rows(values_only=True):
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_sheet_chunks(filepath, sheet_name, chunk_rows=CHUNK_ROWS):
+    """Streams one sheet as row chunks without building a DataFrame."""
+    with open_workbook(filepath) as wb:
+        yield from iter_row_chunks(wb[sheet_name], chunk_rows)
+
+
+def _summarize(ws, head_rows):
+    """Single pass: header row, data row count and the first `head_rows` rows (header=0 semantics)."""
+    header, head = None, []
+    n_rows = width = 0
+    last_data_row = 0
+    for chunk in iter_row_chunks(ws):
+        for row in chunk:
+            # Trailing empty cells and trailing empty rows don't count, as in pd.read_excel
+            used = len(row)
+            while used and row[used - 1] is None:
+                used -= 1
+            width = max(width, used)
+            if header is None:
+                header = row[:used]
+                continue
+            n_rows += 1
+            if used:
+                last_data_row = n_rows
+            if len(head) < head_rows:
+                head.append(row[:used])
+
+    header = list(header or ()) + [None] * (width - len(header or ()))
+    head = head[:last_data_row]
+    frame = pd.DataFrame(
+        [[_cell(v) for v in row] + [None] * (width - len(row)) for row in head],
+        columns=header_labels(_cell(v) for v in header),
+        dtype=object,
+    )
+    frame = frame.fillna(float("nan")).infer_objects()
+    return frame.columns, last_data_row, frame
+
+
+def summarize_sheet(ws, head_rows=5, track_memory=False):
+    """Column headers, row count and head preview for a read-only worksheet.
+
+    With track_memory, also the peak traced memory (None when another thread holds the tracemalloc peak); tracing
+    every allocation makes the scan several times slower, so it is off by default.
+    """
+    started = track_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        with peak_memory() if track_memory else nullcontext([None]) as peak:
+            columns, n_rows, head = _summarize(ws, head_rows)
+    finally:
+        if started:
+            tracemalloc.stop()
+    return SheetSummary(ws.title, list(columns), n_rows, head, peak[0])
+
+
+def summarize_workbook(filepath, sheets=None, head_rows=5, track_memory=False):
+    """Yields a SheetSummary per sheet (all sheets, or the given ones in order)."""
+    with open_workbook(filepath) as wb:
+        for name in sheets or wb.sheetnames:
+            yield summarize_sheet(wb[name], head_rows, track_memory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream sheet summaries with bounded memory.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--sheet", action="append")
+    parser.add_argument("--track-memory", action="store_true", help="Also report each sheet's peak traced memory")
+    args = parser.parse_args()
+
+    for summary in summarize_workbook(args.path, args.sheet, track_memory=args.track_memory):
+        peak = f", peak {summary.peak_bytes / 2**20:.2f} MB" if summary.peak_bytes is not None else ""
+        print(f"{summary.name}: {summary.n_rows:,} rows x {len(summary.columns)} cols{peak}")
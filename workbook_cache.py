@@ -0,0 +1,227 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from profiling import section
+
+WORKBOOK_PATH = "NAS - PL  Jan 26-KAK.xlsx"
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".workbook_cache")
+CACHE_VERSION = 1
+
+# Cell kinds stored in the per-sheet `kinds` matrix
+EMPTY, NUMBER, INTEGER, TEXT, DATETIME, BOOL = 0, 1, 2, 3, 4, 5
+
+_digests = {}
+
+
+def file_digest(path):
+    """Returns a cache key built from the file's content hash and mtime."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        _digests[key] = f"{sha.hexdigest()[:16]}-{stat.st_mtime_ns}"
+    return _digests[key]
+
+
+def _cache_root(path):
+    stem = "".join(ch if ch.isalnum() else "_" for ch in os.path.basename(path))
+    return os.path.join(CACHE_DIR, stem)
+
+
+def _encode_sheet(df, prefix):
+    """Writes one raw sheet grid as kinds/values/text arrays that can be memory-mapped."""
+    grid = df.to_numpy(dtype=object)
+    kinds = np.zeros(grid.shape, dtype=np.int8)
+    values = np.full(grid.shape, np.nan)
+    chunks, offsets = [], [0]
+
+    for (r, c), v in np.ndenumerate(grid):
+        if v is None or (isinstance(v, float) and v != v):
+            continue
+        if isinstance(v, (bool, np.bool_)):
+            kinds[r, c], values[r, c] = BOOL, float(v)
+        elif isinstance(v, (int, np.integer)):
+            kinds[r, c], values[r, c] = INTEGER, float(v)
+        elif isinstance(v, (float, np.floating)):
+            kinds[r, c], values[r, c] = NUMBER, float(v)
+        elif isinstance(v, datetime.datetime):
+            kinds[r, c], values[r, c] = DATETIME, pd.Timestamp(v).value / 1e9
+        else:
+            # Strings, plus anything openpyxl hands back that has no numeric form (times, errors)
+            encoded = str(v).encode("utf-8")
+            kinds[r, c], values[r, c] = TEXT, len(offsets) - 1
+            chunks.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+    np.save(prefix + ".kinds.npy", kinds)
+    np.save(prefix + ".values.npy", values)
+    np.save(prefix + ".text.npy", np.frombuffer(b"".join(chunks), dtype=np.uint8))
+    np.save(prefix + ".offsets.npy", np.asarray(offsets, dtype=np.int64))
+
+
+def _decode_sheet(prefix):
+    """Rebuilds the raw (header=None) DataFrame for a cached sheet."""
+    kinds = np.load(prefix + ".kinds.npy", mmap_mode="r")
+    values = np.load(prefix + ".values.npy", mmap_mode="r")
+    out = np.full(kinds.shape, np.nan, dtype=object)
+
+    mask = kinds == NUMBER
+    out[mask] = values[mask]
+    mask = kinds == INTEGER
+    out[mask] = values[mask].astype(np.int64)
+    mask = kinds == BOOL
+    out[mask] = values[mask].astype(bool)
+    mask = kinds == DATETIME
+    if mask.any():
+        out[mask] = list(pd.to_datetime(values[mask] * 1e9, unit="ns").round("us"))
+    mask = kinds == TEXT
+    if mask.any():
+        blob = np.load(prefix + ".text.npy", mmap_mode="r").tobytes()
+        offsets = np.load(prefix + ".offsets.npy")
+        idx = values[mask].astype(np.int64)
+        out[mask] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in idx]
+
+    return pd.DataFrame(out).infer_objects()
+
+
+def header_labels(values):
+    """Column labels the way pd.read_excel(header=0) names them (Unnamed: i, dup.1, ...)."""
+    names, seen = [], {}
+    for i, v in enumerate(values):
+        name = f"Unnamed: {i}" if v is None or pd.isna(v) else v
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _promote_header(df):
+    """Mimics pd.read_excel(header=0): first row becomes the column labels."""
+    if df.empty:
+        return df
+    body = df.iloc[1:].reset_index(drop=True)
+    body.columns = header_labels(df.iloc[0])
+    return body.infer_objects()
+
+
+def build_cache(path=WORKBOOK_PATH):
+    """Parses every sheet of the workbook once and writes the columnar cache. Returns the cache dir."""
+    root = _cache_root(path)
+    target = os.path.join(root, file_digest(path))
+    if os.path.exists(os.path.join(target, "manifest.json")):
+        return target
+
+    with section("read_excel"):
+        frames = pd.read_excel(path, sheet_name=None, header=None)
+
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    sheets = []
+    for i, (name, df) in enumerate(frames.items()):
+        _encode_sheet(df, os.path.join(tmp, f"sheet_{i:03d}"))
+        sheets.append({"name": name, "shape": list(df.shape)})
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "source": os.path.abspath(path), "sheets": sheets}, f)
+
+    # Drop caches for older versions of the same file, then publish the new one
+    for entry in os.listdir(root):
+        if ".tmp-" not in entry:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another process published the same cache first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+
+def _manifest(path):
+    target = build_cache(path)
+    with open(os.path.join(target, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != CACHE_VERSION:
+        shutil.rmtree(target, ignore_errors=True)
+        return _manifest(path)
+    return target, manifest
+
+
+def sheet_names(path=WORKBOOK_PATH):
+    """Lists the workbook's sheet names without re-parsing it."""
+    _, manifest = _manifest(path)
+    return [s["name"] for s in manifest["sheets"]]
+
+
+def read_sheet(sheet_name, path=WORKBOOK_PATH, header=None):
+    """Cached drop-in for pd.read_excel(path, sheet_name=..., header=None|0)."""
+    target, manifest = _manifest(path)
+    for i, sheet in enumerate(manifest["sheets"]):
+        if sheet["name"] == sheet_name:
+            with section(f"read_sheet:{sheet_name}"):
+                df = _decode_sheet(os.path.join(target, f"sheet_{i:03d}"))
+                return _promote_header(df) if header == 0 else df
+    raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+
+def read_workbook(path=WORKBOOK_PATH, header=None):
+    """Returns {sheet_name: DataFrame} for every sheet, served from the cache."""
+    target, manifest = _manifest(path)
+    frames = {}
+    for i, sheet in enumerate(manifest["sheets"]):
+        df = _decode_sheet(os.path.join(target, f"sheet_{i:03d}"))
+        frames[sheet["name"]] = _promote_header(df) if header == 0 else df
+    return frames
+
+
+def clear_cache(path=WORKBOOK_PATH):
+    shutil.rmtree(_cache_root(path), ignore_errors=True)
+
+
+def benchmark(path=WORKBOOK_PATH, repeat=5):
+    """Times a cold read (parse + cache build) against warm reads served from the cache."""
+    clear_cache(path)
+    _digests.clear()
+
+    start = time.perf_counter()
+    frames = read_workbook(path)
+    cold = time.perf_counter() - start
+
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_workbook(path)
+        warm.append(time.perf_counter() - start)
+
+    cells = sum(df.size for df in frames.values())
+    print(f"Workbook: {path} ({len(frames)} sheets, {cells:,} cells)")
+    print(f"Cold read (openpyxl parse + cache build): {cold * 1000:,.1f} ms")
+    print(f"Warm read (memory-mapped cache), best of {repeat}: {min(warm) * 1000:,.1f} ms")
+    print(f"Speed-up: {cold / min(warm):,.1f}x")
+    return {"cold_s": cold, "warm_s": min(warm)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the workbook cache.")
+    parser.add_argument("path", nargs="?", default=WORKBOOK_PATH)
+    parser.add_argument("--benchmark", action="store_true", help="Compare a cold read against warm reads")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.path, args.repeat)
+    else:
+        print(f"Cache ready at {build_cache(args.path)}")